@@ -11,6 +11,7 @@ from modules.ai_email_generator import AIEmailGenerator
 from modules.response_tracker import GmailResponseTracker
 from modules.analytics import CRMAnalytics
 from modules.supabase_client import SupabaseDB
+from backend.services.practice_store import get_practice_store
 from huisartsen_scraper import get_website_and_email, search_leads
 
 # Configure logging
@@ -28,6 +29,7 @@ response_tracker = GmailResponseTracker()
 db = SupabaseDB()
 
 DATA_FILE = Config.DATA_FILE  # Kept for backwards compatibility
+practice_ids = get_practice_store(DATA_FILE)  # nr sequence, shared with the backend
 
 # --- HELPER FUNCTIONS ---
 def load_data():
@@ -71,14 +73,9 @@ def get_practices():
 def add_practice():
     new_practice = request.json
     
-    # Generate ID if not present (Supabase usually handles this, but for consistency with existing logic)
-    # We'll let the frontend or DB handle ID generation if possible, or fetch max ID.
-    # For now, we assume the frontend sends a 'nr' or we generate one.
+    # Generate ID if not present: persisted sequence, never below the highest nr in Supabase
     if 'nr' not in new_practice:
-        # Simple max ID fetch (inefficient but works for small datasets)
-        all_practices = db.get_practices()
-        max_id = max([p.get('nr', 0) for p in all_practices]) if all_practices else 0
-        new_practice['nr'] = max_id + 1
+        new_practice['nr'] = practice_ids.reserve_nrs(1, floor=db.max_nr())[0]
         
     # Add workflow defaults
     if 'workflow' not in new_practice:
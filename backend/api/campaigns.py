@@ -1,16 +1,16 @@
 """Campaign management API endpoints"""
 from flask import Blueprint, jsonify, request
-from datetime import datetime
 import logging
 
-from backend.services.database import DatabaseService
+from backend.services.database import get_database
 from backend.services.email_service import EmailService
 from backend.services.analytics import AnalyticsService
+from backend.services.lead_scoring import LeadScoringService
 
 campaigns_bp = Blueprint('campaigns', __name__)
 logger = logging.getLogger(__name__)
 
-db = DatabaseService()
+db = get_database()
 email_service = EmailService()
 analytics = AnalyticsService()
 
@@ -46,15 +46,12 @@ def start_campaign():
                 
                 if success:
                     results['sent'] += 1
-                    if 'workflow' not in practice:
-                        practice['workflow'] = {}
-                    
-                    practice['workflow'].update({
-                        'last_email_date': datetime.now().isoformat(),
+                    LeadScoringService.record_event(practice, 'email_sent')
+                    practice['workflow'] = {
+                        **practice['workflow'],
                         'last_email_template': template_type,
-                        'emails_sent': practice['workflow'].get('emails_sent', 0) + 1,
                         'status': 'Contacted'
-                    })
+                    }
                     practices_to_update.append(practice)
                 else:
                     results['failed'] += 1
@@ -66,7 +63,9 @@ def start_campaign():
                 })
         
         if practices_to_update:
-            db.bulk_upsert(practices_to_update)
+            saved = db.bulk_upsert(practices_to_update)
+            if not saved['success']:
+                logger.error(f"Campaign results not saved for {len(practices_to_update)} practices")
         
         return jsonify(results)
         
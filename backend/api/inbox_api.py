@@ -2,15 +2,52 @@
 Inbox API Endpoints
 Unified inbox voor Email, SMS en WhatsApp
 """
+import atexit
+import json
 import logging
-from flask import Blueprint, request, jsonify
+import re
+from flask import Blueprint, Response, request, jsonify, send_file
+from backend.config import Config
+from backend.services.blob_store import BlobStore
+from backend.services.inbox_ingest import InboxIngestQueue
+from backend.services.inbox_media import MediaFetcher, valid_twilio_signature, webhook_media
 from backend.services.inbox_service import InboxService
-from backend.services.database import get_practice_by_id
+from backend.services.database import get_database, get_practice_by_id
+from backend.services.lead_scoring import LeadScoringService
 
 logger = logging.getLogger(__name__)
 
 inbox_bp = Blueprint('inbox', __name__)
 inbox_service = InboxService()
+db = get_database()
+
+# Conversation for inbound messages from numbers no practice lists
+UNKNOWN_PRACTICE_ID = 0
+UNKNOWN_PRACTICE_NAME = 'Onbekende afzender'
+
+# Workflow event recorded on the sender's practice per inbound channel
+REPLY_EVENTS = {'sms': 'sms_replied', 'whatsapp': 'whatsapp_replied'}
+
+# Inbound webhooks only queue the message; a writer thread group-commits them
+# and then records the replies on the practices
+ingest_queue = InboxIngestQueue(
+    inbox_service,
+    batch_size=Config.INBOX_INGEST_BATCH,
+    durability=Config.INBOX_INGEST_DURABILITY,
+    on_written=lambda messages: _record_replies(messages)
+)
+atexit.register(ingest_queue.close)
+
+# Webhook media is downloaded in the background and served from a local sha256 store
+media_store = BlobStore(
+    Config.MEDIA_STORE_DIR,
+    max_bytes=Config.MEDIA_STORE_MAX_MB * 1024 * 1024,
+    max_file_bytes=Config.MEDIA_MAX_FILE_MB * 1024 * 1024
+)
+media_fetcher = MediaFetcher(media_store, inbox_service, wait_for=lambda: ingest_queue.flush(timeout=10))
+atexit.register(media_fetcher.close)
+
+SHA256_HEX = re.compile(r'[0-9a-f]{64}')
 
 
 @inbox_bp.route('/conversations', methods=['GET'])
@@ -19,28 +56,45 @@ def get_conversations():
     
     Query params:
     - limit: number of conversations (default 50)
-    - offset: pagination offset (default 0)
+    - cursor: next_cursor of the previous page
+    - offset: pagination offset (default 0), ignored when a cursor is given
     - unread_only: only unread conversations (default false)
     """
     try:
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-        
-        conversations = inbox_service.get_conversations(
-            limit=limit,
-            offset=offset,
-            unread_only=unread_only
-        )
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        
+        if offset and not cursor:
+            # Old offset clients, no cursor handed out
+            conversations = inbox_service.get_conversations(
+                limit=limit,
+                offset=offset,
+                unread_only=unread_only
+            )
+            next_cursor = None
+        else:
+            page = inbox_service.get_conversations_page(
+                limit=limit,
+                cursor=cursor,
+                unread_only=unread_only
+            )
+            conversations, next_cursor = page['conversations'], page['next_cursor']
         
         return jsonify({
             'success': True,
             'conversations': [c.to_dict() for c in conversations],
             'count': len(conversations),
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting conversations: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -48,9 +102,21 @@ def get_conversations():
 
 @inbox_bp.route('/conversation/<conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
-    """Get single conversation met alle berichten"""
+    """Get single conversation met berichten
+    
+    Query params:
+    - limit: only the newest `limit` messages (default: all)
+    - before: next_cursor of the previous page, loads older messages
+    """
     try:
-        conversation = inbox_service.get_conversation(conversation_id)
+        limit = request.args.get('limit', type=int)
+        before = request.args.get('before')
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be at least 1')
+        if before and limit is None:
+            limit = 50
+        
+        conversation = inbox_service.get_conversation(conversation_id, limit=limit, before=before)
         
         if not conversation:
             return jsonify({
@@ -58,11 +124,13 @@ def get_conversation(conversation_id):
                 'error': 'Conversation not found'
             }), 404
         
-        return jsonify({
-            'success': True,
-            'conversation': conversation.to_dict()
-        })
+        # Built from JSON fragments: stored metadata/attachments aren't decoded and re-encoded
+        body = (f'{{"success": true, "conversation": {conversation.to_json()}, '
+                f'"next_cursor": {json.dumps(conversation.next_cursor)}}}')
+        return Response(body, mimetype='application/json')
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting conversation: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -106,6 +174,69 @@ def get_unread_count():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@inbox_bp.route('/media/<sha256>', methods=['GET'])
+def get_media(sha256):
+    """Attachment from the media store
+    
+    Content never changes for a sha256, so it is cacheable forever; supports
+    Range requests (video/audio seeking) and If-None-Match.
+    """
+    blob = media_store.get(sha256) if SHA256_HEX.fullmatch(sha256) else None
+    if blob is None:
+        return jsonify({'success': False, 'error': 'Media not found'}), 404
+    
+    try:
+        # send_file stats and opens the path before returning; once open, an
+        # eviction only unlinks the name
+        response = send_file(
+            blob['path'],
+            mimetype=blob['content_type'] or 'application/octet-stream',
+            conditional=True,
+            etag=sha256
+        )
+    except FileNotFoundError:
+        # Evicted between the lookup and send_file
+        return jsonify({'success': False, 'error': 'Media not found'}), 404
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@inbox_bp.route('/events', methods=['GET'])
+def stream_events():
+    """Live inbox updates as Server-Sent Events
+    
+    Events:
+    - hello: on connect, {unread_total}; (re)load the conversation list
+    - message: {message, practice_name, unread_delta, unread_total}
+    - read: {conversation_id, unread_delta, unread_total}
+    - resync: the client fell behind, reload
+    A comment line is sent every INBOX_EVENTS_HEARTBEAT seconds.
+    """
+    subscription = inbox_service.events.subscribe()
+    
+    def stream():
+        try:
+            yield _sse('hello', {'unread_total': inbox_service.get_unread_count()})
+            while True:
+                item = subscription.get(timeout=Config.INBOX_EVENTS_HEARTBEAT)
+                if item is None:
+                    yield ": ping\n\n"
+                else:
+                    yield _sse(*item)
+        finally:
+            # Client gone (write failed) or server shutting down
+            inbox_service.events.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @inbox_bp.route('/reply', methods=['POST'])
 def send_reply():
     """Send reply via specified channel
@@ -248,17 +379,19 @@ def send_reply():
 
 @inbox_bp.route('/search', methods=['GET'])
 def search_messages():
-    """Search messages
+    """Search messages, best match first with a highlighted snippet
     
     Query params:
-    - q: search query
+    - q: search query, all words must match, the last one as a prefix
     - channel: filter by channel (optional)
     - practice_id: filter by practice (optional)
+    - limit: max results (default 50, max 200)
     """
     try:
         query = request.args.get('q', '')
         channel = request.args.get('channel')
         practice_id = request.args.get('practice_id', type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
         
         if not query:
             return jsonify({
@@ -269,7 +402,8 @@ def search_messages():
         messages = inbox_service.search_messages(
             query=query,
             channel=channel,
-            practice_id=practice_id
+            practice_id=practice_id,
+            limit=limit
         )
         
         return jsonify({
@@ -283,6 +417,55 @@ def search_messages():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _fetch_media(message_id: str, media: list):
+    """Queue webhook media for download, only for requests signed by Twilio"""
+    if not media:
+        return
+    signature = request.headers.get('X-Twilio-Signature', '')
+    if not valid_twilio_signature(request.url, request.form.to_dict(), signature):
+        logger.warning(f"⚠️ Media of message {message_id} not fetched: invalid or missing X-Twilio-Signature")
+        return
+    media_fetcher.submit(message_id, media)
+
+
+def _practice_for_sender(phone: str) -> tuple:
+    """(practice_id, practice_name) of the practice listing this number (in-memory phone index)"""
+    practice = db.find_practice_by_phone(phone)
+    if practice is None:
+        logger.warning(f"⚠️ No practice with phone {phone}, filed under {UNKNOWN_PRACTICE_NAME}")
+        return UNKNOWN_PRACTICE_ID, UNKNOWN_PRACTICE_NAME
+    return practice['nr'], practice.get('naam') or practice.get('praktijk') or f"Praktijk {practice['nr']}"
+
+
+def _record_replies(messages: list):
+    """
+    Reply flag and lead score of the senders' practices (ingest writer thread)
+    
+    One patch per ingest batch, so a burst of replies costs one practices
+    write instead of one per webhook; several replies of one practice are
+    applied in order.
+    """
+    practices, changes = {}, {}
+    for message in messages:
+        nr = message['practice_id']
+        event = REPLY_EVENTS.get(message['channel'])
+        if message['direction'] != 'inbound' or event is None or nr == UNKNOWN_PRACTICE_ID:
+            continue
+        practice = practices.get(nr) or db.get_practice(nr)
+        if practice is None:
+            continue
+        practices[nr] = practice
+        changes.setdefault(nr, {}).update(LeadScoringService.record_event(practice, event, now=message['timestamp']))
+    if not changes:
+        return
+    
+    # Written as a patch so it can't overwrite other fields
+    results = db.patch_practices([{'nr': nr, 'set': fields} for nr, fields in changes.items()])
+    for result in results:
+        if not result['success']:
+            logger.warning(f"⚠️ Reply of practice {result['nr']} not recorded: {result.get('error')}")
+
+
 @inbox_bp.route('/webhook/sms', methods=['POST'])
 def sms_webhook():
     """Webhook voor inbound SMS berichten"""
@@ -294,12 +477,11 @@ def sms_webhook():
         message_sid = data.get('MessageSid', '')
         
         # Find practice by phone number
-        # TODO: implement phone lookup
-        practice_id = 1  # Placeholder
-        practice_name = "Practice"
+        practice_id, practice_name = _practice_for_sender(from_number)
         
-        # Add to inbox
-        inbox_service.add_message(
+        # Queue for the inbox writer, media is fetched in the background
+        media = webhook_media(data)
+        message_id = ingest_queue.submit(
             practice_id=practice_id,
             practice_name=practice_name,
             channel='sms',
@@ -307,9 +489,11 @@ def sms_webhook():
             content=message_body,
             sender=from_number,
             recipient='You',
-            message_id=message_sid,
-            status='received'
+            message_id=message_sid or None,
+            status='received',
+            attachments=media
         )
+        _fetch_media(message_id, media)
         
         logger.info(f"✅ Inbound SMS received from {from_number}")
         
@@ -331,12 +515,11 @@ def whatsapp_webhook():
         message_sid = data.get('MessageSid', '')
         
         # Find practice by phone number
-        # TODO: implement phone lookup
-        practice_id = 1  # Placeholder
-        practice_name = "Practice"
+        practice_id, practice_name = _practice_for_sender(from_number)
         
-        # Add to inbox
-        inbox_service.add_message(
+        # Queue for the inbox writer, media is fetched in the background
+        media = webhook_media(data)
+        message_id = ingest_queue.submit(
             practice_id=practice_id,
             practice_name=practice_name,
             channel='whatsapp',
@@ -344,9 +527,11 @@ def whatsapp_webhook():
             content=message_body,
             sender=from_number,
             recipient='You',
-            message_id=message_sid,
-            status='received'
+            message_id=message_sid or None,
+            status='received',
+            attachments=media
         )
+        _fetch_media(message_id, media)
         
         logger.info(f"✅ Inbound WhatsApp received from {from_number}")
         
@@ -2,12 +2,15 @@
 from flask import Blueprint, jsonify, request
 import logging
 
+from backend.services.database import get_database
+from backend.services.lead_scoring import LeadScoringService
 from backend.services.scraper import ScraperService
 
 leads_bp = Blueprint('leads', __name__)
 logger = logging.getLogger(__name__)
 
 scraper = ScraperService()
+db = get_database()
 
 
 @leads_bp.route('/leads/search', methods=['POST'])
@@ -26,6 +29,36 @@ def find_leads():
         return jsonify({"error": str(e)}), 500
 
 
+@leads_bp.route('/leads/import', methods=['POST'])
+def import_leads():
+    """Add lead search results as practices, one nr reservation for the whole batch"""
+    leads = (request.json or {}).get('leads') or []
+    
+    if not leads:
+        return jsonify({"error": "Geen leads om toe te voegen"}), 400
+    
+    practices = []
+    for nr, lead in zip(db.reserve_nrs(len(leads)), leads):
+        practices.append({
+            **lead,
+            'nr': nr,
+            'status': lead.get('status', 'Nog niet benaderd'),
+            'workflow': {
+                'emails_sent': 0,
+                'last_contact': None,
+                'status': 'Nieuw',
+                'next_action': 'Initial Outreach'
+            }
+        })
+    
+    # Scored right away so the score index lists them
+    LeadScoringService.refresh_scores(practices)
+    result = db.bulk_upsert(practices)
+    if not result['success']:
+        return jsonify({"error": "Failed to save practices"}), 500
+    return jsonify(practices), 201
+
+
 @leads_bp.route('/leads/scrape', methods=['POST'])
 def scrape_practice():
     """Scrape details for specific practice"""
@@ -4,15 +4,16 @@ Pipeline API endpoints
 from flask import Blueprint, jsonify, request
 import logging
 
-from backend.services.database import DatabaseService
+from backend.services.database import get_database
 from backend.services.pipeline import PipelineService
 from backend.services.lead_scoring import LeadScoringService
 from backend.services.automation_engine import AutomationEngine
+from backend.services.practice_query import decode_cursor, encode_cursor
 
 pipeline_bp = Blueprint('pipeline', __name__)
 logger = logging.getLogger(__name__)
 
-db = DatabaseService()
+db = get_database()
 
 
 @pipeline_bp.route('/pipeline/stages', methods=['GET'])
@@ -24,10 +25,9 @@ def get_stages():
 
 @pipeline_bp.route('/pipeline/summary', methods=['GET'])
 def get_pipeline_summary():
-    """Get pipeline summary with deal counts and values"""
+    """Get pipeline summary with deal counts and values, from the maintained stage counters"""
     try:
-        practices = db.get_practices()
-        summary = PipelineService.get_pipeline_summary(practices)
+        summary = PipelineService.summary_from_totals(db.stage_totals())
         return jsonify(summary)
     except Exception as e:
         logger.error(f"Pipeline summary error: {e}")
@@ -36,9 +36,12 @@ def get_pipeline_summary():
 
 @pipeline_bp.route('/pipeline/deals', methods=['GET'])
 def get_deals_by_stage():
-    """Get all deals grouped by stage"""
+    """Get all deals grouped by stage (full records; the Kanban board pages /pipeline/board)"""
     try:
         stage_id = request.args.get('stage')
+        if stage_id:
+            return jsonify(db.find_practices('stage', stage_id))
+        
         practices = db.get_practices()
         
         # Group by stage
@@ -51,9 +54,6 @@ def get_deals_by_stage():
             if current_stage in deals_by_stage:
                 deals_by_stage[current_stage].append(practice)
         
-        if stage_id:
-            return jsonify(deals_by_stage.get(stage_id, []))
-        
         return jsonify(deals_by_stage)
     
     except Exception as e:
@@ -61,6 +61,68 @@ def get_deals_by_stage():
         return jsonify({'error': str(e)}), 500
 
 
+def _board_column(stage_id: str, totals: dict, limit: int, after=None) -> dict:
+    """One Kanban column: totals from the stage counters and a page of deal cards"""
+    practices = db.stage_page(stage_id, after, limit + 1)
+    next_cursor = None
+    if len(practices) > limit:
+        practices = practices[:limit]
+        next_cursor = encode_cursor([practices[-1]['nr']])
+    stage_totals = totals.get(stage_id, {})
+    return {
+        'count': stage_totals.get('count', 0),
+        'value': round(stage_totals.get('value', 0), 2),
+        'weighted_value': round(stage_totals.get('weighted', 0), 2),
+        'cards': [PipelineService.deal_card(p) for p in practices],
+        'next_cursor': next_cursor
+    }
+
+
+@pipeline_bp.route('/pipeline/board', methods=['GET'])
+def get_board():
+    """
+    Kanban board: the first page of deal cards of every stage with its totals
+    
+    Query: limit (cards per column, default 20, max 100)
+    Each column pages on through /pipeline/board/<stage>?cursor=<next_cursor>.
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        totals = db.stage_totals()
+        return jsonify({
+            'stages': {stage['id']: _board_column(stage['id'], totals, limit)
+                       for stage in PipelineService.DEFAULT_STAGES}
+        })
+    except Exception as e:
+        logger.error(f"Board error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@pipeline_bp.route('/pipeline/board/<stage_id>', methods=['GET'])
+def get_board_column(stage_id):
+    """
+    Next page of one Kanban column
+    
+    Query: cursor (next_cursor of the previous page), limit (default 20, max 100)
+    """
+    if not PipelineService.get_stage_by_id(stage_id):
+        return jsonify({'error': f'Invalid stage: {stage_id}'}), 404
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor, size=1)[0] if cursor else None
+        if after is not None and not isinstance(after, int):
+            raise ValueError('invalid cursor')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        return jsonify({'stage': stage_id, **_board_column(stage_id, db.stage_totals(), limit, after)})
+    except Exception as e:
+        logger.error(f"Board column error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @pipeline_bp.route('/pipeline/move', methods=['POST'])
 def move_deal():
     """
@@ -90,9 +152,8 @@ def move_deal():
         # Move to new stage
         updated_practice = PipelineService.move_deal(practice, to_stage, reason)
         
-        # Update lead score
-        score_data = LeadScoringService.calculate_score(updated_practice)
-        updated_practice['score'] = score_data
+        # The stage isn't a scoring input: only score when missing or its recency bucket ended
+        LeadScoringService.refresh_scores([updated_practice])
         
         # Save
         db.upsert_practice(updated_practice)
@@ -129,10 +190,9 @@ def get_stalled_deals():
 
 @pipeline_bp.route('/pipeline/forecast', methods=['GET'])
 def get_revenue_forecast():
-    """Get revenue forecast based on pipeline"""
+    """Get revenue forecast based on pipeline, from the maintained stage counters"""
     try:
-        practices = db.get_practices()
-        forecast = PipelineService.forecast_revenue(practices)
+        forecast = PipelineService.forecast_from_totals(db.stage_totals())
         return jsonify(forecast)
     except Exception as e:
         logger.error(f"Forecast error: {e}")
@@ -147,10 +207,8 @@ def calculate_lead_score(practice_id):
         if not practice:
             return jsonify({'error': 'Practice not found'}), 404
         
-        score_data = LeadScoringService.calculate_score(practice)
-        practice['score'] = score_data
-        
-        db.upsert_practice(practice)
+        score_data = LeadScoringService.rescore(practice)
+        db.patch_practices([{'nr': practice_id, 'set': {'score': score_data}}])
         
         return jsonify({
             'success': True,
@@ -163,11 +221,16 @@ def calculate_lead_score(practice_id):
 
 @pipeline_bp.route('/leads/hot', methods=['GET'])
 def get_hot_leads():
-    """Get hot leads (score >= 75)"""
+    """Get hot leads (score >= 75) from the score index, optionally per gemeente"""
     try:
         limit = int(request.args.get('limit', 10))
-        practices = db.get_practices()
-        hot_leads = LeadScoringService.get_hot_leads(practices, limit)
+        gemeente = request.args.get('gemeente')
+        hot_leads = LeadScoringService.top_leads(
+            lambda n: db.top_k('hot', n, gemeente=gemeente),
+            'hot',
+            limit,
+            save=lambda due: db.patch_practices([{'nr': p['nr'], 'set': {'score': p['score']}} for p in due])
+        )
         
         return jsonify({
             'count': len(hot_leads),
@@ -180,10 +243,10 @@ def get_hot_leads():
 
 @pipeline_bp.route('/leads/attention', methods=['GET'])
 def get_leads_needing_attention():
-    """Get leads that need immediate attention"""
+    """Get leads that need immediate attention, from the stored scores"""
     try:
         practices = db.get_practices()
-        attention_leads = LeadScoringService.needs_attention(practices)
+        attention_leads = LeadScoringService.stored_needs_attention(practices)
         
         return jsonify({
             'count': len(attention_leads),
@@ -194,6 +257,58 @@ def get_leads_needing_attention():
         return jsonify({'error': str(e)}), 500
 
 
+@pipeline_bp.route('/leads/<int:practice_id>/score-history', methods=['GET'])
+def get_score_history(practice_id):
+    """
+    Score history of a lead: stored points, sparkline and velocity
+    
+    Query: days (sparkline length, default 30), window (velocity days, default 7)
+    """
+    try:
+        days = min(int(request.args.get('days', 30)), 366)
+        window = int(request.args.get('window', 7))
+        history = db.score_history
+        
+        return jsonify({
+            'practice_id': practice_id,
+            'points': history.series(practice_id),
+            'sparkline': history.sparkline(practice_id, days),
+            'velocity': history.velocity(practice_id, window)
+        })
+    except Exception as e:
+        logger.error(f"Score history error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@pipeline_bp.route('/leads/movers', methods=['GET'])
+def get_score_movers():
+    """
+    Leads whose score moved most
+    
+    Query: days (default 7), limit (default 10), direction ('up', 'down' or both)
+    """
+    try:
+        days = int(request.args.get('days', 7))
+        limit = int(request.args.get('limit', 10))
+        direction = request.args.get('direction')
+        if direction not in (None, 'up', 'down'):
+            return jsonify({'error': "direction must be 'up' or 'down'"}), 400
+        
+        movers = db.score_history.movers(days, limit, direction)
+        for mover in movers:
+            practice = db.get_practice(mover['nr']) or {}
+            mover['naam'] = practice.get('naam')
+            mover['gemeente'] = practice.get('gemeente')
+        
+        return jsonify({
+            'count': len(movers),
+            'movers': movers
+        })
+    except Exception as e:
+        logger.error(f"Score movers error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @pipeline_bp.route('/automation/trigger', methods=['POST'])
 def trigger_automation():
     """
@@ -217,6 +332,10 @@ def trigger_automation():
         if not practice:
             return jsonify({'error': 'Practice not found'}), 404
         
+        # Workflow flags and lead score first, the rules check them
+        if event in LeadScoringService.EVENTS:
+            LeadScoringService.record_event(practice, event)
+        
         # Process event and trigger automations
         result = AutomationEngine.process_event(practice, event)
         
@@ -238,7 +357,10 @@ def get_pending_automations():
     """Get all pending automated actions"""
     try:
         practices = db.get_practices()
-        pending_actions = AutomationEngine.get_pending_actions(practices)
+        # hot_lead_no_contact only needs the hot score range of the index
+        hot_leads = db.scored_practices(75, 100)
+        LeadScoringService.refresh_scores(hot_leads)
+        pending_actions = AutomationEngine.get_pending_actions(practices, hot_leads=hot_leads)
         
         return jsonify({
             'count': len(pending_actions),
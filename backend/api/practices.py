@@ -1,33 +1,57 @@
 """Practice management API endpoints"""
 from flask import Blueprint, jsonify, request
-from datetime import datetime
 
-from backend.services.database import DatabaseService
+from backend.services.database import get_database
+from backend.services.lead_scoring import LeadScoringService
+from backend.services.practice_patch import validate_operations
 
 practices_bp = Blueprint('practices', __name__)
-db = DatabaseService()
+db = get_database()
+
+
+def _list_arg(name):
+    """Comma separated query parameter as a list (None when absent)"""
+    value = request.args.get(name)
+    return [v for v in value.split(',') if v] if value else None
 
 
 @practices_bp.route('/practices', methods=['GET'])
 def get_practices():
-    """Get all practices"""
-    practices = db.get_practices()
+    """
+    Get practices
+    
+    Query params (all optional):
+        status, gemeente, stage: comma separated, match any
+        min_score, max_score: lead score range
+        q: free text over naam, gemeente, email, tel, adres
+        sort: nr (default), naam, gemeente, status, stage or score; '-score' for descending
+        limit, cursor: keyset pagination, response becomes
+            {'practices': [...], 'total': n, 'next_cursor': str or None}
+        fields: comma separated fields to return (nr is always included)
     
-    # Normalize data for frontend
-    for p in practices:
-        # Map 'gem' to 'gemeente' if missing
-        if 'gemeente' not in p and 'gem' in p:
-            p['gemeente'] = p['gem']
-            
-        # Ensure 'naam' uses 'praktijk' if available and 'naam' is generic or missing
-        if 'praktijk' in p and (not p.get('naam') or p.get('naam') == 'Team'):
-            p['naam'] = p['praktijk']
-            
-        # Map 'notitie' to 'adres' if 'adres' is missing (heuristic)
-        if 'adres' not in p and 'notitie' in p:
-            p['adres'] = p['notitie']
-
-    return jsonify(practices)
+    Without limit/cursor the response is a plain list, as before.
+    """
+    try:
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        result = db.query_practices(
+            status=_list_arg('status'),
+            gemeente=_list_arg('gemeente'),
+            stage=_list_arg('stage'),
+            min_score=request.args.get('min_score', type=float),
+            max_score=request.args.get('max_score', type=float),
+            q=request.args.get('q'),
+            sort=request.args.get('sort', 'nr'),
+            limit=limit,
+            cursor=cursor,
+            fields=_list_arg('fields')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if limit is None and cursor is None:
+        return jsonify(result['practices'])
+    return jsonify(result)
 
 
 @practices_bp.route('/practices', methods=['POST'])
@@ -36,9 +60,7 @@ def add_practice():
     new_practice = request.json
     
     if 'nr' not in new_practice:
-        all_practices = db.get_practices()
-        max_id = max([p.get('nr', 0) for p in all_practices]) if all_practices else 0
-        new_practice['nr'] = max_id + 1
+        new_practice['nr'] = db.allocate_nr()
     
     if 'workflow' not in new_practice:
         new_practice['workflow'] = {
@@ -48,12 +70,38 @@ def add_practice():
             'next_action': 'Initial Outreach'
         }
     
+    # Scored right away so the score index lists it
+    if 'score' not in new_practice:
+        LeadScoringService.rescore(new_practice)
+    
     success = db.upsert_practice(new_practice)
     if success:
         return jsonify(new_practice), 201
     return jsonify({'error': 'Failed to save practice'}), 500
 
 
+@practices_bp.route('/practices/batch', methods=['PATCH'])
+def patch_practices():
+    """
+    Partial updates of many practices in one write
+    
+    Body: [{"nr": 1, "set": {"workflow.replied": true}, "append": {"communication_history": {...}}}, ...]
+    (or {"operations": [...]})
+    
+    Returns per-item results: {'results': [{'nr', 'success', 'error'?}], 'updated': n, 'failed': n}
+    """
+    data = request.json
+    operations = data.get('operations') if isinstance(data, dict) else data
+    try:
+        validate_operations(operations)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    results = db.patch_practices(operations)
+    updated = sum(1 for r in results if r['success'])
+    return jsonify({'results': results, 'updated': updated, 'failed': len(results) - updated})
+
+
 @practices_bp.route('/practices/<int:practice_id>', methods=['GET'])
 def get_practice(practice_id):
     """Get specific practice"""
@@ -71,8 +119,13 @@ def update_practice(practice_id):
         return jsonify({'error': 'Practice not found'}), 404
     
     updates = request.json
+    inputs = LeadScoringService.score_inputs(practice)
     practice.update(updates)
     
+    # Edited email, tel, website, artsen or workflow: the stored score no longer holds
+    if LeadScoringService.score_inputs(practice) != inputs:
+        LeadScoringService.rescore(practice)
+    
     success = db.upsert_practice(practice)
     if success:
         return jsonify(practice)
@@ -98,11 +151,7 @@ def mark_replied(practice_id):
     practice = db.get_practice(practice_id)
     
     if practice:
-        if 'workflow' not in practice:
-            practice['workflow'] = {}
-        
-        practice['workflow']['replied'] = True
-        practice['workflow']['reply_date'] = datetime.now().isoformat()
+        LeadScoringService.record_event(practice, 'email_replied')
         practice['status'] = 'Lead'
         
         db.upsert_practice(practice)
@@ -7,31 +7,14 @@ import logging
 from datetime import datetime
 
 from backend.services.sms_service import SMSService, get_templates, get_template
-from backend.services.database import DatabaseService
+from backend.services.database import get_database
+from backend.services.lead_scoring import LeadScoringService
 
 logger = logging.getLogger(__name__)
 
 sms_bp = Blueprint('sms', __name__)
 sms_service = SMSService()
-db = DatabaseService()
-
-
-def normalize_phone_number(phone: str) -> str:
-    """Normalize phone number to E.164 format for matching"""
-    if not phone:
-        return ""
-    
-    # Remove all non-digit characters except +
-    cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
-    
-    # If no country code, assume Belgian number
-    if not cleaned.startswith('+'):
-        if cleaned.startswith('0'):
-            cleaned = '+32' + cleaned[1:]
-        else:
-            cleaned = '+32' + cleaned
-    
-    return cleaned
+db = get_database()
 
 
 @sms_bp.route('/sms/status', methods=['GET'])
@@ -130,26 +113,26 @@ def send_bulk_sms():
         campaign_id=campaign_id
     )
     
-    # Update practices with communication history
-    for sms_result in result['results']:
-        if sms_result.get('success') and sms_result.get('practice_id'):
-            practice = db.get_practice(sms_result['practice_id'])
-            if practice:
-                if 'communication_history' not in practice:
-                    practice['communication_history'] = []
-                
-                practice['communication_history'].append({
-                    'type': 'sms',
-                    'direction': 'outbound',
-                    'message': sms_result['message'],
-                    'to': sms_result['to_number'],
-                    'message_sid': sms_result['message_sid'],
-                    'status': sms_result['status'],
-                    'sent_at': sms_result['sent_at'],
-                    'campaign_id': campaign_id
-                })
-                
-                db.upsert_practice(practice)
+    # Update practices with communication history, one write for the whole batch
+    operations = [
+        {
+            'nr': sms_result['practice_id'],
+            'append': {'communication_history': {
+                'type': 'sms',
+                'direction': 'outbound',
+                'message': sms_result['message'],
+                'to': sms_result['to_number'],
+                'message_sid': sms_result['message_sid'],
+                'status': sms_result['status'],
+                'sent_at': sms_result['sent_at'],
+                'campaign_id': campaign_id
+            }}
+        }
+        for sms_result in result['results']
+        if sms_result.get('success') and sms_result.get('practice_id')
+    ]
+    if operations:
+        db.patch_practices(operations)
     
     return jsonify(result), 200
 
@@ -283,16 +266,8 @@ def sms_webhook():
         # This is an incoming message (reply)
         logger.info(f"Incoming SMS from {from_number}: {body}")
         
-        # Normalize the incoming phone number for matching
-        normalized_from = normalize_phone_number(from_number)
-        
-        # Find practice by phone number
-        practices = db.get_practices()
-        practice = next(
-            (p for p in practices 
-             if normalize_phone_number(p.get('tel', '')) == normalized_from),
-            None
-        )
+        # Find practice by phone number (reverse index, normalized E.164)
+        practice = db.find_practice_by_phone(from_number)
         
         if practice:
             # Add to communication history
@@ -309,12 +284,8 @@ def sms_webhook():
                 'received_at': datetime.now().isoformat()
             })
             
-            # Mark as replied in workflow
-            if 'workflow' not in practice:
-                practice['workflow'] = {}
-            
-            practice['workflow']['sms_replied'] = True
-            practice['workflow']['last_sms_reply'] = datetime.now().isoformat()
+            # Mark as replied in workflow, rescores the lead
+            LeadScoringService.record_event(practice, 'sms_replied')
             
             db.upsert_practice(practice)
             
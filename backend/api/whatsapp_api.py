@@ -12,34 +12,14 @@ from backend.services.whatsapp_service import (
     get_whatsapp_template,
     get_approved_templates
 )
-from backend.services.database import DatabaseService
+from backend.services.database import get_database
+from backend.services.lead_scoring import LeadScoringService
 
 logger = logging.getLogger(__name__)
 
 whatsapp_bp = Blueprint('whatsapp', __name__)
 whatsapp_service = WhatsAppService()
-db = DatabaseService()
-
-
-def normalize_phone_number(phone: str) -> str:
-    """Normalize phone number to E.164 format for matching"""
-    if not phone:
-        return ""
-    
-    # Remove whatsapp: prefix if present
-    phone = phone.replace('whatsapp:', '')
-    
-    # Remove all non-digit characters except +
-    cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
-    
-    # If no country code, assume Belgian number
-    if not cleaned.startswith('+'):
-        if cleaned.startswith('0'):
-            cleaned = '+32' + cleaned[1:]
-        else:
-            cleaned = '+32' + cleaned
-    
-    return cleaned
+db = get_database()
 
 
 @whatsapp_bp.route('/whatsapp/status', methods=['GET'])
@@ -206,27 +186,27 @@ def send_bulk_whatsapp():
         media_url=media_url
     )
     
-    # Update practices with communication history
-    for wa_result in result['results']:
-        if wa_result.get('success') and wa_result.get('practice_id'):
-            practice = db.get_practice(wa_result['practice_id'])
-            if practice:
-                if 'communication_history' not in practice:
-                    practice['communication_history'] = []
-                
-                practice['communication_history'].append({
-                    'type': 'whatsapp',
-                    'direction': 'outbound',
-                    'message': wa_result['message'],
-                    'to': wa_result['to_number'],
-                    'message_sid': wa_result['message_sid'],
-                    'status': wa_result['status'],
-                    'media_url': media_url,
-                    'sent_at': wa_result['sent_at'],
-                    'campaign_id': campaign_id
-                })
-                
-                db.upsert_practice(practice)
+    # Update practices with communication history, one write for the whole batch
+    operations = [
+        {
+            'nr': wa_result['practice_id'],
+            'append': {'communication_history': {
+                'type': 'whatsapp',
+                'direction': 'outbound',
+                'message': wa_result['message'],
+                'to': wa_result['to_number'],
+                'message_sid': wa_result['message_sid'],
+                'status': wa_result['status'],
+                'media_url': media_url,
+                'sent_at': wa_result['sent_at'],
+                'campaign_id': campaign_id
+            }}
+        }
+        for wa_result in result['results']
+        if wa_result.get('success') and wa_result.get('practice_id')
+    ]
+    if operations:
+        db.patch_practices(operations)
     
     return jsonify(result), 200
 
@@ -347,16 +327,8 @@ def whatsapp_webhook():
     if body and from_number and from_number.startswith('whatsapp:'):
         logger.info(f"Incoming WhatsApp from {from_number}: {body}")
         
-        # Extract and normalize phone number
-        normalized_from = normalize_phone_number(from_number)
-        
-        # Find practice by phone number with proper normalization
-        practices = db.get_practices()
-        practice = next(
-            (p for p in practices 
-             if normalize_phone_number(p.get('tel', '')) == normalized_from),
-            None
-        )
+        # Find practice by phone number (reverse index, normalized E.164)
+        practice = db.find_practice_by_phone(from_number)
         
         if practice:
             # Add to communication history
@@ -388,12 +360,8 @@ def whatsapp_webhook():
             
             practice['communication_history'].append(message_data)
             
-            # Mark as replied in workflow
-            if 'workflow' not in practice:
-                practice['workflow'] = {}
-            
-            practice['workflow']['whatsapp_replied'] = True
-            practice['workflow']['last_whatsapp_reply'] = datetime.now().isoformat()
+            # Mark as replied in workflow, rescores the lead
+            LeadScoringService.record_event(practice, 'whatsapp_replied')
             
             db.upsert_practice(practice)
             
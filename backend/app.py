@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.config import Config
 from backend.api import register_blueprints
+from backend.services.http_cache import ResponseLayer
 
 # Ensure log directory exists before configuring logging
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,33 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def init_response_layer(app) -> ResponseLayer:
+    """Version the polled read endpoints by the change counters of their data"""
+    from backend.services.database import get_database
+    from backend.api.inbox_api import inbox_service
+    
+    db = get_database()
+    
+    def practices_version():
+        # Supabase changes don't go through the local store, can't be versioned
+        return None if db.supabase_client else db.store.version
+    
+    layer = ResponseLayer(
+        min_size=app.config['HTTP_COMPRESS_MIN_SIZE'],
+        conditional=app.config['HTTP_CONDITIONAL_GET']
+    )
+    layer.register('practices.get_practices', practices_version)
+    layer.register('pipeline.get_deals_by_stage', practices_version)
+    layer.register('pipeline.get_pipeline_summary', practices_version)
+    layer.register('pipeline.get_revenue_forecast', practices_version)
+    layer.register('pipeline.get_board', practices_version)
+    layer.register('pipeline.get_board_column', practices_version)
+    layer.register('campaigns.get_campaign_stats', practices_version)
+    layer.register('inbox.get_conversations', lambda: inbox_service.version)
+    layer.init_app(app)
+    return layer
+
+
 def create_app(config_class=Config):
     """Application factory pattern"""
     app = Flask(__name__)
@@ -36,7 +64,7 @@ def create_app(config_class=Config):
     CORS(app, resources={
         r"/api/*": {
             "origins": ["http://localhost:3000", "http://localhost:5173"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"]
         }
     })
@@ -44,6 +72,9 @@ def create_app(config_class=Config):
     # Register API blueprints
     register_blueprints(app)
     
+    # ETag/304 and compression for the endpoints the frontend polls
+    response_layer = init_response_layer(app)
+    
     # Initialize WebSocket
     from flask_sock import Sock
     sock = Sock(app)
@@ -63,6 +94,10 @@ def create_app(config_class=Config):
     def health():
         return {'status': 'healthy', 'version': '0.1.0'}
     
+    @app.route('/api/metrics/http')
+    def http_metrics():
+        return {'endpoints': response_layer.metrics()}
+    
     return app
 
 
@@ -11,9 +11,36 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'False') == 'True'
     
     # Database
+    # Practice storage: auto (Supabase if configured, else JSON), supabase, json or sqlite
+    PRACTICE_STORAGE = os.getenv('PRACTICE_STORAGE', 'auto').lower()
+    PRACTICE_DB_FILE = os.getenv('PRACTICE_DB_FILE', 'data/practices.db')
+    # Lead score history (day, score per practice), kept out of the practice records
+    SCORE_HISTORY_DB = os.getenv('SCORE_HISTORY_DB', 'data/score_history.db')
     DATA_FILE = 'data/practices.json'
     EMAIL_LOGS_FILE = 'data/email_logs.json'
     
+    # JSON practice journal (append-only log + periodic snapshot compaction)
+    PRACTICE_JOURNAL = os.getenv('PRACTICE_JOURNAL', 'False') == 'True'
+    PRACTICE_JOURNAL_COMPACT_RECORDS = int(os.getenv('PRACTICE_JOURNAL_COMPACT_RECORDS', 500))
+    PRACTICE_JOURNAL_COMPACT_INTERVAL = int(os.getenv('PRACTICE_JOURNAL_COMPACT_INTERVAL', 60))
+    
+    # HTTP responses: ETag/304 for polled read endpoints, compress bodies from this size
+    HTTP_CONDITIONAL_GET = os.getenv('HTTP_CONDITIONAL_GET', 'True') == 'True'
+    HTTP_COMPRESS_MIN_SIZE = int(os.getenv('HTTP_COMPRESS_MIN_SIZE', 1024))
+    
+    # Inbox webhooks: queued and group-committed by one writer thread
+    # Durability: async (ack when queued), commit (ack after commit) or fsync (commit + synchronous=FULL)
+    INBOX_INGEST_DURABILITY = os.getenv('INBOX_INGEST_DURABILITY', 'async').lower()
+    INBOX_INGEST_BATCH = int(os.getenv('INBOX_INGEST_BATCH', 200))
+    # Live inbox stream (/api/inbox/events): seconds between keep-alive comments
+    INBOX_EVENTS_HEARTBEAT = int(os.getenv('INBOX_EVENTS_HEARTBEAT', 15))
+    # scripts/archive_inbox.py moves messages older than this into yearly archive files
+    INBOX_ARCHIVE_AFTER_DAYS = int(os.getenv('INBOX_ARCHIVE_AFTER_DAYS', 180))
+    # Webhook media, stored by sha256 and evicted least-recently-used past MEDIA_STORE_MAX_MB
+    MEDIA_STORE_DIR = os.getenv('MEDIA_STORE_DIR', 'data/media')
+    MEDIA_STORE_MAX_MB = int(os.getenv('MEDIA_STORE_MAX_MB', 2048))
+    MEDIA_MAX_FILE_MB = int(os.getenv('MEDIA_MAX_FILE_MB', 25))
+    
     # Email Provider
     EMAIL_PROVIDER = os.getenv('EMAIL_PROVIDER', 'sendgrid')
     
@@ -45,6 +72,14 @@ class Config:
     # Supabase
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+    SUPABASE_PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', 1000))
+    SUPABASE_UPSERT_BATCH_SIZE = int(os.getenv('SUPABASE_UPSERT_BATCH_SIZE', 500))
+    # Webhook phone matching on Supabase: reload the phone index after this many seconds
+    PHONE_INDEX_TTL = int(os.getenv('PHONE_INDEX_TTL', 300))
+    # Hot leads / score ranges on Supabase: reload the score index after this many seconds
+    SCORE_INDEX_TTL = int(os.getenv('SCORE_INDEX_TTL', 300))
+    # Pipeline summary/forecast on Supabase: recount the stage counters after this many seconds
+    STAGE_COUNTERS_TTL = int(os.getenv('STAGE_COUNTERS_TTL', 300))
     
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
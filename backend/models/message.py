@@ -2,11 +2,52 @@
 Message model voor unified inbox
 Ondersteunt Email, SMS en WhatsApp berichten
 """
+import json
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
+
+
+def _load_json(raw: Optional[str], empty: type):
+    """Decode a JSON column, the usual empty values without parsing"""
+    if not raw or raw == '{}' or raw == '[]' or raw == 'null':
+        return empty()
+    return json.loads(raw)
+
+
+def _json_text(value, empty: str) -> str:
+    """JSON text of a JSON column: stored text passed through, decoded values encoded"""
+    if isinstance(value, str):
+        return empty if not value or value == 'null' else value
+    return json.dumps(value) if value else empty
+
+
+def _isoformat(value: Union[str, datetime]) -> str:
+    """Stored timestamps already are isoformat strings, pass them through"""
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _datetime(value: Union[str, datetime]) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
 
 class Message:
-    """Unified message model voor alle communicatie channels"""
+    """
+    Unified message model voor alle communicatie channels
+    
+    Slotted and row-backed: timestamp, metadata and attachments may be passed
+    as the raw sqlite values (isoformat string, JSON text) and are only
+    decoded when the attribute is read. to_json() writes the stored
+    timestamp and JSON text into the response as they are, so rendering a
+    thread neither parses timestamps nor decodes and re-encodes metadata.
+    """
+    
+    __slots__ = ('id', 'conversation_id', 'practice_id', 'channel', 'direction', 'content',
+                 'sender', 'recipient', 'status', 'read', 'snippet',
+                 '_timestamp', '_metadata', '_attachments')
+    
+    # messages columns in constructor order, see from_row()
+    COLUMNS = ('id', 'conversation_id', 'practice_id', 'channel', 'direction', 'content',
+               'sender', 'recipient', 'timestamp', 'status', 'metadata', 'read', 'attachments')
     
     def __init__(
         self,
@@ -18,11 +59,12 @@ class Message:
         content: str,
         sender: str,
         recipient: str,
-        timestamp: datetime,
+        timestamp: Union[datetime, str],
         status: str = 'sent',
-        metadata: Optional[Dict[str, Any]] = None,
+        metadata: Union[Dict[str, Any], str, None] = None,
         read: bool = False,
-        attachments: Optional[list] = None
+        attachments: Union[list, str, None] = None,
+        snippet: Optional[str] = None
     ):
         self.id = id
         self.conversation_id = conversation_id
@@ -32,15 +74,51 @@ class Message:
         self.content = content
         self.sender = sender
         self.recipient = recipient
-        self.timestamp = timestamp
+        self._timestamp = timestamp
         self.status = status
-        self.metadata = metadata or {}
-        self.read = read
-        self.attachments = attachments or []
+        self._metadata = metadata
+        self.read = bool(read)
+        self._attachments = attachments
+        # Search hit context, only set on search results
+        self.snippet = snippet
+    
+    @classmethod
+    def from_row(cls, row) -> 'Message':
+        """Message from a row selecting COLUMNS (plus an optional snippet)"""
+        return cls(*row)
+    
+    @property
+    def timestamp(self) -> datetime:
+        self._timestamp = _datetime(self._timestamp)
+        return self._timestamp
+    
+    @timestamp.setter
+    def timestamp(self, value: Union[datetime, str]):
+        self._timestamp = value
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if not isinstance(self._metadata, dict):
+            self._metadata = _load_json(self._metadata, dict)
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value: Union[Dict[str, Any], str, None]):
+        self._metadata = value
+    
+    @property
+    def attachments(self) -> list:
+        if not isinstance(self._attachments, list):
+            self._attachments = _load_json(self._attachments, list)
+        return self._attachments
+    
+    @attachments.setter
+    def attachments(self, value: Union[list, str, None]):
+        self._attachments = value
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary voor API responses"""
-        return {
+        data = {
             'id': self.id,
             'conversation_id': self.conversation_id,
             'practice_id': self.practice_id,
@@ -49,12 +127,35 @@ class Message:
             'content': self.content,
             'sender': self.sender,
             'recipient': self.recipient,
-            'timestamp': self.timestamp.isoformat(),
+            'timestamp': _isoformat(self._timestamp),
             'status': self.status,
             'metadata': self.metadata,
             'read': self.read,
             'attachments': self.attachments
         }
+        if self.snippet is not None:
+            data['snippet'] = self.snippet
+        return data
+    
+    def to_json(self) -> str:
+        """to_dict() as JSON text; stored metadata/attachments JSON is spliced in undecoded"""
+        data = {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'practice_id': self.practice_id,
+            'channel': self.channel,
+            'direction': self.direction,
+            'content': self.content,
+            'sender': self.sender,
+            'recipient': self.recipient,
+            'timestamp': _isoformat(self._timestamp),
+            'status': self.status,
+            'read': self.read
+        }
+        if self.snippet is not None:
+            data['snippet'] = self.snippet
+        return (f'{json.dumps(data)[:-1]}, "metadata": {_json_text(self._metadata, "{}")}, '
+                f'"attachments": {_json_text(self._attachments, "[]")}}}')
     
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> 'Message':
@@ -64,29 +165,68 @@ class Message:
 
 
 class Conversation:
-    """Conversation aggregates messages per practice"""
+    """
+    Conversation aggregates messages per practice
+    
+    Like Message, channels (JSON text) and created_at/updated_at (isoformat
+    strings) can be passed straight from the row and are decoded on access.
+    """
+    
+    __slots__ = ('id', 'practice_id', 'practice_name', 'last_message', 'unread_count',
+                 'messages', 'next_cursor', '_channels', '_created_at', '_updated_at')
     
     def __init__(
         self,
         id: str,
         practice_id: int,
         practice_name: str,
-        channels: list,
+        channels: Union[list, str],
         last_message: Optional[Message] = None,
         unread_count: int = 0,
         messages: Optional[list] = None,
-        created_at: Optional[datetime] = None,
-        updated_at: Optional[datetime] = None
+        created_at: Union[datetime, str, None] = None,
+        updated_at: Union[datetime, str, None] = None,
+        next_cursor: Optional[str] = None
     ):
         self.id = id
         self.practice_id = practice_id
         self.practice_name = practice_name
-        self.channels = channels
+        self._channels = channels
         self.last_message = last_message
         self.unread_count = unread_count
         self.messages = messages or []
-        self.created_at = created_at or datetime.now()
-        self.updated_at = updated_at or datetime.now()
+        self._created_at = created_at or datetime.now()
+        self._updated_at = updated_at or datetime.now()
+        # Cursor for older messages when `messages` is one page of the thread
+        self.next_cursor = next_cursor
+    
+    @property
+    def channels(self) -> list:
+        if not isinstance(self._channels, list):
+            self._channels = _load_json(self._channels, list)
+        return self._channels
+    
+    @channels.setter
+    def channels(self, value: Union[list, str]):
+        self._channels = value
+    
+    @property
+    def created_at(self) -> datetime:
+        self._created_at = _datetime(self._created_at)
+        return self._created_at
+    
+    @created_at.setter
+    def created_at(self, value: Union[datetime, str]):
+        self._created_at = value
+    
+    @property
+    def updated_at(self) -> datetime:
+        self._updated_at = _datetime(self._updated_at)
+        return self._updated_at
+    
+    @updated_at.setter
+    def updated_at(self, value: Union[datetime, str]):
+        self._updated_at = value
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -98,6 +238,23 @@ class Conversation:
             'last_message': self.last_message.to_dict() if self.last_message else None,
             'unread_count': self.unread_count,
             'messages': [m.to_dict() for m in self.messages],
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': _isoformat(self._created_at),
+            'updated_at': _isoformat(self._updated_at),
+            'next_cursor': self.next_cursor
+        }
+    
+    def to_json(self) -> str:
+        """to_dict() as JSON text, messages rendered with Message.to_json()"""
+        data = {
+            'id': self.id,
+            'practice_id': self.practice_id,
+            'practice_name': self.practice_name,
+            'unread_count': self.unread_count,
+            'created_at': _isoformat(self._created_at),
+            'updated_at': _isoformat(self._updated_at),
+            'next_cursor': self.next_cursor
         }
+        last_message = self.last_message.to_json() if self.last_message else 'null'
+        messages = ', '.join(m.to_json() for m in self.messages)
+        return (f'{json.dumps(data)[:-1]}, "channels": {_json_text(self._channels, "[]")}, '
+                f'"last_message": {last_message}, "messages": [{messages}]}}')
@@ -74,13 +74,17 @@ class AutomationEngine:
         Returns:
             List of actions to execute
         """
+        rule_names = [name for name, rule in cls.RULES.items()
+                      if rule['trigger'] in (event, 'time_based', 'score_based')]
+        return cls._check_rules(practice, rule_names)
+    
+    @classmethod
+    def _check_rules(cls, practice: Dict, rule_names: List[str]) -> List[Dict]:
+        """Actions of the given rules whose condition holds and whose wait time has passed"""
         actions = []
-        workflow = practice.get('workflow', {})
         
-        for rule_name, rule in cls.RULES.items():
-            # Check if this rule applies to the event
-            if rule['trigger'] != event and rule['trigger'] not in ['time_based', 'score_based']:
-                continue
+        for rule_name in rule_names:
+            rule = cls.RULES[rule_name]
             
             # Check condition
             try:
@@ -330,20 +334,26 @@ class AutomationEngine:
         return result
     
     @classmethod
-    def get_pending_actions(cls, practices: List[Dict]) -> List[Dict]:
+    def get_pending_actions(cls, practices: List[Dict], hot_leads: Optional[List[Dict]] = None) -> List[Dict]:
         """
         Get all pending automated actions for all practices
+        
+        Time-based rules are checked for every practice, score-based rules
+        (hot_lead_no_contact) only for hot_leads: the practices in the hot
+        score range, e.g. DatabaseService.scored_practices(75, 100) from the
+        score index. Without hot_leads every practice is checked.
         """
         all_actions = []
+        time_rules = [name for name, rule in cls.RULES.items() if rule['trigger'] == 'time_based']
+        score_rules = [name for name, rule in cls.RULES.items() if rule['trigger'] == 'score_based']
         
+        # Check time-based triggers
         for practice in practices:
-            # Check time-based triggers
-            actions = cls.check_triggers(practice, 'time_based')
-            all_actions.extend(actions)
-            
-            # Check score-based triggers
-            actions = cls.check_triggers(practice, 'score_based')
-            all_actions.extend(actions)
+            all_actions.extend(cls._check_rules(practice, time_rules))
+        
+        # Check score-based triggers
+        for practice in practices if hot_leads is None else hot_leads:
+            all_actions.extend(cls._check_rules(practice, score_rules))
         
         # Sort by priority
         priority_order = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
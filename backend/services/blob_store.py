@@ -0,0 +1,140 @@
+"""
+Blob Store
+Content-addressed opslag (sha256) voor inbox media, begrensd met LRU eviction
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlobTooLarge(ValueError):
+    """A blob exceeded max_file_bytes while it was being written"""
+
+
+class BlobStore:
+    """
+    Files keyed by the sha256 of their content
+
+    Blobs live at root/ab/cd/<sha256>, so identical media is stored once.
+    An index (root/blobs.db) keeps size, content type and last access; when
+    the store grows past `max_bytes` the least recently used blobs are
+    removed. Writes go to a temp file first and are renamed into place.
+    """
+
+    # Reads refresh last_access at most this often per blob
+    TOUCH_INTERVAL = 300
+
+    def __init__(self, root: str, max_bytes: int, max_file_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.root / 'blobs.db', check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                content_type TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs(last_access)")
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def put(self, data: bytes, content_type: Optional[str] = None) -> Dict:
+        """Store bytes, returns {'sha256', 'size', 'content_type'}"""
+        return self.put_chunks([data], content_type)
+
+    def put_chunks(self, chunks: Iterable[bytes], content_type: Optional[str] = None) -> Dict:
+        """
+        Store a stream of chunks (e.g. a download), hashing while writing
+
+        Raises BlobTooLarge past max_file_bytes; nothing is kept then.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.incoming-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if self.max_file_bytes is not None and size > self.max_file_bytes:
+                        raise BlobTooLarge(f"blob larger than {self.max_file_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+
+            with self._lock:
+                now = time.time()
+                if target.exists():
+                    # Same content stored before
+                    os.unlink(tmp_path)
+                    self._conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (now, sha256))
+                else:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_path, target)
+                self._conn.execute("""
+                    INSERT INTO blobs (sha256, size, content_type, created_at, last_access) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (sha256) DO UPDATE SET content_type = COALESCE(blobs.content_type, excluded.content_type)
+                """, (sha256, size, content_type, now, now))
+                self._evict(keep=sha256)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return {'sha256': sha256, 'size': size, 'content_type': content_type}
+
+    def get(self, sha256: str) -> Optional[Dict]:
+        """{'path', 'size', 'content_type'} of a stored blob (counts as an access), None if missing"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, content_type, last_access FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                return None
+            path = self.path(sha256)
+            if not path.exists():
+                self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                return None
+            now = time.time()
+            if now - row[2] > self.TOUCH_INTERVAL:
+                self._conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (now, sha256))
+        return {'path': path, 'size': row[0], 'content_type': row[1]}
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self, keep: str):
+        """Drop least recently used blobs until the store fits max_bytes (caller holds the lock)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT sha256, size FROM blobs WHERE sha256 != ? ORDER BY last_access", (keep,)
+        ).fetchall()
+        for sha256, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(self.path(sha256))
+            except FileNotFoundError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            total -= size
+            logger.info(f"🗑️ Evicted blob {sha256[:12]} ({size} bytes)")
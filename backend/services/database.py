@@ -1,23 +1,64 @@
 """Database service - handles data persistence"""
-import json
-import os
+import copy
 import logging
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Any, Iterator, List, Dict, Optional
 
 from backend.config import Config
+from backend.services.practice_keys import INDEXED_FIELDS, normalize_lookup_value, normalize_practice
+from backend.services.practice_patch import apply_patch
+from backend.services.practice_query import query_practices
+from backend.services.phone_index import PhoneIndex
+from backend.services.score_history import get_score_history
+from backend.services.score_index import CATEGORY_RANGES, ScoreIndex
+from backend.services.stage_counters import StageCounters
+from backend.services.practice_store import get_practice_store
+from backend.services.supabase_paging import fetch_all, iter_pages, upsert_in_batches
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseService:
-    """Database service with Supabase and JSON fallback"""
+    """Database service with Supabase and a local JSON or SQLite store"""
+    
+    # Supabase columns a pipeline deal card needs
+    CARD_COLUMNS = 'nr,naam,gemeente,pipeline,score'
     
     def __init__(self):
         self.data_file = Config.DATA_FILE
+        self.storage = Config.PRACTICE_STORAGE
+        self.store = self._init_store()
         self.supabase_client = self._init_supabase()
+        self.score_history = get_score_history(Config.SCORE_HISTORY_DB)
+        
+        # Supabase phone -> nr index, reloaded after PHONE_INDEX_TTL seconds
+        # (writes by other processes) and kept current on our own writes
+        self._phone_index = None
+        self._phone_index_loaded = 0.0
+        self._phone_index_lock = threading.Lock()
+        
+        # Supabase score index (nr, gemeente, total_score), reloaded after SCORE_INDEX_TTL seconds
+        self._score_index = None
+        self._score_index_loaded = 0.0
+        self._score_index_lock = threading.Lock()
+        
+        # Supabase pipeline stage counters, reloaded after STAGE_COUNTERS_TTL seconds
+        self._stage_counters = None
+        self._stage_counters_loaded = 0.0
+        self._stage_counters_lock = threading.Lock()
+    
+    def _init_store(self):
+        """Local practice store: SQLite when selected, JSON otherwise"""
+        if self.storage == 'sqlite':
+            from backend.services.practice_sqlite import get_sqlite_practice_store
+            return get_sqlite_practice_store(Config.PRACTICE_DB_FILE)
+        return get_practice_store(self.data_file)
     
     def _init_supabase(self):
         """Initialize Supabase client if credentials available"""
+        if self.storage not in ('auto', 'supabase'):
+            return None
         try:
             if Config.SUPABASE_URL and Config.SUPABASE_KEY:
                 from supabase import create_client
@@ -28,18 +69,43 @@ class DatabaseService:
             logger.warning(f"Supabase init failed: {e}")
         return None
     
-    def get_practices(self) -> List[Dict]:
-        """Get all practices"""
+    def get_practices(self, columns: str = "*") -> List[Dict]:
+        """
+        Get all practices
+        
+        Args:
+            columns: Supabase column projection, e.g. "nr,naam,email,workflow"
+        """
         if self.supabase_client:
             try:
-                response = self.supabase_client.table('practices').select("*").execute()
-                return response.data
+                return fetch_all(self.supabase_client, 'practices', columns=columns,
+                                 page_size=Config.SUPABASE_PAGE_SIZE)
             except Exception as e:
                 logger.error(f"Supabase fetch error: {e}")
         
-        # Fallback to JSON
+        # Fallback to local store
         return self._load_from_json()
     
+    def iter_practices(self, columns: str = "*", page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Stream practices page by page instead of materializing them all"""
+        page_size = page_size or Config.SUPABASE_PAGE_SIZE
+        if self.supabase_client:
+            streamed = False
+            try:
+                for page in iter_pages(self.supabase_client, 'practices', columns=columns, page_size=page_size):
+                    streamed = True
+                    yield page
+                return
+            except Exception as e:
+                logger.error(f"Supabase fetch error: {e}")
+                if streamed:
+                    raise
+        
+        # Fallback to local store
+        practices = self._load_from_json()
+        for i in range(0, len(practices), page_size):
+            yield practices[i:i + page_size]
+    
     def get_practice(self, practice_id: int) -> Optional[Dict]:
         """Get specific practice"""
         if self.supabase_client:
@@ -50,108 +116,373 @@ class DatabaseService:
             except Exception as e:
                 logger.error(f"Supabase fetch error: {e}")
         
-        # Fallback to JSON
-        practices = self._load_from_json()
-        for practice in practices:
-            if practice.get('nr') == practice_id:
-                return practice
-        return None
+        # Fallback to local store
+        return self.store.get(practice_id)
+    
+    def find_practices(self, field: str, value: Any) -> List[Dict]:
+        """
+        Find practices by an indexed key: phone, email, gemeente, status or stage
+        
+        Phone and email are normalized (E.164 / lowercase) before matching.
+        """
+        if self.supabase_client:
+            if field == 'phone':
+                return self._find_supabase_by_phone(value)
+            key = INDEXED_FIELDS[field]
+            value = normalize_lookup_value(field, value)
+            return [p for p in self.get_practices() if key(p) == value]
+        
+        # Fallback to local store
+        return self.store.find(field, value)
+    
+    def find_practice_by_phone(self, phone: str) -> Optional[Dict]:
+        """
+        Practice listing this number in its tel field, for inbound SMS/WhatsApp
+        
+        Any format is accepted (+32, 0032, 04.., whatsapp:+32..). When several
+        practices share the number the lowest nr wins.
+        """
+        practices = self.find_practices('phone', phone)
+        if len(practices) > 1:
+            logger.warning(f"Phone {phone} matches {len(practices)} practices, using nr {practices[0].get('nr')}")
+        return practices[0] if practices else None
+    
+    def _find_supabase_by_phone(self, phone: str) -> List[Dict]:
+        with self._phone_index_lock:
+            if self._phone_index is None or time.monotonic() - self._phone_index_loaded > Config.PHONE_INDEX_TTL:
+                index = PhoneIndex()
+                index.rebuild(self.get_practices(columns='nr,tel'))
+                self._phone_index = index
+                self._phone_index_loaded = time.monotonic()
+            nrs = self._phone_index.lookup(phone)
+        if not nrs:
+            return []
+        response = self.supabase_client.table('practices').select("*").in_('nr', nrs).execute()
+        return sorted(response.data or [], key=lambda p: nrs.index(p['nr']))
+    
+    def _index_written(self, practices: List[Dict]):
+        """Keep the Supabase phone and score indexes and stage counters current after a write"""
+        with self._phone_index_lock:
+            if self._phone_index is not None:
+                for practice in practices:
+                    self._phone_index.add(practice)
+        with self._score_index_lock:
+            if self._score_index is not None:
+                for practice in practices:
+                    self._score_index.add(practice)
+        with self._stage_counters_lock:
+            if self._stage_counters is not None:
+                for practice in practices:
+                    self._stage_counters.add(practice)
+    
+    def scored_practices(self, low: float = 0, high: float = 100, limit: Optional[int] = None,
+                         gemeente: Optional[str] = None) -> List[Dict]:
+        """
+        Practices with a stored lead score between low and high, highest first
+        
+        Ties are ordered by nr; practices without a stored score aren't listed.
+        Locally this is the store's score index (sorted lists / SQLite index
+        on score), with Supabase an nr,gemeente,score index reloaded after
+        SCORE_INDEX_TTL seconds, after which only the matches are fetched.
+        """
+        if self.supabase_client:
+            try:
+                return self._scored_supabase(low, high, limit, gemeente)
+            except Exception as e:
+                logger.error(f"Supabase score index error: {e}")
+        
+        # Fallback to local store
+        return self.store.scored(low, high, limit=limit, gemeente=gemeente)
+    
+    def top_k(self, category: str, k: int, gemeente: Optional[str] = None) -> List[Dict]:
+        """The k best scored practices of a category ('hot', 'warm', 'cold', 'frozen')"""
+        low, high = CATEGORY_RANGES[category]
+        return self.scored_practices(low, high, limit=k, gemeente=gemeente)
+    
+    def _scored_supabase(self, low, high, limit, gemeente) -> List[Dict]:
+        with self._score_index_lock:
+            if self._score_index is None or time.monotonic() - self._score_index_loaded > Config.SCORE_INDEX_TTL:
+                index = ScoreIndex()
+                index.rebuild(self.get_practices(columns='nr,gemeente,score'))
+                self._score_index = index
+                self._score_index_loaded = time.monotonic()
+            nrs = self._score_index.between(low, high, gemeente=gemeente, limit=limit)
+        if not nrs:
+            return []
+        rows = []
+        for i in range(0, len(nrs), Config.SUPABASE_PAGE_SIZE):
+            response = (self.supabase_client.table('practices').select("*")
+                        .in_('nr', nrs[i:i + Config.SUPABASE_PAGE_SIZE]).execute())
+            rows.extend(response.data or [])
+        position = {nr: i for i, nr in enumerate(nrs)}
+        return sorted(rows, key=lambda p: position[p['nr']])
+    
+    def _record_scores(self, practices: List[Dict]):
+        """Append written lead scores to the score history (a failure there doesn't fail the write)"""
+        try:
+            self.score_history.record_scores(practices)
+        except Exception as e:
+            logger.warning(f"⚠️ Score history not updated: {e}")
+    
+    def stage_totals(self) -> Dict[str, Dict]:
+        """
+        Per pipeline stage {'count', 'value', 'weighted'}, maintained on writes
+        
+        Locally the store keeps them (StageCounters / stage_counters table);
+        with Supabase they're counted from nr,pipeline after STAGE_COUNTERS_TTL
+        seconds and kept current on our own writes in between.
+        """
+        if self.supabase_client:
+            try:
+                with self._stage_counters_lock:
+                    return self._supabase_stage_counters().totals()
+            except Exception as e:
+                logger.error(f"Supabase stage counters error: {e}")
+        
+        # Fallback to local store
+        return self.store.stage_totals()
+    
+    def stage_page(self, stage: str, after: Optional[int] = None, limit: int = 50) -> List[Dict]:
+        """
+        Practices in a pipeline stage ordered by nr, the first `limit` after nr `after`
+        
+        One Kanban column page: the stage index seeks past `after`, so deep
+        pages cost the same as the first. With Supabase the nrs come from the
+        stage counters and only the card columns of the page are fetched.
+        """
+        if self.supabase_client:
+            try:
+                with self._stage_counters_lock:
+                    nrs = self._supabase_stage_counters().page(stage, after, limit)
+                if not nrs:
+                    return []
+                response = (self.supabase_client.table('practices').select(self.CARD_COLUMNS)
+                            .in_('nr', nrs).execute())
+                return sorted(response.data or [], key=lambda p: p['nr'])
+            except Exception as e:
+                logger.error(f"Supabase stage page error: {e}")
+        
+        # Fallback to local store
+        return self.store.stage_page(stage, after, limit)
+    
+    def _supabase_stage_counters(self) -> StageCounters:
+        """Stage counters from nr,pipeline, recounted after STAGE_COUNTERS_TTL (caller holds the lock)"""
+        if self._stage_counters is None or time.monotonic() - self._stage_counters_loaded > Config.STAGE_COUNTERS_TTL:
+            counters = StageCounters()
+            counters.rebuild(self.get_practices(columns='nr,pipeline'))
+            self._stage_counters = counters
+            self._stage_counters_loaded = time.monotonic()
+        return self._stage_counters
+    
+    def rebuild_stage_totals(self) -> Dict[str, Dict]:
+        """Recount the stage aggregates from all practices, returns them"""
+        if self.supabase_client:
+            with self._stage_counters_lock:
+                self._stage_counters = None
+            return self.stage_totals()
+        return self.store.rebuild_stage_totals()
+    
+    def _delete_history(self, practice_id: int):
+        try:
+            self.score_history.delete(practice_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Score history of {practice_id} not deleted: {e}")
+    
+    def query_practices(self, **params) -> Dict:
+        """
+        Filtered, sorted and paged practices (see practice_query.query_practices)
+        
+        A single-valued stage, status or gemeente filter is answered from the
+        local store's index first, the other filters run on that subset.
+        """
+        practices = None
+        if not self.supabase_client:
+            for field in ('stage', 'status', 'gemeente'):
+                values = params.get(field)
+                if values and len(values) == 1:
+                    practices = self.store.find(field, values[0])
+                    break
+        if practices is None:
+            practices = self.get_practices()
+        return query_practices(practices, **params)
+    
+    def reserve_nrs(self, count: int = 1) -> range:
+        """
+        Reserve `count` consecutive nrs for new practices
+        
+        Allocation goes through the local store's persisted sequence, which is
+        safe across threads and workers on this host. With Supabase the
+        current MAX(nr) there is used as the floor.
+        """
+        floor = 0
+        if self.supabase_client:
+            try:
+                response = (self.supabase_client.table('practices')
+                            .select('nr').order('nr', desc=True).limit(1).execute())
+                if response.data:
+                    floor = response.data[0]['nr'] or 0
+            except Exception as e:
+                logger.error(f"Supabase max nr error: {e}")
+        return self.store.reserve_nrs(count, floor=floor)
+    
+    def allocate_nr(self) -> int:
+        """Next free practice nr"""
+        return self.reserve_nrs(1)[0]
     
     def upsert_practice(self, practice: Dict) -> bool:
         """Insert or update practice"""
+        normalize_practice(practice)
         if self.supabase_client:
             try:
                 self.supabase_client.table('practices').upsert(practice).execute()
+                self._index_written([practice])
+                self._record_scores([practice])
                 return True
             except Exception as e:
                 logger.error(f"Supabase upsert error: {e}")
         
-        # Fallback to JSON
-        return self._save_to_json_single(practice)
+        # Fallback to local store
+        if not self._save_to_json_single(practice):
+            return False
+        self._record_scores([practice])
+        return True
     
-    def bulk_upsert(self, practices: List[Dict]) -> bool:
-        """Bulk insert/update practices"""
+    def bulk_upsert(self, practices: List[Dict]) -> Dict:
+        """
+        Bulk insert/update practices
+        
+        Supabase writes go out in batches of SUPABASE_UPSERT_BATCH_SIZE;
+        rows that still fail after retries are listed in 'failed'.
+        
+        Returns:
+            {'success': bool, 'inserted': int, 'updated': int}
+            (inserted/updated are None when written to Supabase)
+        """
+        for practice in practices:
+            normalize_practice(practice)
+        if self.supabase_client:
+            result = upsert_in_batches(self.supabase_client, 'practices', practices,
+                                       batch_size=Config.SUPABASE_UPSERT_BATCH_SIZE)
+            if result['success'] or result['upserted']:
+                failed = set(result['failed'])
+                written = [p for p in practices if p.get('nr') not in failed]
+                self._index_written(written)
+                self._record_scores(written)
+                return {'success': result['success'], 'inserted': None, 'updated': None,
+                        'failed': result['failed']}
+            logger.error(f"Supabase bulk error: none of {len(practices)} practices written")
+        
+        # Fallback to local store
+        result = self._save_to_json_bulk(practices)
+        if result['success']:
+            self._record_scores(practices)
+        return result
+    
+    def patch_practices(self, operations: List[Dict]) -> List[Dict]:
+        """
+        Partial updates of many practices: [{nr, set: {path: value}, append: {path: item}}]
+        
+        Paths are dotted ('workflow.replied'). Locally the batch is applied
+        under one lock / transaction with a single write; on Supabase the
+        affected rows are read with one query and written back with one
+        (batched) upsert.
+        
+        Returns:
+            [{'nr', 'success', 'error'?}, ...] in operation order
+        """
+        results = None
         if self.supabase_client:
             try:
-                self.supabase_client.table('practices').upsert(practices).execute()
-                return True
+                results = self._patch_supabase(operations)
             except Exception as e:
-                logger.error(f"Supabase bulk error: {e}")
+                logger.error(f"Supabase patch error: {e}")
         
-        # Fallback to JSON
-        return self._save_to_json_bulk(practices)
+        # Fallback to local store
+        if results is None:
+            try:
+                results = self.store.patch_many(operations)
+            except Exception as e:
+                logger.error(f"JSON patch error: {e}")
+                return [{'nr': op.get('nr'), 'success': False, 'error': str(e)} for op in operations]
+        
+        self._record_scores([{'nr': op['nr'], 'score': op['set']['score']}
+                             for op, result in zip(operations, results)
+                             if result['success'] and 'score' in (op.get('set') or {})])
+        return results
+    
+    def _patch_supabase(self, operations: List[Dict]) -> List[Dict]:
+        nrs = list({op.get('nr') for op in operations})
+        response = self.supabase_client.table('practices').select("*").in_('nr', nrs).execute()
+        rows = {row['nr']: row for row in response.data or []}
+        
+        results = []
+        for op in operations:
+            nr = op.get('nr')
+            if nr not in rows:
+                results.append({'nr': nr, 'success': False, 'error': 'not found'})
+                continue
+            try:
+                rows[nr] = normalize_practice(apply_patch(copy.deepcopy(rows[nr]), op))
+            except ValueError as e:
+                results.append({'nr': nr, 'success': False, 'error': str(e)})
+                continue
+            results.append({'nr': nr, 'success': True})
+        
+        patched = [rows[nr] for nr in {r['nr'] for r in results if r['success']}]
+        if patched:
+            failed = set(upsert_in_batches(self.supabase_client, 'practices', patched,
+                                           batch_size=Config.SUPABASE_UPSERT_BATCH_SIZE)['failed'])
+            self._index_written([p for p in patched if p['nr'] not in failed])
+            for result in results:
+                if result['success'] and result['nr'] in failed:
+                    result.update(success=False, error='write failed')
+        return results
     
     def _load_from_json(self) -> List[Dict]:
-        """Load practices from JSON file"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        return []
+        """Load practices from the local store"""
+        return self.store.get_all()
     
     def _save_to_json_single(self, practice: Dict) -> bool:
         """Save single practice to JSON"""
         try:
-            practices = self._load_from_json()
-            found = False
-            
-            for i, p in enumerate(practices):
-                if p.get('nr') == practice.get('nr'):
-                    practices[i] = practice
-                    found = True
-                    break
-            
-            if not found:
-                practices.append(practice)
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(practices, f, indent=2)
-            return True
+            return self.store.upsert(practice)
         except Exception as e:
             logger.error(f"JSON save error: {e}")
             return False
     
-    def _save_to_json_bulk(self, new_practices: List[Dict]) -> bool:
-        """Bulk save to JSON"""
+    def _save_to_json_bulk(self, new_practices: List[Dict]) -> Dict:
+        """Bulk save to the local store"""
         try:
-            existing = self._load_from_json()
-            existing_ids = {p.get('nr') for p in existing}
-            
-            for practice in new_practices:
-                practice_id = practice.get('nr')
-                if practice_id in existing_ids:
-                    for i, p in enumerate(existing):
-                        if p.get('nr') == practice_id:
-                            existing[i] = practice
-                            break
-                else:
-                    existing.append(practice)
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(existing, f, indent=2)
-            return True
+            counts = self.store.upsert_many(new_practices)
+            return {'success': True, **counts}
         except Exception as e:
             logger.error(f"JSON bulk save error: {e}")
-            return False
+            return {'success': False, 'inserted': 0, 'updated': 0}
     
     def delete_practice(self, practice_id: int) -> bool:
-        """Delete a practice"""
+        """Delete a practice (and its score history)"""
         if self.supabase_client:
             try:
                 self.supabase_client.table('practices').delete().eq('nr', practice_id).execute()
+                with self._phone_index_lock:
+                    if self._phone_index is not None:
+                        self._phone_index.discard(practice_id)
+                with self._score_index_lock:
+                    if self._score_index is not None:
+                        self._score_index.discard(practice_id)
+                with self._stage_counters_lock:
+                    if self._stage_counters is not None:
+                        self._stage_counters.discard(practice_id)
+                self._delete_history(practice_id)
                 logger.info(f"Deleted practice {practice_id} from Supabase")
                 return True
             except Exception as e:
                 logger.error(f"Supabase delete error: {e}")
         
-        # Fallback to JSON
+        # Fallback to local store
         try:
-            practices = self._load_from_json()
-            original_count = len(practices)
-            practices = [p for p in practices if p.get('nr') != practice_id]
-            
-            if len(practices) < original_count:
-                with open(self.data_file, 'w') as f:
-                    json.dump(practices, f, indent=2)
+            if self.store.delete(practice_id):
+                self._delete_history(practice_id)
                 logger.info(f"Deleted practice {practice_id} from JSON")
                 return True
             else:
@@ -165,9 +496,13 @@ class DatabaseService:
 # Convenience functions for backward compatibility
 _db_instance = None
 
-def get_practice_by_id(practice_id: int) -> Optional[Dict]:
-    """Convenience function to get practice by ID"""
+def get_database() -> DatabaseService:
+    """Get the shared DatabaseService used by all blueprints"""
     global _db_instance
     if _db_instance is None:
         _db_instance = DatabaseService()
-    return _db_instance.get_practice(practice_id)
+    return _db_instance
+
+def get_practice_by_id(practice_id: int) -> Optional[Dict]:
+    """Convenience function to get practice by ID"""
+    return get_database().get_practice(practice_id)
@@ -0,0 +1,181 @@
+"""
+HTTP Response Layer
+Conditional GET (ETag / Last-Modified) and compression for polled read endpoints
+"""
+import gzip
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Response, g, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Versions are per-process counters; a restart must not reuse old ETags
+BOOT_ID = uuid.uuid4().hex[:8]
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+class ResponseLayer:
+    """
+    before/after_request hooks around registered endpoints
+
+    Each registered endpoint has version sources: cheap callables returning the
+    change counter of the data it reads (or None when it can't be versioned,
+    e.g. Supabase-backed). The ETag is built from those counters before the
+    view runs, so a matching If-None-Match is answered with 304 without
+    touching the data. Bodies above `min_size` are gzip (or brotli) encoded
+    for every endpoint.
+    """
+
+    def __init__(self, min_size: int = 1024, conditional: bool = True):
+        self.min_size = min_size
+        self.conditional = conditional
+        self.sources: Dict[str, List[Callable[[], Any]]] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._last_stamp = 0.0
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        for endpoint in self.sources:
+            if endpoint not in app.view_functions:
+                logger.warning(f"⚠️ Response layer: unknown endpoint {endpoint}")
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def register(self, endpoint: str, *sources: Callable[[], Any]):
+        """Version ETags of `endpoint` (Flask endpoint name) by `sources`"""
+        self.sources[endpoint] = list(sources)
+
+    # ------------------------------------------------------------------
+    # Versioning
+    # ------------------------------------------------------------------
+
+    def _token(self, endpoint: str) -> Optional[str]:
+        sources = self.sources.get(endpoint)
+        if not sources or not self.conditional:
+            return None
+        versions = []
+        for source in sources:
+            version = source()
+            if version is None:
+                return None
+            versions.append(str(version))
+        return f"{BOOT_ID}-{'.'.join(versions)}"
+
+    def _last_modified(self, token: str) -> float:
+        """
+        When this version was first served
+
+        HTTP dates have second precision, so every new version gets a strictly
+        later stamp; two changes within one second must not look unmodified.
+        """
+        with self._lock:
+            if token not in self._first_seen:
+                if len(self._first_seen) > 1000:
+                    self._first_seen.clear()
+                self._last_stamp = max(float(int(time.time())), self._last_stamp + 1)
+                self._first_seen[token] = self._last_stamp
+            return self._first_seen[token]
+
+    def _before_request(self):
+        if request.method != 'GET':
+            return None
+        token = self._token(request.endpoint)
+        g.version_token = token
+        if token is None:
+            return None
+
+        modified = self._last_modified(token)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(token)
+        elif request.if_modified_since:
+            fresh = request.if_modified_since.timestamp() >= modified
+        else:
+            fresh = False
+
+        if fresh:
+            response = Response(status=304)
+            response.set_etag(token, weak=True)
+            response.last_modified = datetime.fromtimestamp(modified, timezone.utc)
+            return response
+        return None
+
+    # ------------------------------------------------------------------
+    # Response
+    # ------------------------------------------------------------------
+
+    def _after_request(self, response):
+        token = g.get('version_token')
+        if token and response.status_code == 200:
+            response.set_etag(token, weak=True)
+            response.last_modified = datetime.fromtimestamp(self._last_modified(token), timezone.utc)
+
+        raw_size, sent_size = self._compress(response)
+        if request.method == 'GET' and request.endpoint in self.sources:
+            self._record(request.endpoint, response.status_code, raw_size, sent_size)
+        return response
+
+    def _encoding(self) -> Optional[str]:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _compress(self, response) -> tuple:
+        """Compress the body in place, returns (raw size, sent size)"""
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return 0, 0
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        encoding = self._encoding() if len(body) >= self.min_size else None
+        if encoding is None:
+            return len(body), len(body)
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=5)
+        else:
+            compressed = gzip.compress(body, compresslevel=6)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return len(body), len(compressed)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _record(self, endpoint: str, status: int, raw_size: int, sent_size: int):
+        with self._lock:
+            m = self._metrics.setdefault(endpoint, {
+                'requests': 0, 'not_modified': 0, 'compressed': 0, 'bytes_raw': 0, 'bytes_sent': 0
+            })
+            m['requests'] += 1
+            if status == 304:
+                m['not_modified'] += 1
+            if sent_size < raw_size:
+                m['compressed'] += 1
+            m['bytes_raw'] += raw_size
+            m['bytes_sent'] += sent_size
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint counters with the 304 hit ratio"""
+        with self._lock:
+            return {
+                endpoint: {**m, 'hit_ratio': round(m['not_modified'] / m['requests'], 3) if m['requests'] else 0.0}
+                for endpoint, m in self._metrics.items()
+            }
@@ -0,0 +1,82 @@
+"""
+Inbox Events
+In-process pub/sub: InboxService publiceert nieuwe berichten en unread wijzigingen
+"""
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One listener's queue of (event, data)"""
+
+    __slots__ = ('_queue', '_overflowed')
+
+    def __init__(self, size: int):
+        self._queue = queue.Queue(maxsize=size)
+        self._overflowed = False
+
+    def _put(self, item: Tuple[str, Dict[str, Any]]):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._overflowed = True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Next (event, data), None on timeout
+
+        A listener that fell `size` events behind gets its backlog replaced
+        by one 'resync' event: reload instead of replaying stale deltas.
+        """
+        if self._overflowed:
+            self._overflowed = False
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            return 'resync', {}
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InboxEvents:
+    """
+    Fan-out of inbox events to subscribers in this process
+
+    publish() never blocks the writer: every subscriber has a bounded queue
+    and a slow one is told to resync rather than holding events up.
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._put((event, data))
@@ -0,0 +1,184 @@
+"""
+Inbox Ingest Queue
+Webhook berichten worden gebufferd en door één writer thread in batches weggeschreven
+"""
+import logging
+import queue
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.services.inbox_service import InboxService
+
+logger = logging.getLogger(__name__)
+
+# async:  acknowledge as soon as the message is queued (lost if the process dies first)
+# commit: acknowledge when its batch is committed (synchronous=NORMAL, survives a process crash)
+# fsync:  like commit, with synchronous=FULL on the writer connection (survives power loss)
+DURABILITY_MODES = ('async', 'commit', 'fsync')
+
+
+class _Pending:
+    __slots__ = ('message', 'done', 'error')
+
+    def __init__(self, message: Dict[str, Any], wait: bool):
+        self.message = message
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+
+class InboxIngestQueue:
+    """
+    Group commit for inbound messages
+
+    Webhooks call submit() and return; a single writer thread drains whatever
+    queued up while the previous transaction ran (up to `batch_size`) and
+    writes it with InboxService.add_messages in one transaction. If a batch
+    fails, its messages are retried one by one so a bad message doesn't take
+    the others down.
+
+    `on_written` is called on the writer thread with the messages of each
+    batch that were stored, after their submitters are acknowledged; work
+    that may wait for the batch (practice updates) goes there instead of on
+    the webhook's request path.
+    """
+
+    def __init__(
+        self,
+        inbox: InboxService,
+        batch_size: int = 200,
+        durability: str = 'async',
+        on_written: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_MODES)}")
+        self.inbox = inbox
+        self.batch_size = batch_size
+        self.durability = durability
+        self.on_written = on_written
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._processed = 0
+        self._stats = {'batches': 0, 'messages': 0, 'failed': 0, 'largest_batch': 0}
+        self._writer = None
+        self._closed = False
+
+    def submit(self, **message) -> str:
+        """
+        Queue one message (add_message keyword arguments), returns its id
+
+        The arrival time is taken now, not when the batch is written. With
+        commit/fsync durability this blocks until the message is committed
+        and raises if it could not be stored.
+        """
+        if self._closed:
+            raise RuntimeError("ingest queue is closed")
+        message.setdefault('timestamp', datetime.now())
+        message['message_id'] = message.get('message_id') or f"msg_{uuid.uuid4().hex[:12]}"
+        pending = _Pending(message, wait=self.durability != 'async')
+
+        self._ensure_writer()
+        with self._cond:
+            self._submitted += 1
+            self._queue.put(pending)
+
+        if pending.done is not None:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+        return message['message_id']
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is written, False on timeout"""
+        with self._cond:
+            target = self._submitted
+            return self._cond.wait_for(lambda: self._processed >= target, timeout)
+
+    def close(self):
+        """Write what is queued and stop the writer"""
+        self._closed = True
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {**self._stats, 'queued': self._submitted - self._processed}
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._cond:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._run, name='inbox-ingest-writer', daemon=True)
+                    self._writer.start()
+
+    def _run(self):
+        if self.durability == 'fsync':
+            self.inbox._connect().execute("PRAGMA synchronous=FULL")
+
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+            self._write(batch)
+
+    def _write(self, batch):
+        failed = 0
+        stored = set()
+        try:
+            stored.update(m.id for m in self.inbox.add_messages([p.message for p in batch]))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                failed = 1
+                logger.error(f"❌ Dropped inbound message {batch[0].message['message_id']}: {e}")
+            else:
+                logger.error(f"❌ Ingest batch of {len(batch)} failed, retrying one by one: {e}")
+                for pending in batch:
+                    try:
+                        stored.update(m.id for m in self.inbox.add_messages([pending.message]))
+                    except Exception as e:
+                        pending.error = e
+                        failed += 1
+                        logger.error(f"❌ Dropped inbound message {pending.message['message_id']}: {e}")
+
+        for pending in batch:
+            if pending.done is not None:
+                pending.done.set()
+
+        # Each stored message once; retried ids that were already stored are left out
+        written = []
+        for pending in batch:
+            if pending.message['message_id'] in stored:
+                stored.discard(pending.message['message_id'])
+                written.append(pending.message)
+        if self.on_written is not None and written:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                logger.error(f"❌ After-write hook failed for {len(written)} messages: {e}")
+
+        with self._cond:
+            self._processed += len(batch)
+            self._stats['batches'] += 1
+            self._stats['messages'] += len(batch) - failed
+            self._stats['failed'] += failed
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._cond.notify_all()
@@ -0,0 +1,147 @@
+"""
+Inbox Media
+Haalt webhook media (Twilio MediaUrl) op de achtergrond binnen in de blob store
+"""
+import logging
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from twilio.request_validator import RequestValidator
+
+from backend.config import Config
+from backend.services.blob_store import BlobStore
+from backend.services.inbox_service import InboxService
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Domains Twilio serves message media from (API and media CDN); nothing else is fetched
+TWILIO_MEDIA_DOMAINS = ('twilio.com', 'twiliocdn.com')
+
+
+def is_twilio_media_url(url: str) -> bool:
+    """https URL on a Twilio media host (exact domain or a subdomain of it)"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    return parsed.scheme == 'https' and any(host == domain or host.endswith('.' + domain)
+                                            for domain in TWILIO_MEDIA_DOMAINS)
+
+
+def valid_twilio_signature(url: str, form: Dict, signature: str) -> bool:
+    """X-Twilio-Signature check of a webhook request, False without TWILIO_AUTH_TOKEN"""
+    if not Config.TWILIO_AUTH_TOKEN or not signature:
+        return False
+    return RequestValidator(Config.TWILIO_AUTH_TOKEN).validate(url, form, signature)
+
+
+def webhook_media(form) -> List[Dict]:
+    """Attachments of a Twilio SMS/WhatsApp webhook: [{'url', 'type'}]"""
+    media = []
+    for i in range(int(form.get('NumMedia') or 0)):
+        url = form.get(f'MediaUrl{i}')
+        if url:
+            media.append({'url': url, 'type': form.get(f'MediaContentType{i}')})
+    return media
+
+
+def download(url: str, timeout: float = 30) -> Iterable[bytes]:
+    """Stream a Twilio media URL with the account credentials when configured"""
+    if not is_twilio_media_url(url):
+        raise ValueError(f"Not a Twilio media URL: {url}")
+    auth = None
+    if Config.TWILIO_ACCOUNT_SID and Config.TWILIO_AUTH_TOKEN:
+        auth = (Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+    response = requests.get(url, auth=auth, stream=True, timeout=timeout)
+    response.raise_for_status()
+    try:
+        yield from response.iter_content(CHUNK_SIZE)
+    finally:
+        response.close()
+
+
+class MediaFetcher:
+    """
+    Background download of message attachments into a BlobStore
+
+    submit() returns immediately; a worker thread downloads each attachment
+    URL, stores it by sha256 and records 'sha256' and 'size' on the message's
+    attachments so the inbox serves it from /api/inbox/media/<sha256>.
+    A failed download leaves the attachment with its remote URL only.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        inbox: InboxService,
+        wait_for: Optional[Callable[[], object]] = None,
+        fetch: Callable[[str], Iterable[bytes]] = download
+    ):
+        self.store = store
+        self.inbox = inbox
+        # Called before retrying when the message isn't stored yet (ingest queue flush)
+        self.wait_for = wait_for
+        self.fetch = fetch
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._processed = 0
+        self._worker = None
+
+    def submit(self, message_id: str, attachments: List[Dict]):
+        if not attachments:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            with self._cond:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='inbox-media-fetcher', daemon=True)
+                    self._worker.start()
+        with self._cond:
+            self._submitted += 1
+            self._queue.put((message_id, [dict(a) for a in attachments]))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is handled, False on timeout"""
+        with self._cond:
+            target = self._submitted
+            return self._cond.wait_for(lambda: self._processed >= target, timeout)
+
+    def close(self):
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout=10)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._handle(*job)
+            except Exception as e:
+                logger.error(f"❌ Media for message {job[0]} not stored: {e}")
+            with self._cond:
+                self._processed += 1
+                self._cond.notify_all()
+
+    def _handle(self, message_id: str, attachments: List[Dict]):
+        fetched = 0
+        for attachment in attachments:
+            try:
+                blob = self.store.put_chunks(self.fetch(attachment['url']), attachment.get('type'))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not fetch media {attachment['url']}: {e}")
+                continue
+            attachment.update(sha256=blob['sha256'], size=blob['size'])
+            fetched += 1
+        if not fetched:
+            return
+
+        if not self.inbox.set_attachments(message_id, attachments) and self.wait_for is not None:
+            # Webhook message still in the ingest queue
+            self.wait_for()
+            self.inbox.set_attachments(message_id, attachments)
+        logger.info(f"✅ {fetched} media stored for message {message_id}")
@@ -3,50 +3,147 @@ Unified Inbox Service
 Aggregeert alle communicatie (Email, SMS, WhatsApp) in één inbox
 """
 import logging
+import re
 import sqlite3
+import threading
 from datetime import datetime
+from itertools import zip_longest
 from typing import List, Optional, Dict, Any
 from pathlib import Path
 
 from backend.models.message import Message, Conversation
+from backend.services.inbox_events import InboxEvents
+from backend.services.practice_query import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
+# Selected in Message constructor order, rows go straight into Message.from_row
+MESSAGE_COLUMNS = ', '.join(Message.COLUMNS)
+
+# Words as the unicode61 tokenizer sees them, with an optional trailing * for prefix search
+SEARCH_TOKEN = re.compile(r'\w+\*?')
+
+
+def fts_query(
+    text: str,
+    channel: Optional[str] = None,
+    practice_id: Optional[int] = None
+) -> Optional[str]:
+    """
+    FTS5 MATCH expression for free text typed by a user
+    
+    Every word is quoted (no FTS5 operators or syntax errors from user input)
+    and must match the message content. Words ending in * and the last word
+    (still being typed) are prefix searches. Channel and practice filters are
+    matched in the index itself.
+    """
+    tokens = SEARCH_TOKEN.findall(text)
+    if not tokens:
+        return None
+    terms = []
+    for i, token in enumerate(tokens):
+        prefix = token.endswith('*') or i == len(tokens) - 1
+        terms.append(f'"{token.rstrip("*")}"' + ('*' if prefix else ''))
+    
+    expression = f"content : ({' '.join(terms)})"
+    if channel:
+        expression += f' AND channel : "{channel.replace(chr(34), "")}"'
+    if practice_id:
+        expression += f' AND practice_id : "{int(practice_id)}"'
+    return expression
+
 
 class InboxService:
     """Service voor unified inbox - alle channels op 1 plek"""
     
+    # Connection tuning, applied once per thread-local connection
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",       # readers don't block the writer
+        "PRAGMA synchronous=NORMAL",     # fsync at checkpoints, not every commit (safe with WAL)
+        "PRAGMA cache_size=-16000",      # 16 MB page cache
+        "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped reads
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",      # wait for a concurrent writer instead of failing
+    )
+    
+    # Denormalized pointer to the newest message, kept by add_message
+    LAST_MESSAGE_COLUMNS = ('last_message_id', 'last_timestamp', 'last_preview', 'last_channel', 'last_direction')
+    PREVIEW_LENGTH = 200
+    
+    # Full-text index over messages.content; remove_diacritics folds é/ë/ï so
+    # "een" finds "één" and "reeel" finds "reëel", prefix indexes keep "afspr*" fast.
+    # channel and practice_id are indexed too so filters intersect doclists in
+    # the index instead of joining every hit, they don't count for ranking.
+    SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+    SEARCH_PREFIXES = "2 3 4"
+    SNIPPET_TOKENS = 12
+    
     def __init__(self, db_path: str = "data/crm.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._version_lock = threading.Lock()
+        self._version = 0
+        self.fts_enabled = False
+        # New messages and read changes for live listeners (/api/inbox/events)
+        self.events = InboxEvents()
         self._init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Thread-local connection, opened and tuned once per thread
+        
+        Repeated queries hit sqlite3's prepared statement cache instead of
+        being parsed again.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, cached_statements=256)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.data_version = None
+            # Archive schemas attached to this connection, least recently used first
+            self._local.attached = {}
+        return conn
+    
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    @property
+    def version(self) -> int:
+        """Change counter, bumped on own writes and on commits by other connections"""
+        conn = self._connect()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._version_lock:
+            if self._local.data_version is not None and data_version != self._local.data_version:
+                self._version += 1
+            self._local.data_version = data_version
+            return self._version
+    
+    def _bump_version(self):
+        with self._version_lock:
+            self._version += 1
+    
+    def _rollback(self):
+        """Don't leave a failed write's transaction open on the shared connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+    
     def _init_database(self):
         """Initialize inbox tables"""
         try:
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            # Messages table - alle berichten van alle channels
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id TEXT PRIMARY KEY,
-                    conversation_id TEXT NOT NULL,
-                    practice_id INTEGER NOT NULL,
-                    channel TEXT NOT NULL,
-                    direction TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    sender TEXT NOT NULL,
-                    recipient TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    status TEXT DEFAULT 'sent',
-                    metadata TEXT,
-                    read INTEGER DEFAULT 0,
-                    attachments TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # Messages table - alle berichten van alle channels (recent ones, see archive_messages)
+            self._create_messages_table(cursor)
             
             # Conversations table
             cursor.execute("""
@@ -57,24 +154,239 @@ class InboxService:
                     channels TEXT NOT NULL,
                     unread_count INTEGER DEFAULT 0,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    last_message_id TEXT,
+                    last_timestamp TEXT,
+                    last_preview TEXT,
+                    last_channel TEXT,
+                    last_direction TEXT
+                )
+            """)
+            
+            # Databases from before the last-message columns
+            added = self._add_missing_columns(cursor)
+            
+            # Archive files and which conversations have messages in them
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS message_archives (
+                    year INTEGER PRIMARY KEY,
+                    file TEXT NOT NULL,
+                    messages INTEGER DEFAULT 0,
+                    archived_at TEXT
                 )
             """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archived_conversations (
+                    conversation_id TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    last_timestamp TEXT NOT NULL,
+                    PRIMARY KEY (conversation_id, year)
+                ) WITHOUT ROWID
+            """)
             
             # Indexes voor snelle queries
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_practice ON messages(practice_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp DESC)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at DESC)")
+            self._create_message_indexes(cursor)
+            # Keyset pagination walks (updated_at, id) backwards
+            cursor.execute("DROP INDEX IF EXISTS idx_conversations_updated")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated_id ON conversations(updated_at, id)")
+            
+            # Running unread total, moved by triggers on every conversations write
+            self._init_unread_counter(cursor)
+            
+            # Full-text search index and the triggers keeping it in sync
+            search_created = self._init_search(cursor)
             
             conn.commit()
-            conn.close()
+            if added:
+                self.backfill_last_messages()
+            if search_created:
+                self.rebuild_search_index()
             logger.info("✅ Inbox database initialized")
             
         except Exception as e:
             logger.error(f"❌ Error initializing inbox database: {e}")
             raise
     
+    @staticmethod
+    def _init_unread_counter(cursor):
+        """
+        inbox_counters: SUM(conversations.unread_count) kept by triggers
+        
+        Every write to conversations applies its delta (+inbound, -cleared)
+        in the same transaction, whichever worker or script commits it, so
+        the total is one primary-key read. Counted once for databases from
+        before the table.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS inbox_counters (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                unread_total INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO inbox_counters (id, unread_total)
+            SELECT 1, COALESCE(SUM(unread_count), 0) FROM conversations
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_unread_insert AFTER INSERT ON conversations BEGIN
+                UPDATE inbox_counters SET unread_total = unread_total + COALESCE(NEW.unread_count, 0) WHERE id = 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_unread_delete AFTER DELETE ON conversations BEGIN
+                UPDATE inbox_counters SET unread_total = unread_total - COALESCE(OLD.unread_count, 0) WHERE id = 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_unread_update AFTER UPDATE OF unread_count ON conversations
+            WHEN NEW.unread_count IS NOT OLD.unread_count BEGIN
+                UPDATE inbox_counters
+                SET unread_total = unread_total + COALESCE(NEW.unread_count, 0) - COALESCE(OLD.unread_count, 0)
+                WHERE id = 1;
+            END
+        """)
+    
+    @staticmethod
+    def _create_messages_table(cursor):
+        """messages table, in the inbox database and in every archive file"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                conversation_id TEXT NOT NULL,
+                practice_id INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                content TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT DEFAULT 'sent',
+                metadata TEXT,
+                read INTEGER DEFAULT 0,
+                attachments TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    
+    @staticmethod
+    def _create_message_indexes(cursor):
+        # (conversation_id, timestamp, id) also serves plain conversation_id lookups
+        # and the keyset pagination of a thread
+        cursor.execute("DROP INDEX IF EXISTS idx_messages_conversation")
+        cursor.execute("DROP INDEX IF EXISTS idx_messages_conversation_timestamp")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp_id ON messages(conversation_id, timestamp, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_practice ON messages(practice_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp DESC)")
+    
+    def _init_search(self, cursor) -> bool:
+        """
+        Create the messages_fts index (external content, rows live in messages)
+        
+        Returns True when the index was just created and needs a rebuild.
+        Without FTS5 in the SQLite build, search falls back to LIKE.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        ).fetchone()
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content,
+                    channel,
+                    practice_id,
+                    content='messages',
+                    content_rowid='rowid',
+                    tokenize='{self.SEARCH_TOKENIZER}',
+                    prefix='{self.SEARCH_PREFIXES}'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ FTS5 not available, message search uses LIKE: {e}")
+            return False
+        
+        if not exists:
+            # Rank by bm25 on content only (persisted in the index config)
+            cursor.execute("INSERT INTO messages_fts(messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0, 0.0)')")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts(rowid, content, channel, practice_id)
+                VALUES (new.rowid, new.content, new.channel, new.practice_id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content, channel, practice_id)
+                VALUES ('delete', old.rowid, old.content, old.channel, old.practice_id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content, channel, practice_id ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content, channel, practice_id)
+                VALUES ('delete', old.rowid, old.content, old.channel, old.practice_id);
+                INSERT INTO messages_fts(rowid, content, channel, practice_id)
+                VALUES (new.rowid, new.content, new.channel, new.practice_id);
+            END
+        """)
+        self.fts_enabled = True
+        return not exists
+    
+    def rebuild_search_index(self) -> int:
+        """
+        Rebuild messages_fts from the messages table and merge its segments
+        
+        For databases from before the index existed, or after bulk changes
+        made with the triggers disabled.
+        
+        Returns:
+            Number of indexed messages
+        """
+        if not self.fts_enabled:
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('optimize')")
+        count = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        logger.info(f"✅ Search index rebuilt for {count} messages")
+        return count
+    
+    def _add_missing_columns(self, cursor) -> bool:
+        """Add the denormalized last-message columns to an older conversations table"""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(conversations)")}
+        added = False
+        for column in self.LAST_MESSAGE_COLUMNS:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE conversations ADD COLUMN {column} TEXT")
+                added = True
+        return added
+    
+    def backfill_last_messages(self, only_missing: bool = True) -> int:
+        """
+        Fill the last-message columns from the messages table
+        
+        Migration for databases created before the columns existed; uses the
+        (conversation_id, timestamp) index once per conversation.
+        
+        Returns:
+            Number of conversations updated
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(f"""
+                UPDATE conversations
+                SET (last_message_id, last_timestamp, last_preview, last_channel, last_direction) = (
+                    SELECT id, timestamp, substr(content, 1, {self.PREVIEW_LENGTH}), channel, direction
+                    FROM messages
+                    WHERE conversation_id = conversations.id
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                )
+                {'WHERE last_message_id IS NULL' if only_missing else ''}
+            """)
+        self._bump_version()
+        logger.info(f"✅ Backfilled last message of {cursor.rowcount} conversations")
+        return cursor.rowcount
+    
     def add_message(
         self,
         practice_id: int,
@@ -94,7 +406,7 @@ class InboxService:
         import uuid
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Generate IDs
@@ -141,6 +453,17 @@ class InboxService:
                 json.dumps(attachments or [])
             ))
             
+            # Move the conversation's last-message pointer (never back in time)
+            cursor.execute("""
+                UPDATE conversations
+                SET last_message_id = :id, last_timestamp = :timestamp, last_preview = :preview,
+                    last_channel = :channel, last_direction = :direction
+                WHERE id = :conv_id AND (last_timestamp IS NULL OR last_timestamp <= :timestamp)
+            """, {
+                'id': msg_id, 'timestamp': timestamp.isoformat(), 'preview': content[:self.PREVIEW_LENGTH],
+                'channel': channel, 'direction': direction, 'conv_id': conv_id
+            })
+            
             # Update unread count if inbound
             if direction == 'inbound':
                 cursor.execute("""
@@ -150,7 +473,7 @@ class InboxService:
                 """, (conv_id,))
             
             conn.commit()
-            conn.close()
+            self._bump_version()
             
             message = Message(
                 id=msg_id,
@@ -167,14 +490,146 @@ class InboxService:
                 read=direction == 'outbound',
                 attachments=attachments
             )
+            self._publish_messages([message], {msg_id: practice_name})
             
             logger.info(f"✅ Message added to inbox: {msg_id} ({channel})")
             return message
             
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ Error adding message to inbox: {e}")
             raise
     
+    def add_messages(self, items: List[Dict[str, Any]]) -> List[Message]:
+        """
+        Voeg een batch berichten toe in één transactie
+        
+        items: add_message keyword arguments, optionally with the `timestamp`
+        the message arrived at. Each conversation is updated once per batch:
+        channels merged, unread_count raised by its inbound messages, updated_at
+        and the last-message pointer set from its newest message. Message ids
+        that are already stored (webhook retries) are skipped.
+        
+        Returns:
+            The inserted messages
+        """
+        import json
+        import uuid
+        
+        messages, names, seen = [], {}, set()
+        for item in items:
+            msg_id = item.get('message_id') or f"msg_{uuid.uuid4().hex[:12]}"
+            if msg_id in seen:
+                continue
+            seen.add(msg_id)
+            messages.append(Message(
+                id=msg_id,
+                conversation_id=f"conv_{item['practice_id']}",
+                practice_id=item['practice_id'],
+                channel=item['channel'],
+                direction=item['direction'],
+                content=item['content'],
+                sender=item['sender'],
+                recipient=item['recipient'],
+                timestamp=item.get('timestamp') or datetime.now(),
+                status=item.get('status', 'sent'),
+                metadata=item.get('metadata'),
+                read=item['direction'] == 'outbound',
+                attachments=item.get('attachments')
+            ))
+            names[msg_id] = item['practice_name']
+        
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            # Skip retries of messages already stored
+            ids = [m.id for m in messages]
+            existing = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cursor.execute(f"SELECT id FROM messages WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                existing.update(row[0] for row in cursor.fetchall())
+            messages = [m for m in messages if m.id not in existing]
+            if not messages:
+                return []
+            
+            cursor.executemany("""
+                INSERT INTO messages (
+                    id, conversation_id, practice_id, channel, direction,
+                    content, sender, recipient, timestamp, status,
+                    metadata, read, attachments
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                m.id, m.conversation_id, m.practice_id, m.channel, m.direction,
+                m.content, m.sender, m.recipient, m.timestamp.isoformat(), m.status,
+                json.dumps(m.metadata), int(m.read), json.dumps(m.attachments)
+            ) for m in messages])
+            
+            # Aggregate per conversation
+            conversations = {}
+            for m in messages:
+                conv = conversations.setdefault(m.conversation_id, {
+                    'practice_id': m.practice_id, 'practice_name': names[m.id],
+                    'channels': [], 'unread': 0, 'newest': m
+                })
+                if m.channel not in conv['channels']:
+                    conv['channels'].append(m.channel)
+                if m.direction == 'inbound':
+                    conv['unread'] += 1
+                if m.timestamp >= conv['newest'].timestamp:
+                    conv['newest'] = m
+            
+            cursor.executemany("""
+                INSERT OR IGNORE INTO conversations (id, practice_id, practice_name, channels, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(
+                conv_id, conv['practice_id'], conv['practice_name'], json.dumps(conv['channels']),
+                conv['newest'].timestamp.isoformat(), conv['newest'].timestamp.isoformat()
+            ) for conv_id, conv in conversations.items()])
+            
+            conv_ids = list(conversations)
+            cursor.execute(
+                f"SELECT id, channels FROM conversations WHERE id IN ({','.join('?' * len(conv_ids))})", conv_ids
+            )
+            updates = []
+            for conv_id, channels in cursor.fetchall():
+                conv = conversations[conv_id]
+                merged = json.loads(channels)
+                merged += [ch for ch in conv['channels'] if ch not in merged]
+                newest = conv['newest']
+                updates.append({
+                    'conv_id': conv_id, 'channels': json.dumps(merged), 'unread': conv['unread'],
+                    'id': newest.id, 'timestamp': newest.timestamp.isoformat(),
+                    'preview': newest.content[:self.PREVIEW_LENGTH],
+                    'channel': newest.channel, 'direction': newest.direction
+                })
+            
+            cursor.executemany("""
+                UPDATE conversations
+                SET channels = :channels, updated_at = :timestamp, unread_count = unread_count + :unread
+                WHERE id = :conv_id
+            """, updates)
+            # Move the last-message pointer (never back in time)
+            cursor.executemany("""
+                UPDATE conversations
+                SET last_message_id = :id, last_timestamp = :timestamp, last_preview = :preview,
+                    last_channel = :channel, last_direction = :direction
+                WHERE id = :conv_id AND (last_timestamp IS NULL OR last_timestamp <= :timestamp)
+            """, updates)
+            
+            conn.commit()
+            self._bump_version()
+            self._publish_messages(messages, names)
+            
+            logger.info(f"✅ {len(messages)} messages added to inbox in {len(conversations)} conversations")
+            return messages
+            
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ Error adding messages to inbox: {e}")
+            raise
+    
     def get_conversations(
         self,
         limit: int = 50,
@@ -182,92 +637,138 @@ class InboxService:
         unread_only: bool = False
     ) -> List[Conversation]:
         """Get all conversations met laatste berichten"""
-        import json
-        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Query conversations
-            query = """
-                SELECT 
-                    c.id, c.practice_id, c.practice_name, c.channels,
-                    c.unread_count, c.created_at, c.updated_at,
-                    m.id, m.channel, m.direction, m.content, m.sender,
-                    m.recipient, m.timestamp, m.status, m.metadata, m.read
-                FROM conversations c
-                LEFT JOIN messages m ON c.id = m.conversation_id
-                WHERE 1=1
-            """
-            
-            params = []
-            if unread_only:
-                query += " AND c.unread_count > 0"
-            
-            query += """
-                AND m.id = (
-                    SELECT id FROM messages 
-                    WHERE conversation_id = c.id 
-                    ORDER BY timestamp DESC LIMIT 1
-                )
-                ORDER BY c.updated_at DESC
-                LIMIT ? OFFSET ?
-            """
-            params.extend([limit, offset])
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            conversations = []
-            for row in rows:
-                # Parse last message if exists
-                last_message = None
-                if row[7]:  # message id exists
-                    last_message = Message(
-                        id=row[7],
-                        conversation_id=row[0],
-                        practice_id=row[1],
-                        channel=row[8],
-                        direction=row[9],
-                        content=row[10],
-                        sender=row[11],
-                        recipient=row[12],
-                        timestamp=datetime.fromisoformat(row[13]),
-                        status=row[14],
-                        metadata=json.loads(row[15]) if row[15] else {},
-                        read=bool(row[16])
-                    )
-                
-                conversation = Conversation(
-                    id=row[0],
-                    practice_id=row[1],
-                    practice_name=row[2],
-                    channels=json.loads(row[3]),
-                    unread_count=row[4],
-                    created_at=datetime.fromisoformat(row[5]),
-                    updated_at=datetime.fromisoformat(row[6]),
-                    last_message=last_message
-                )
-                conversations.append(conversation)
-            
-            conn.close()
-            return conversations
-            
+            rows = self._conversation_rows(limit, unread_only, offset=offset)
+            return [self._conversation_from_row(row) for row in rows]
         except Exception as e:
             logger.error(f"❌ Error getting conversations: {e}")
             return []
     
-    def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
-        """Get single conversation met alle berichten"""
-        import json
+    def get_conversations_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        unread_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        One keyset page of conversations, newest first
+        
+        cursor: next_cursor of the previous page. Unlike offset, deep pages
+        seek on the (updated_at, id) index instead of scanning skipped rows.
+        Raises ValueError for an invalid cursor.
+        
+        Returns:
+            {'conversations': [...], 'next_cursor': str or None}
+        """
+        after = decode_cursor(cursor, size=2) if cursor else None
+        try:
+            rows = self._conversation_rows(limit + 1, unread_only, after=after)
+        except Exception as e:
+            logger.error(f"❌ Error getting conversations: {e}")
+            return {'conversations': [], 'next_cursor': None}
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][6], rows[-1][0]])
+        return {
+            'conversations': [self._conversation_from_row(row) for row in rows],
+            'next_cursor': next_cursor
+        }
+    
+    def _conversation_rows(
+        self,
+        limit: int,
+        unread_only: bool,
+        offset: int = 0,
+        after: Optional[list] = None
+    ) -> list:
+        """Conversation rows ordered by (updated_at, id) descending, after = [updated_at, id] to seek past"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        # Query conversations, the last message comes from the denormalized columns
+        query = """
+            SELECT 
+                id, practice_id, practice_name, channels,
+                unread_count, created_at, updated_at,
+                last_message_id, last_channel, last_direction, last_preview, last_timestamp
+            FROM conversations
+        """
+        
+        where, params = [], []
+        if unread_only:
+            where.append("unread_count > 0")
+        if after:
+            where.append("(updated_at, id) < (?, ?)")
+            params.extend(after)
+        if where:
+            query += " WHERE " + " AND ".join(where)
         
+        query += """
+            ORDER BY updated_at DESC, id DESC
+            LIMIT ? OFFSET ?
+        """
+        params.extend([limit, offset])
+        
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    def _conversation_from_row(self, row) -> Conversation:
+        # channels and the timestamps stay raw until they're read
+        return Conversation(
+            id=row[0],
+            practice_id=row[1],
+            practice_name=row[2],
+            channels=row[3],
+            unread_count=row[4],
+            created_at=row[5],
+            updated_at=row[6],
+            # Preview of the last message (content is truncated to PREVIEW_LENGTH)
+            last_message=self._last_message_preview(row[0], row[1], row[7:12])
+        )
+    
+    @staticmethod
+    def _last_message_preview(conversation_id: str, practice_id: int, row) -> Optional[Message]:
+        """Preview Message from (last_message_id, last_channel, last_direction, last_preview, last_timestamp)"""
+        if not row[0]:
+            return None
+        return Message(
+            id=row[0],
+            conversation_id=conversation_id,
+            practice_id=practice_id,
+            channel=row[1],
+            direction=row[2],
+            content=row[3],
+            sender='',
+            recipient='',
+            timestamp=row[4]
+        )
+    
+    def get_conversation(
+        self,
+        conversation_id: str,
+        limit: Optional[int] = None,
+        before: Optional[str] = None
+    ) -> Optional[Conversation]:
+        """
+        Get single conversation met berichten
+        
+        Without limit every message is loaded. With limit only the newest
+        `limit` messages (older than `before`, a previous next_cursor) are
+        loaded, oldest first; conversation.next_cursor points at older ones.
+        
+        Raises ValueError for an invalid cursor
+        """
+        older_than = decode_cursor(before, size=2) if before else None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get conversation
             cursor.execute("""
-                SELECT id, practice_id, practice_name, channels, unread_count, created_at, updated_at
+                SELECT id, practice_id, practice_name, channels, unread_count, created_at, updated_at,
+                       last_message_id, last_channel, last_direction, last_preview, last_timestamp
                 FROM conversations
                 WHERE id = ?
             """, (conversation_id,))
@@ -276,66 +777,102 @@ class InboxService:
             if not conv_row:
                 return None
             
-            # Get all messages
-            cursor.execute("""
-                SELECT id, channel, direction, content, sender, recipient,
-                       timestamp, status, metadata, read, attachments
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY timestamp ASC
-            """, (conversation_id,))
+            message_rows = self._thread_rows(conn, 'main', conversation_id, limit, older_than)
             
-            message_rows = cursor.fetchall()
-            messages = []
-            
-            for row in message_rows:
-                message = Message(
-                    id=row[0],
-                    conversation_id=conversation_id,
-                    practice_id=conv_row[1],
-                    channel=row[1],
-                    direction=row[2],
-                    content=row[3],
-                    sender=row[4],
-                    recipient=row[5],
-                    timestamp=datetime.fromisoformat(row[6]),
-                    status=row[7],
-                    metadata=json.loads(row[8]) if row[8] else {},
-                    read=bool(row[9]),
-                    attachments=json.loads(row[10]) if row[10] else []
-                )
-                messages.append(message)
+            # Archived messages: only archives holding this conversation and, when
+            # the page is already full, reaching past its oldest message
+            full_page = limit is not None and len(message_rows) > limit
+            years = self._archive_years(conversation_id, newer_than=message_rows[-1][8] if full_page else None)
+            if years:
+                seen = {row[0] for row in message_rows}
+                for year in years:
+                    schema = self._attach_archive(conn, year)
+                    for row in self._thread_rows(conn, schema, conversation_id, limit, older_than):
+                        if row[0] not in seen:
+                            seen.add(row[0])
+                            message_rows.append(row)
+                message_rows.sort(key=lambda row: (row[8], row[0]), reverse=limit is not None)
+                if limit is not None:
+                    message_rows = message_rows[:limit + 1]
+            
+            next_cursor = None
+            if limit is not None:
+                if len(message_rows) > limit:
+                    message_rows = message_rows[:limit]
+                    next_cursor = encode_cursor([message_rows[-1][8], message_rows[-1][0]])
+                message_rows.reverse()
+            
+            messages = [Message.from_row(row) for row in message_rows]
+            
+            # Older pages don't contain the newest message, fall back to the preview
+            if messages and not before:
+                last_message = messages[-1]
+            else:
+                last_message = self._last_message_preview(conv_row[0], conv_row[1], conv_row[7:12])
             
             conversation = Conversation(
                 id=conv_row[0],
                 practice_id=conv_row[1],
                 practice_name=conv_row[2],
-                channels=json.loads(conv_row[3]),
+                channels=conv_row[3],
                 unread_count=conv_row[4],
-                created_at=datetime.fromisoformat(conv_row[5]),
-                updated_at=datetime.fromisoformat(conv_row[6]),
+                created_at=conv_row[5],
+                updated_at=conv_row[6],
                 messages=messages,
-                last_message=messages[-1] if messages else None
+                last_message=last_message,
+                next_cursor=next_cursor
             )
             
-            conn.close()
             return conversation
             
         except Exception as e:
             logger.error(f"❌ Error getting conversation: {e}")
             return None
     
+    @staticmethod
+    def _thread_rows(
+        conn: sqlite3.Connection,
+        schema: str,
+        conversation_id: str,
+        limit: Optional[int],
+        older_than: Optional[list]
+    ) -> list:
+        """Message rows of a conversation in one schema: all oldest first, or the newest limit+1 before older_than"""
+        query = f"""
+            SELECT {MESSAGE_COLUMNS}
+            FROM {schema}.messages
+            WHERE conversation_id = ?
+        """
+        params = [conversation_id]
+        if limit is None:
+            query += " ORDER BY timestamp ASC, id ASC"
+        else:
+            # Newest window first, walking (timestamp, id) backwards
+            if older_than:
+                query += " AND (timestamp, id) < (?, ?)"
+                params.extend(older_than)
+            query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params.append(limit + 1)
+        return conn.execute(query, params).fetchall()
+    
     def mark_as_read(self, conversation_id: str) -> bool:
         """Mark alle berichten in conversation als gelezen"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
+            schemas = ['main'] + [self._attach_archive(conn, year) for year in self._archive_years(conversation_id)]
             
-            cursor.execute("""
-                UPDATE messages
-                SET read = 1
-                WHERE conversation_id = ? AND direction = 'inbound'
-            """, (conversation_id,))
+            for schema in schemas:
+                cursor.execute(f"""
+                    UPDATE {schema}.messages
+                    SET read = 1
+                    WHERE conversation_id = ? AND direction = 'inbound' AND read = 0
+                """, (conversation_id,))
+            
+            # Read inside the write transaction, so the delta matches what we reset
+            cursor.execute("SELECT unread_count FROM conversations WHERE id = ?", (conversation_id,))
+            row = cursor.fetchone()
+            cleared = row[0] if row else 0
             
             cursor.execute("""
                 UPDATE conversations
@@ -344,87 +881,290 @@ class InboxService:
             """, (conversation_id,))
             
             conn.commit()
-            conn.close()
+            self._bump_version()
+            
+            if cleared:
+                self.events.publish('read', {
+                    'conversation_id': conversation_id,
+                    'unread_delta': -cleared,
+                    'unread_total': self.get_unread_count()
+                })
             
             logger.info(f"✅ Conversation marked as read: {conversation_id}")
             return True
             
         except Exception as e:
+            self._rollback()
             logger.error(f"❌ Error marking conversation as read: {e}")
             return False
     
-    def get_unread_count(self) -> int:
-        """Get totaal aantal ongelezen berichten"""
+    def set_attachments(self, message_id: str, attachments: List[Dict]) -> bool:
+        """Replace the attachments of a stored message, False if it isn't stored (yet)"""
+        import json
+        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
-            
-            cursor.execute("SELECT SUM(unread_count) FROM conversations")
-            result = cursor.fetchone()
-            
-            conn.close()
-            return result[0] or 0
-            
+            cursor.execute("UPDATE messages SET attachments = ? WHERE id = ?", (json.dumps(attachments), message_id))
+            conn.commit()
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ Error updating attachments of {message_id}: {e}")
+            return False
+        
+        if cursor.rowcount:
+            self._bump_version()
+        return cursor.rowcount > 0
+    
+    def get_unread_count(self) -> int:
+        """Get totaal aantal ongelezen berichten (running total, see _init_unread_counter)"""
+        try:
+            row = self._connect().execute("SELECT unread_total FROM inbox_counters WHERE id = 1").fetchone()
+            return row[0] if row else 0
         except Exception as e:
             logger.error(f"❌ Error getting unread count: {e}")
             return 0
     
+    def refresh_unread_count(self) -> int:
+        """Recount the running unread total from the conversations table (repair), returns it"""
+        try:
+            conn = self._connect()
+            conn.execute("""
+                UPDATE inbox_counters
+                SET unread_total = (SELECT COALESCE(SUM(unread_count), 0) FROM conversations)
+                WHERE id = 1
+            """)
+            conn.commit()
+        except Exception as e:
+            self._rollback()
+            logger.error(f"❌ Error recounting unread messages: {e}")
+            return 0
+        return self.get_unread_count()
+    
+    def _publish_messages(self, messages: List[Message], names: Dict[str, str]):
+        """Publish a 'message' event per committed message, with the running unread total"""
+        if not self.events.subscribers:
+            return
+        total = self.get_unread_count()
+        for message in messages:
+            self.events.publish('message', {
+                'message': message.to_dict(),
+                'practice_name': names[message.id],
+                'unread_delta': 1 if message.direction == 'inbound' else 0,
+                'unread_total': total
+            })
+    
     def search_messages(
         self,
         query: str,
         channel: Optional[str] = None,
-        practice_id: Optional[int] = None
+        practice_id: Optional[int] = None,
+        limit: int = 50
     ) -> List[Message]:
-        """Zoek berichten"""
-        import json
+        """
+        Zoek berichten, best match first
         
+        Uses the FTS5 index: every word must match (the last one as a prefix),
+        ranked by bm25, each message carries a snippet with the hits in <mark>.
+        Without FTS5 it falls back to a LIKE scan, newest first. Archived
+        messages are searched too: bm25 scores of different index files are
+        not comparable, so each file is ranked on its own and the results are
+        interleaved, inbox first and then the archives newest year first.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            sql = """
-                SELECT id, conversation_id, practice_id, channel, direction,
-                       content, sender, recipient, timestamp, status, metadata, read, attachments
-                FROM messages
-                WHERE content LIKE ?
-            """
-            params = [f"%{query}%"]
-            
-            if channel:
-                sql += " AND channel = ?"
-                params.append(channel)
-            
-            if practice_id:
-                sql += " AND practice_id = ?"
-                params.append(practice_id)
-            
-            sql += " ORDER BY timestamp DESC LIMIT 50"
-            
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-            
-            messages = []
-            for row in rows:
-                message = Message(
-                    id=row[0],
-                    conversation_id=row[1],
-                    practice_id=row[2],
-                    channel=row[3],
-                    direction=row[4],
-                    content=row[5],
-                    sender=row[6],
-                    recipient=row[7],
-                    timestamp=datetime.fromisoformat(row[8]),
-                    status=row[9],
-                    metadata=json.loads(row[10]) if row[10] else {},
-                    read=bool(row[11]),
-                    attachments=json.loads(row[12]) if row[12] else []
-                )
-                messages.append(message)
+            columns = ', '.join(f'm.{column}' for column in Message.COLUMNS)
+            if self.fts_enabled:
+                match = fts_query(query, channel=channel, practice_id=practice_id)
+                if match is None:
+                    return []
+                sql = f"""
+                    SELECT {columns},
+                           snippet(messages_fts, 0, '<mark>', '</mark>', '…', {self.SNIPPET_TOKENS}),
+                           rank
+                    FROM {{schema}}.messages_fts
+                    JOIN {{schema}}.messages m ON m.rowid = messages_fts.rowid
+                    WHERE messages_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                """
+                params = [match, limit]
+            else:
+                sql = f"""
+                    SELECT {columns}, NULL, m.timestamp
+                    FROM {{schema}}.messages m
+                    WHERE m.content LIKE ?
+                """
+                params = [f"%{query}%"]
+                
+                if channel:
+                    sql += " AND m.channel = ?"
+                    params.append(channel)
+                
+                if practice_id:
+                    sql += " AND m.practice_id = ?"
+                    params.append(practice_id)
+                
+                sql += " ORDER BY m.timestamp DESC LIMIT ?"
+                params.append(limit)
             
-            conn.close()
-            return messages
+            # Same query in the inbox database and every archive that can match
+            years = self._archive_years(f"conv_{int(practice_id)}" if practice_id else None)
+            schemas = ['main'] + [self._attach_archive(conn, year) for year in years]
+            results = []
+            for schema in schemas:
+                cursor.execute(sql.format(schema=schema), params)
+                results.append(cursor.fetchall())
+            if not self.fts_enabled:
+                # Timestamps are one scale: merge newest first
+                rows = sorted((row for result in results for row in result), key=lambda row: row[-1], reverse=True)
+            else:
+                # Round-robin over the per-file rankings
+                rows = [row for batch in zip_longest(*results) for row in batch if row is not None]
+            rows = rows[:limit]
+            
+            # Then the snippet; the sort key is dropped
+            return [Message.from_row(row[:-1]) for row in rows]
             
         except Exception as e:
             logger.error(f"❌ Error searching messages: {e}")
             return []
+    
+    # ------------------------------------------------------------------
+    # Archive: messages older than the hot window live in one SQLite file
+    # per year next to the inbox database, attached when a read needs them
+    # ------------------------------------------------------------------
+    
+    def archive_path(self, year: int) -> Path:
+        db_path = Path(self.db_path)
+        return db_path.with_name(f"{db_path.stem}_archive_{year}{db_path.suffix}")
+    
+    def _init_archive(self, path: Path):
+        """Create an archive file: messages table, indexes and search index"""
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.cursor()
+            self._create_messages_table(cursor)
+            self._create_message_indexes(cursor)
+            self._init_search(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _attach_archive(self, conn: sqlite3.Connection, year: int) -> str:
+        """
+        Attach the archive of `year` to this thread's connection, returns its schema name
+        
+        Stays attached for later reads; past SQLite's attach limit the least
+        recently used archive is detached. Not inside a transaction.
+        """
+        attached = self._local.attached
+        schema = f"archive_{int(year)}"
+        if schema in attached:
+            attached[schema] = attached.pop(schema)
+            return schema
+        
+        path = self.archive_path(year)
+        if not path.exists():
+            self._init_archive(path)
+        if len(attached) >= conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+            oldest = next(iter(attached))
+            conn.execute(f"DETACH DATABASE {oldest}")
+            del attached[oldest]
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+        attached[schema] = path
+        return schema
+    
+    def _archive_years(self, conversation_id: Optional[str] = None, newer_than: Optional[str] = None) -> List[int]:
+        """Archive years, newest first; only those holding the conversation (and messages after `newer_than`)"""
+        conn = self._connect()
+        if conversation_id is None:
+            rows = conn.execute("SELECT year FROM message_archives ORDER BY year DESC").fetchall()
+        else:
+            query = "SELECT year FROM archived_conversations WHERE conversation_id = ?"
+            params = [conversation_id]
+            if newer_than:
+                query += " AND last_timestamp >= ?"
+                params.append(newer_than)
+            rows = conn.execute(query + " ORDER BY year DESC", params).fetchall()
+        return [row[0] for row in rows]
+    
+    def archive_messages(self, before: datetime) -> Dict[int, int]:
+        """
+        Move messages older than `before` from the inbox database into the yearly archives
+        
+        Two commits per month, each writing one file: the messages are copied
+        into the archive, then removed from the inbox database if the archive
+        holds them. SQLite (WAL) is only atomic per file, so a crash can at
+        worst leave a copy in both; reruns are safe and finish the move
+        (already archived ids are skipped). Conversations,
+        unread counts and last-message pointers stay in the inbox database.
+        Run vacuum() afterwards to give the space back.
+        
+        Returns:
+            {year: messages archived}
+        """
+        cutoff = before.isoformat()
+        conn = self._connect()
+        months = [row[0] for row in conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM messages WHERE timestamp < ? ORDER BY 1", (cutoff,)
+        ).fetchall()]
+        columns = ', '.join(Message.COLUMNS + ('created_at',))
+        
+        archived: Dict[int, int] = {}
+        for month in months:
+            year = int(month[:4])
+            schema = self._attach_archive(conn, year)
+            lo = f"{month}-01"
+            hi = min(cutoff, f"{year + 1}-01-01" if month.endswith('-12') else f"{year}-{int(month[5:]) + 1:02d}-01")
+            try:
+                cursor = conn.cursor()
+                
+                # 1. Copy into the archive file, committed before anything leaves crm.db
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO {schema}.messages ({columns})
+                    SELECT {columns} FROM main.messages WHERE timestamp >= ? AND timestamp < ?
+                """, (lo, hi))
+                conn.commit()
+                
+                # 2. In crm.db only: record and delete what the archive holds
+                in_archive = f"id IN (SELECT id FROM {schema}.messages)"
+                cursor.execute(f"""
+                    INSERT INTO archived_conversations (conversation_id, year, last_timestamp)
+                    SELECT conversation_id, ?, MAX(timestamp) FROM main.messages
+                    WHERE timestamp >= ? AND timestamp < ? AND {in_archive}
+                    GROUP BY conversation_id
+                    ON CONFLICT (conversation_id, year) DO UPDATE
+                    SET last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+                """, (year, lo, hi))
+                cursor.execute(f"DELETE FROM main.messages WHERE timestamp >= ? AND timestamp < ? AND {in_archive}",
+                               (lo, hi))
+                moved = cursor.rowcount
+                cursor.execute("""
+                    INSERT INTO message_archives (year, file, messages, archived_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (year) DO UPDATE
+                    SET messages = messages + excluded.messages, archived_at = excluded.archived_at
+                """, (year, self.archive_path(year).name, moved, datetime.now().isoformat()))
+                conn.commit()
+            except Exception as e:
+                self._rollback()
+                logger.error(f"❌ Error archiving messages of {month}: {e}")
+                raise
+            archived[year] = archived.get(year, 0) + moved
+        
+        if archived:
+            self._bump_version()
+            logger.info(f"✅ Archived {sum(archived.values())} messages older than {cutoff}: {archived}")
+        return archived
+    
+    def vacuum(self):
+        """Compact the inbox database after archiving (search index merged, WAL truncated)"""
+        conn = self._connect()
+        if self.fts_enabled:
+            with conn:
+                conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('optimize')")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        logger.info(f"✅ Inbox database vacuumed: {self.db_path}")
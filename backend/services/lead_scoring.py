@@ -2,12 +2,30 @@
 Lead Scoring Service
 Calculates lead quality based on engagement, demographics, and behavior
 """
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
 
+try:
+    import numpy as np
+except ImportError:  # optional, practices are scored one by one
+    np = None
+
 logger = logging.getLogger(__name__)
 
+EPOCH = datetime(1970, 1, 1)
+DAY_MICROSECONDS = 86400 * 10 ** 6
+
+
+def _last_email_datetime(value) -> datetime:
+    """workflow.last_email_date as a naive datetime (the offset is dropped, not applied)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _stamp(moment: datetime) -> str:
+    """Fixed-width ISO timestamp, so stored rescore_at values compare as strings"""
+    return moment.isoformat(timespec='microseconds')
+
 
 class LeadScoringService:
     """AI-powered lead scoring system"""
@@ -33,19 +51,40 @@ class LeadScoringService:
         'practice_size_small': 5,
     }
     
-    # Time decay factors
+    # Time decay factors, by recency bucket of the last email
     RECENCY_MULTIPLIERS = {
         'today': 1.5,
         'this_week': 1.2,
         'this_month': 1.0,
         'older': 0.7,
+        'no_contact': 0.5,
+        'unknown': 1.0,  # last_email_date can't be parsed
     }
     
+    # Dated bucket -> days after the last email at which it ends (older never does)
+    RECENCY_BUCKET_ENDS = {
+        'today': 1,
+        'this_week': 8,
+        'this_month': 31,
+    }
+    
+    # A reply on any channel counts as 'email_replied'
+    REPLY_FLAGS = ('replied', 'sms_replied', 'whatsapp_replied')
+    
+    # Buckets that can be 7+ days since the last email
+    RECENCY_DATED_STALE = ('this_week', 'this_month', 'older')
+    
+    # Workflow events that change scoring inputs (record_event)
+    EVENTS = ('email_sent', 'email_opened', 'email_clicked', 'email_replied',
+              'sms_replied', 'whatsapp_replied', 'meeting_booked')
+    
     @classmethod
-    def calculate_score(cls, practice: Dict) -> Dict:
+    def calculate_score(cls, practice: Dict, now: Optional[datetime] = None) -> Dict:
         """
         Calculate comprehensive lead score
         
+        now: reference time for recency (default: datetime.now())
+        
         Returns:
             {
                 'total_score': int (0-100),
@@ -53,18 +92,36 @@ class LeadScoringService:
                 'engagement_score': int,
                 'demographic_score': int,
                 'recency_score': float,
+                'recency_bucket': str,
+                'rescore_at': str or None (when the recency bucket changes),
                 'next_action': str,
                 'priority': int (1-5)
             }
         """
+        now = now or datetime.now()
         engagement = cls._calculate_engagement_score(practice)
         demographic = cls._calculate_demographic_score(practice)
-        recency = cls._calculate_recency_multiplier(practice)
+        bucket, rescore_at = cls._recency_bucket(practice, now)
+        recency = cls.RECENCY_MULTIPLIERS[bucket]
         
         # Total score with recency bonus
         total_score = int((engagement + demographic) * recency)
         total_score = min(100, max(0, total_score))  # Cap at 0-100
         
+        return cls._score_result(total_score, engagement, demographic, recency, bucket,
+                                 rescore_at and _stamp(rescore_at), now.isoformat())
+    
+    @staticmethod
+    def _score_result(
+        total_score: int,
+        engagement: int,
+        demographic: int,
+        recency: float,
+        bucket: str,
+        rescore_at: Optional[str],
+        calculated_at: str
+    ) -> Dict:
+        """Score dict for a total, shared by the per-practice and vectorized paths"""
         # Determine category
         if total_score >= 75:
             category = 'hot'
@@ -89,9 +146,11 @@ class LeadScoringService:
             'engagement_score': engagement,
             'demographic_score': demographic,
             'recency_multiplier': recency,
+            'recency_bucket': bucket,
+            'rescore_at': rescore_at,
             'next_action': next_action,
             'priority': priority,
-            'calculated_at': datetime.now().isoformat()
+            'calculated_at': calculated_at
         }
     
     @classmethod
@@ -107,7 +166,7 @@ class LeadScoringService:
         if workflow.get('email_clicked'):
             score += cls.WEIGHTS['email_clicked']
         
-        if workflow.get('replied'):
+        if any(workflow.get(flag) for flag in cls.REPLY_FLAGS):
             score += cls.WEIGHTS['email_replied']
         
         # Number of emails sent (diminishing returns)
@@ -153,37 +212,208 @@ class LeadScoringService:
         return min(score, 30)  # Max 30 from demographics
     
     @classmethod
-    def _calculate_recency_multiplier(cls, practice: Dict) -> float:
+    def _calculate_recency_multiplier(cls, practice: Dict, now: Optional[datetime] = None) -> float:
         """Calculate multiplier based on recency of last interaction"""
+        return cls.RECENCY_MULTIPLIERS[cls._recency_bucket(practice, now or datetime.now())[0]]
+    
+    @classmethod
+    def _recency_bucket(cls, practice: Dict, now: datetime) -> tuple:
+        """(bucket, rescore_at): recency bucket of the last email and when it ends (None: never)"""
         workflow = practice.get('workflow', {})
         last_email_date = workflow.get('last_email_date')
         
         if not last_email_date:
-            return 0.5  # No recent activity
+            return 'no_contact', None  # No recent activity
         
         try:
-            last_date = datetime.fromisoformat(last_email_date.replace('Z', '+00:00'))
-            days_ago = (datetime.now() - last_date.replace(tzinfo=None)).days
-            
-            if days_ago == 0:
-                return cls.RECENCY_MULTIPLIERS['today']
-            elif days_ago <= 7:
-                return cls.RECENCY_MULTIPLIERS['this_week']
-            elif days_ago <= 30:
-                return cls.RECENCY_MULTIPLIERS['this_month']
-            else:
-                return cls.RECENCY_MULTIPLIERS['older']
+            last_email = _last_email_datetime(last_email_date)
         except Exception as e:
             logger.error(f"Error calculating recency: {e}")
-            return 1.0
+            return 'unknown', None
+        
+        days_ago = (now - last_email).days
+        if days_ago < 0:
+            # Dated in the future: this week, today once that moment is reached
+            return 'this_week', last_email
+        if days_ago == 0:
+            bucket = 'today'
+        elif days_ago <= 7:
+            bucket = 'this_week'
+        elif days_ago <= 30:
+            bucket = 'this_month'
+        else:
+            return 'older', None
+        return bucket, last_email + timedelta(days=cls.RECENCY_BUCKET_ENDS[bucket])
+    
+    # ------------------------------------------------------------------
+    # Materialized scores
+    # ------------------------------------------------------------------
     
     @classmethod
-    def bulk_score(cls, practices: List[Dict]) -> List[Dict]:
+    def rescore(cls, practice: Dict, now: Optional[datetime] = None) -> Dict:
+        """Calculate and store practice['score'], returns it"""
+        practice['score'] = cls.calculate_score(practice, now)
+        return practice['score']
+    
+    @classmethod
+    def record_event(cls, practice: Dict, event: str, now: Optional[datetime] = None) -> Dict:
+        """
+        Apply a workflow event (EVENTS) to a practice and rescore it
+        
+        The practice is updated in place (workflow is replaced, not mutated).
+        Returns the changed fields as dotted paths, ready for
+        DatabaseService.patch_practices: {'workflow.replied': True, ..., 'score': {...}}
+        """
+        now = now or datetime.now()
+        workflow = practice.get('workflow') or {}
+        
+        if event == 'email_sent':
+            changes = {'emails_sent': workflow.get('emails_sent', 0) + 1, 'last_email_date': now.isoformat()}
+        elif event == 'email_opened':
+            changes = {'email_opened': True, 'open_count': workflow.get('open_count', 0) + 1}
+        elif event == 'email_clicked':
+            changes = {'email_clicked': True}
+        elif event == 'email_replied':
+            changes = {'replied': True, 'reply_date': now.isoformat()}
+        elif event == 'sms_replied':
+            changes = {'sms_replied': True, 'last_sms_reply': now.isoformat()}
+        elif event == 'whatsapp_replied':
+            changes = {'whatsapp_replied': True, 'last_whatsapp_reply': now.isoformat()}
+        elif event == 'meeting_booked':
+            changes = {'meeting_booked': True}
+        else:
+            raise ValueError(f"Unknown lead event: {event}")
+        
+        practice['workflow'] = {**workflow, **changes}
+        patch = {f'workflow.{key}': value for key, value in changes.items()}
+        patch['score'] = cls.rescore(practice, now)
+        return patch
+    
+    @classmethod
+    def score_inputs(cls, practice: Dict) -> tuple:
+        """(engagement, demographic, last_email_date): what a stored score was calculated from"""
+        return (cls._calculate_engagement_score(practice), cls._calculate_demographic_score(practice),
+                practice.get('workflow', {}).get('last_email_date'))
+    
+    @staticmethod
+    def _is_current(score, stamp: str) -> bool:
+        """Stored score still valid at `stamp`: calculated with buckets and its bucket hasn't ended"""
+        if not isinstance(score, dict) or 'recency_bucket' not in score:
+            return False
+        return score['rescore_at'] is None or score['rescore_at'] > stamp
+    
+    @classmethod
+    def _inputs_match(cls, practice: Dict, now: datetime) -> bool:
+        """Stored score parts equal a recalculation (no edit of email, tel, artsen, workflow... since)"""
+        score = practice['score']
+        return (score['engagement_score'] == cls._calculate_engagement_score(practice)
+                and score['demographic_score'] == cls._calculate_demographic_score(practice)
+                and score['recency_bucket'] == cls._recency_bucket(practice, now)[0])
+    
+    @classmethod
+    def refresh_scores(
+        cls,
+        practices: List[Dict],
+        now: Optional[datetime] = None,
+        verify_inputs: bool = False
+    ) -> List[Dict]:
+        """
+        Rescore only practices without a current stored score
+        
+        That is practices never scored (or scored before recency buckets were
+        stored) and those whose recency bucket ended (today -> this_week ->
+        this_month -> older). verify_inputs also recalculates the parts of
+        every stored score and rescores those whose inputs were edited
+        without a rescore (a full scoring pass, for scripts/rescore_leads.py).
+        Returns the rescored practices, the rest are left untouched.
+        """
+        now = now or datetime.now()
+        stamp = _stamp(now)
+        due = [p for p in practices if not cls._is_current(p.get('score'), stamp)
+               or (verify_inputs and not cls._inputs_match(p, now))]
+        if not due:
+            return []
+        if np is not None:
+            return LeadFeatures(due, now).attach_scores(cls, np.arange(len(due)))
+        for practice in due:
+            cls.rescore(practice, now)
+        return due
+    
+    @classmethod
+    def top_leads(
+        cls,
+        fetch: Callable[[int], List[Dict]],
+        category: str = 'hot',
+        limit: int = 10,
+        now: Optional[datetime] = None,
+        save: Optional[Callable[[List[Dict]], object]] = None
+    ) -> List[Dict]:
+        """
+        Best `limit` leads of a category, read from a score index
+        
+        fetch(n) returns the n best practices of the category by stored score,
+        e.g. lambda n: db.top_k('hot', n). Stored scores whose recency bucket
+        ended are refreshed (and handed to save, to write them back). Decay
+        only lowers a score (apart from future-dated emails), so the walk
+        stops once the limit-th refreshed score beats the lowest indexed score
+        fetched; otherwise it fetches twice as many. Unscored practices aren't
+        in the index, scripts/rescore_leads.py scores them.
+        """
+        now = now or datetime.now()
+        n = max(limit, 1)
+        while True:
+            candidates = fetch(n)
+            lowest = candidates[-1]['score']['total_score'] if candidates else None
+            refreshed = cls.refresh_scores(candidates, now)
+            if refreshed and save is not None:
+                save(refreshed)
+            leads = [p for p in candidates if p['score']['category'] == category]
+            leads.sort(key=lambda p: (-p['score']['total_score'], p['nr']))
+            if (len(candidates) < n or not refreshed
+                    or (len(leads) >= limit and leads[limit - 1]['score']['total_score'] > lowest)):
+                return leads[:limit]
+            n *= 2
+    
+    @classmethod
+    def stored_needs_attention(cls, practices: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """needs_attention from the stored scores (refreshed where due)"""
+        now = now or datetime.now()
+        cls.refresh_scores(practices, now)
+        
+        attention_needed = []
+        for practice in practices:
+            score_data = practice['score']
+            workflow = practice.get('workflow', {})
+            
+            # High score but no recent contact (7+ days); only dated buckets can be
+            if score_data['total_score'] >= 60 and score_data['recency_bucket'] in cls.RECENCY_DATED_STALE:
+                try:
+                    days_ago = (now - _last_email_datetime(workflow['last_email_date'])).days
+                    if days_ago >= 7:
+                        practice['attention_reason'] = f'High score ({score_data["total_score"]}) but {days_ago} days since last contact'
+                        attention_needed.append(practice)
+                except Exception:
+                    pass
+            
+            # Email opened but no follow-up
+            if workflow.get('email_opened') and not workflow.get('replied') and workflow.get('emails_sent', 0) < 2:
+                practice['attention_reason'] = 'Opened email but no follow-up sent'
+                attention_needed.append(practice)
+        
+        return attention_needed
+    
+    @classmethod
+    def bulk_score(cls, practices: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
         """Score multiple practices and sort by score"""
+        now = now or datetime.now()
+        if np is not None and practices:
+            features = LeadFeatures(practices, now)
+            return features.attach_scores(cls, np.argsort(-features.total, kind='stable'))
+        
         scored_practices = []
         
         for practice in practices:
-            score_data = cls.calculate_score(practice)
+            score_data = cls.calculate_score(practice, now)
             practice['score'] = score_data
             scored_practices.append(practice)
         
@@ -196,31 +426,41 @@ class LeadScoringService:
         return scored_practices
     
     @classmethod
-    def get_hot_leads(cls, practices: List[Dict], limit: int = 10) -> List[Dict]:
-        """Get top hot leads"""
-        scored = cls.bulk_score(practices)
+    def get_hot_leads(cls, practices: List[Dict], limit: int = 10, now: Optional[datetime] = None) -> List[Dict]:
+        """Get top hot leads (only those get a 'score' attached)"""
+        now = now or datetime.now()
+        if np is not None and practices:
+            features = LeadFeatures(practices, now)
+            hot = np.flatnonzero(features.total >= 75)
+            top = hot[np.argsort(-features.total[hot], kind='stable')][:limit]
+            return features.attach_scores(cls, top)
+        
+        scored = cls.bulk_score(practices, now)
         return [p for p in scored if p['score']['category'] == 'hot'][:limit]
     
     @classmethod
-    def needs_attention(cls, practices: List[Dict]) -> List[Dict]:
+    def needs_attention(cls, practices: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
         """
         Find leads that need immediate attention
         - High score but no recent contact
         - Warm leads going cold
         - Engaged but not followed up
         """
+        now = now or datetime.now()
+        if np is not None and practices:
+            return cls._needs_attention_vectorized(practices, now)
+        
         attention_needed = []
         
         for practice in practices:
-            score_data = cls.calculate_score(practice)
+            score_data = cls.calculate_score(practice, now)
             workflow = practice.get('workflow', {})
             
             # High score but no recent contact (7+ days)
             last_email = workflow.get('last_email_date')
             if score_data['total_score'] >= 60 and last_email:
                 try:
-                    last_date = datetime.fromisoformat(last_email.replace('Z', '+00:00'))
-                    days_ago = (datetime.now() - last_date.replace(tzinfo=None)).days
+                    days_ago = (now - _last_email_datetime(last_email)).days
                     if days_ago >= 7:
                         practice['attention_reason'] = f'High score ({score_data["total_score"]}) but {days_ago} days since last contact'
                         practice['score'] = score_data
@@ -235,3 +475,175 @@ class LeadScoringService:
                 attention_needed.append(practice)
         
         return attention_needed
+    
+    @classmethod
+    def _needs_attention_vectorized(cls, practices: List[Dict], now: datetime) -> List[Dict]:
+        """needs_attention over a LeadFeatures snapshot, same results and order"""
+        features = LeadFeatures(practices, now)
+        stale = (features.total >= 60) & features.dated & (features.days_ago >= 7)
+        unanswered = features.email_opened & ~features.replied & (features.emails_sent < 2)
+        
+        indices = np.flatnonzero(stale | unanswered)
+        
+        attention_needed = []
+        for practice, is_stale, is_unanswered, days_ago in zip(
+            features.attach_scores(cls, indices), stale[indices].tolist(),
+            unanswered[indices].tolist(), features.days_ago[indices].tolist()
+        ):
+            if is_stale:
+                practice['attention_reason'] = f'High score ({practice["score"]["total_score"]}) but {days_ago} days since last contact'
+                attention_needed.append(practice)
+            if is_unanswered:
+                practice['attention_reason'] = 'Opened email but no follow-up sent'
+                attention_needed.append(practice)
+        
+        return attention_needed
+
+
+class LeadFeatures:
+    """
+    Columnar snapshot of the lead scoring inputs of a list of practices
+    
+    Each input is read once into a NumPy column (last_email_date is parsed
+    once, against a single `now`); engagement, demographic and recency
+    scores are then array operations with the same rules as
+    LeadScoringService.calculate_score.
+    """
+    
+    ENGAGEMENT_FLAGS = (
+        ('email_opened', 'email_opened'),
+        ('email_clicked', 'email_clicked'),
+        ('phone_contacted', 'phone_call'),
+        ('meeting_booked', 'meeting_booked'),
+    )
+    
+    # last_email_date states
+    MISSING, INVALID, DATED = 0, 1, 2
+    
+    # Recency bucket codes (self.bucket) -> names
+    BUCKETS = ('no_contact', 'unknown', 'today', 'this_week', 'this_month', 'older')
+    
+    def __init__(self, practices: List[Dict], now: datetime):
+        self.practices = practices
+        self.calculated_at = now.isoformat()
+        weights = LeadScoringService.WEIGHTS
+        demographics = LeadScoringService.DEMOGRAPHIC_SCORES
+        multipliers = LeadScoringService.RECENCY_MULTIPLIERS
+        workflows = [practice.get('workflow', {}) for practice in practices]
+        
+        # Engagement: flags, a reply on any channel, emails sent with diminishing returns, capped at 70
+        for key, _ in self.ENGAGEMENT_FLAGS:
+            setattr(self, key, self._flags(workflows, key))
+        replies = [self._flags(workflows, key) for key in LeadScoringService.REPLY_FLAGS]
+        self.replied = replies[0]  # email reply only
+        self.emails_sent = np.array([workflow.get('emails_sent', 0) for workflow in workflows], dtype=np.int64)
+        engagement = sum(getattr(self, key) * weights[weight] for key, weight in self.ENGAGEMENT_FLAGS)
+        engagement += np.logical_or.reduce(replies) * weights['email_replied']
+        engagement += np.where(self.emails_sent > 0, np.minimum(self.emails_sent * 3, 15), 0)
+        self.engagement = np.minimum(engagement, 70)
+        
+        # Demographics: contact info and practice size (artsen that isn't a list scores 0), capped at 30
+        demographic = sum(
+            np.array([bool(practice.get(field)) for practice in practices], dtype=bool) * demographics[key]
+            for field, key in (('email', 'has_email'), ('tel', 'has_phone'), ('website', 'has_website'))
+        )
+        doctors = np.array([
+            len(artsen) if isinstance(artsen, list) else -1
+            for artsen in (practice.get('artsen', []) for practice in practices)
+        ], dtype=np.int64)
+        demographic += np.select(
+            [doctors >= 5, doctors >= 2, doctors >= 0],
+            [demographics['practice_size_large'], demographics['practice_size_medium'], demographics['practice_size_small']],
+            0
+        )
+        self.demographic = np.minimum(demographic, 30)
+        
+        # Recency: whole days since the last email (floored like timedelta.days)
+        last_email, state = self._parse_dates([workflow.get('last_email_date') for workflow in workflows])
+        self.dated = state == self.DATED
+        now_us = (now - EPOCH) // timedelta(microseconds=1)
+        self.days_ago = (now_us - last_email) // DAY_MICROSECONDS
+        self.bucket = np.select(
+            [state == self.MISSING, state == self.INVALID, self.days_ago < 0,
+             self.days_ago == 0, self.days_ago <= 7, self.days_ago <= 30],
+            [0, 1, 3, 2, 3, 4],
+            5
+        )
+        self.recency = np.array([multipliers[name] for name in self.BUCKETS])[self.bucket]
+        
+        # Bucket end: days after the last email, 0 for future dates (today from then on), -1 never
+        bucket_ends = LeadScoringService.RECENCY_BUCKET_ENDS
+        ends = np.array([bucket_ends.get(name, -1) for name in self.BUCKETS])[self.bucket]
+        ends[self.dated & (self.days_ago < 0)] = 0
+        ending = ends >= 0
+        self.rescore_at = np.full(len(practices), None, dtype=object)
+        if ending.any():
+            moments = (last_email[ending] + ends[ending] * DAY_MICROSECONDS).astype('datetime64[us]')
+            self.rescore_at[ending] = np.datetime_as_string(moments).tolist()
+        
+        total = ((self.engagement + self.demographic) * self.recency).astype(np.int64)
+        self.total = np.clip(total, 0, 100)
+    
+    @staticmethod
+    def _flags(workflows: List[Dict], key: str):
+        return np.array([bool(workflow.get(key)) for workflow in workflows], dtype=bool)
+    
+    @classmethod
+    def _parse_dates(cls, values: List) -> tuple:
+        """
+        last_email_date values as (microseconds since EPOCH, state) columns
+        
+        Plain 'YYYY-MM-DDTHH:MM:SS[.ffffff][Z]' strings, what the workflow
+        writes, are parsed by NumPy in one call; anything else (offsets,
+        other ISO forms, garbage) goes through _last_email_datetime.
+        """
+        micros = np.zeros(len(values), dtype=np.int64)
+        state = np.full(len(values), cls.MISSING, dtype=np.int8)
+        plain, prefixes, other = [], [], []
+        for i, value in enumerate(values):
+            if not value:
+                continue
+            if type(value) is str:
+                length = len(value) - value.endswith('Z')
+                if (length == 19 or length == 26) and value[10:11] == 'T':
+                    plain.append(i)
+                    prefixes.append(value[:length])
+                    continue
+            other.append(i)
+        
+        if plain:
+            try:
+                micros[plain] = np.array(prefixes, dtype='datetime64[us]').astype(np.int64)
+                state[plain] = cls.DATED
+            except ValueError:
+                # e.g. an impossible day, let the slow path pick it out
+                other.extend(plain)
+        
+        invalid = 0
+        for i in other:
+            try:
+                micros[i] = (_last_email_datetime(values[i]) - EPOCH) // timedelta(microseconds=1)
+                state[i] = cls.DATED
+            except Exception:
+                state[i] = cls.INVALID
+                invalid += 1
+        if invalid:
+            logger.error(f"Error calculating recency: {invalid} practices with an invalid last_email_date")
+        return micros, state
+    
+    def attach_scores(self, service, indices) -> List[Dict]:
+        """Set the score dict (as calculate_score builds it) on the practices at `indices`, in that order"""
+        indices = np.asarray(indices, dtype=np.intp)
+        practices = self.practices
+        result = []
+        for i, total, engagement, demographic, recency, bucket, rescore_at in zip(
+            indices.tolist(), self.total[indices].tolist(), self.engagement[indices].tolist(),
+            self.demographic[indices].tolist(), self.recency[indices].tolist(),
+            self.bucket[indices].tolist(), self.rescore_at[indices].tolist()
+        ):
+            practice = practices[i]
+            practice['score'] = service._score_result(
+                total, engagement, demographic, recency, self.BUCKETS[bucket], rescore_at, self.calculated_at
+            )
+            result.append(practice)
+        return result
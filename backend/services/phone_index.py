@@ -0,0 +1,54 @@
+"""
+Phone Index
+Reverse index normalized E.164 number -> practice nrs, for matching inbound SMS/WhatsApp
+"""
+from typing import Any, Dict, Iterable, List
+
+from backend.services.practice_keys import normalize_phone_number, practice_phones
+
+
+class PhoneIndex:
+    """
+    Maintained reverse index of practice phone numbers
+
+    A practice is listed under every number in its tel field ("a; b"), a
+    number shared by several practices maps to all of them. Callers keep it
+    in sync by calling add() on every write and discard() on deletes.
+    """
+
+    def __init__(self):
+        self._nrs: Dict[str, Dict[Any, None]] = {}   # phone -> nrs (ordered set)
+        self._phones: Dict[Any, List[str]] = {}      # nr -> phones, to unindex on change
+
+    def rebuild(self, practices: Iterable[Dict]):
+        self._nrs = {}
+        self._phones = {}
+        for practice in practices:
+            self.add(practice)
+
+    def add(self, practice: Dict):
+        """Index (or re-index) a practice under its current numbers"""
+        nr = practice.get('nr')
+        if nr is None:
+            return
+        self.discard(nr)
+        phones = practice_phones(practice)
+        if phones:
+            self._phones[nr] = phones
+            for phone in phones:
+                self._nrs.setdefault(phone, {})[nr] = None
+
+    def discard(self, nr: Any):
+        for phone in self._phones.pop(nr, ()):
+            nrs = self._nrs.get(phone)
+            if nrs is not None:
+                nrs.pop(nr, None)
+                if not nrs:
+                    del self._nrs[phone]
+
+    def lookup(self, phone: str) -> List[Any]:
+        """nrs of the practices listing this number (any format, whatsapp: prefix allowed)"""
+        return list(self._nrs.get(normalize_phone_number(phone or ''), ()))
+
+    def __len__(self) -> int:
+        return len(self._nrs)
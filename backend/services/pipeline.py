@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import logging
 
+from backend.services.stage_counters import StageCounters
+
 logger = logging.getLogger(__name__)
 
 
@@ -196,10 +198,36 @@ class PipelineService:
         
         return practice
     
+    @staticmethod
+    def deal_card(practice: Dict) -> Dict:
+        """Compact Kanban card of a deal: what the board shows, without histories"""
+        pipeline = practice.get('pipeline') or {}
+        score = practice.get('score') or {}
+        return {
+            'nr': practice.get('nr'),
+            'naam': practice.get('naam'),
+            'gemeente': practice.get('gemeente'),
+            'deal_value': pipeline.get('deal_value') or 0,
+            'probability': pipeline.get('probability') or 0,
+            'stage_entered_at': pipeline.get('stage_entered_at'),
+            'score': score.get('total_score'),
+            'category': score.get('category')
+        }
+    
     @classmethod
     def get_pipeline_summary(cls, practices: List[Dict]) -> Dict:
+        """Get summary of all deals in pipeline (one pass, see summary_from_totals)"""
+        counters = StageCounters()
+        counters.rebuild(practices)
+        return cls.summary_from_totals(counters.totals())
+    
+    @classmethod
+    def summary_from_totals(cls, totals: Dict[str, Dict]) -> Dict:
         """
-        Get summary of all deals in pipeline
+        Pipeline summary from per-stage aggregates, O(stages)
+        
+        totals: {stage: {'count', 'value', 'weighted'}} as maintained by the
+        practice store (StageCounters / stage_counters table)
         
         Returns:
             {
@@ -209,46 +237,33 @@ class PipelineService:
                     'new_lead': {'count': int, 'value': float},
                     ...
                 },
-                'conversion_rates': {...},
-                'average_deal_age': float
+                'won_count': int,
+                'lost_count': int,
+                'win_rate': float,
+                'loss_rate': float
             }
         """
         summary = {
-            'total_deals': len(practices),
+            'total_deals': sum(t['count'] for t in totals.values()),
             'total_value': 0,
             'stages': {},
             'conversion_rates': {},
-            'won_count': 0,
-            'lost_count': 0
+            'won_count': totals.get('won', {}).get('count', 0),
+            'lost_count': totals.get('lost', {}).get('count', 0)
         }
         
-        # Initialize stage counts
         for stage in cls.DEFAULT_STAGES:
+            stage_totals = totals.get(stage['id'], {})
+            value = round(stage_totals.get('value', 0), 2)
             summary['stages'][stage['id']] = {
-                'count': 0,
-                'value': 0,
-                'deals': []
+                'count': stage_totals.get('count', 0),
+                'value': value
             }
-        
-        # Count deals per stage
-        for practice in practices:
-            pipeline = practice.get('pipeline', {})
-            current_stage = pipeline.get('current_stage', 'new_lead')
-            deal_value = pipeline.get('deal_value', 0)
-            
-            if current_stage in summary['stages']:
-                summary['stages'][current_stage]['count'] += 1
-                summary['stages'][current_stage]['value'] += deal_value
-                summary['stages'][current_stage]['deals'].append(practice.get('nr'))
-                summary['total_value'] += deal_value
-            
-            if current_stage == 'won':
-                summary['won_count'] += 1
-            elif current_stage == 'lost':
-                summary['lost_count'] += 1
+            summary['total_value'] += value
+        summary['total_value'] = round(summary['total_value'], 2)
         
         # Calculate conversion rates
-        total_deals = len(practices)
+        total_deals = summary['total_deals']
         if total_deals > 0:
             summary['win_rate'] = (summary['won_count'] / total_deals) * 100
             summary['loss_rate'] = (summary['lost_count'] / total_deals) * 100
@@ -289,6 +304,13 @@ class PipelineService:
         """
         Forecast expected revenue based on deal values and probabilities
         """
+        counters = StageCounters()
+        counters.rebuild(practices)
+        return cls.forecast_from_totals(counters.totals())
+    
+    @classmethod
+    def forecast_from_totals(cls, totals: Dict[str, Dict]) -> Dict:
+        """Revenue forecast from per-stage aggregates (won/lost excluded), O(stages)"""
         forecast = {
             'total_pipeline_value': 0,
             'weighted_value': 0,
@@ -296,30 +318,23 @@ class PipelineService:
             'by_stage': {}
         }
         
-        for practice in practices:
-            pipeline = practice.get('pipeline', {})
-            current_stage = pipeline.get('current_stage', 'new_lead')
-            deal_value = pipeline.get('deal_value', 0)
-            probability = pipeline.get('probability', 0) / 100
-            
+        for stage_id, stage_totals in totals.items():
             # Skip won/lost
-            if current_stage in ['won', 'lost']:
+            if stage_id in ['won', 'lost'] or not stage_totals['count']:
                 continue
             
-            forecast['total_pipeline_value'] += deal_value
-            forecast['weighted_value'] += deal_value * probability
-            
-            if current_stage not in forecast['by_stage']:
-                forecast['by_stage'][current_stage] = {
-                    'total_value': 0,
-                    'weighted_value': 0,
-                    'deal_count': 0
-                }
-            
-            forecast['by_stage'][current_stage]['total_value'] += deal_value
-            forecast['by_stage'][current_stage]['weighted_value'] += deal_value * probability
-            forecast['by_stage'][current_stage]['deal_count'] += 1
+            value = round(stage_totals['value'], 2)
+            weighted = round(stage_totals['weighted'], 2)
+            forecast['total_pipeline_value'] += value
+            forecast['weighted_value'] += weighted
+            forecast['by_stage'][stage_id] = {
+                'total_value': value,
+                'weighted_value': weighted,
+                'deal_count': stage_totals['count']
+            }
         
+        forecast['total_pipeline_value'] = round(forecast['total_pipeline_value'], 2)
+        forecast['weighted_value'] = round(forecast['weighted_value'], 2)
         return forecast
 
 
@@ -0,0 +1,137 @@
+"""
+Practice lookup keys
+Normalized values used to index practices by phone, email, gemeente, status and stage,
+and the field normalization applied to practices when they are written
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# Separators between numbers in one tel field (the scraper and OSM join them with '; ').
+# Not '/', Belgian numbers are written as 011/22.33.44
+PHONE_SEPARATORS = re.compile(r'[;,|\n]')
+
+
+def normalize_phone_number(phone: str) -> str:
+    """Normalize phone number to E.164 format for matching"""
+    if not phone:
+        return ""
+
+    # Remove whatsapp: prefix if present
+    phone = phone.replace('whatsapp:', '')
+
+    # Remove all non-digit characters except +
+    cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
+
+    # International prefix written as 00 (0032 ...)
+    if cleaned.startswith('00'):
+        cleaned = '+' + cleaned[2:]
+
+    # If no country code, assume Belgian number
+    if not cleaned.startswith('+'):
+        if cleaned.startswith('0'):
+            cleaned = '+32' + cleaned[1:]
+        else:
+            cleaned = '+32' + cleaned
+
+    return cleaned
+
+
+def normalize_practice(practice: Dict) -> Dict:
+    """
+    Fill the frontend fields of older records in place (done once on write/load)
+
+    gem -> gemeente, praktijk -> naam (when naam is missing or 'Team'),
+    notitie -> adres.
+    """
+    if 'gemeente' not in practice and 'gem' in practice:
+        practice['gemeente'] = practice['gem']
+
+    if 'praktijk' in practice and (not practice.get('naam') or practice.get('naam') == 'Team'):
+        practice['naam'] = practice['praktijk']
+
+    if 'adres' not in practice and 'notitie' in practice:
+        practice['adres'] = practice['notitie']
+
+    return practice
+
+
+def practice_phones(practice: Dict) -> List[str]:
+    """Every normalized number in the tel field, in order, without duplicates"""
+    phones = []
+    for part in PHONE_SEPARATORS.split(str(practice.get('tel') or '')):
+        phone = normalize_phone_number(part.strip())
+        # '+32' alone (empty part, stray text) is not a number
+        if len(phone) > 6 and phone not in phones:
+            phones.append(phone)
+    return phones
+
+
+def practice_phone(practice: Dict) -> Optional[str]:
+    """First normalized phone number of a practice"""
+    phones = practice_phones(practice)
+    return phones[0] if phones else None
+
+
+def practice_email(practice: Dict) -> Optional[str]:
+    """Lowercased email address of a practice"""
+    email = (practice.get('email') or '').strip().lower()
+    return email or None
+
+
+def practice_gemeente(practice: Dict) -> Optional[str]:
+    """Lowercased gemeente of a practice (older records only have 'gem')"""
+    gemeente = (practice.get('gemeente') or practice.get('gem') or '').strip().lower()
+    return gemeente or None
+
+
+def practice_status(practice: Dict) -> Optional[str]:
+    return practice.get('status') or None
+
+
+def practice_stage(practice: Dict) -> str:
+    """Current pipeline stage, practices without pipeline data are new leads"""
+    return (practice.get('pipeline') or {}).get('current_stage', 'new_lead')
+
+
+def practice_deal_value(practice: Dict) -> float:
+    """pipeline.deal_value as a number, 0 when missing or not numeric"""
+    value = (practice.get('pipeline') or {}).get('deal_value') or 0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def practice_weighted_value(practice: Dict) -> float:
+    """Deal value weighted by the stage probability (pipeline.probability, percent)"""
+    probability = (practice.get('pipeline') or {}).get('probability') or 0
+    try:
+        return practice_deal_value(practice) * float(probability) / 100
+    except (TypeError, ValueError):
+        return 0
+
+
+def practice_score(practice: Dict) -> int:
+    """Stored lead score, unscored practices count as 0"""
+    return (practice.get('score') or {}).get('total_score', 0)
+
+
+# Lookup field -> key extractor
+INDEXED_FIELDS: Dict[str, Callable[[Dict], Any]] = {
+    'phone': practice_phone,
+    'email': practice_email,
+    'gemeente': practice_gemeente,
+    'status': practice_status,
+    'stage': practice_stage,
+}
+
+
+def normalize_lookup_value(field: str, value: Any) -> Any:
+    """Normalize a query value the same way the indexed key was normalized"""
+    if field == 'phone':
+        return normalize_phone_number(value or '') or None
+    if field in ('email', 'gemeente'):
+        return (value or '').strip().lower() or None
+    return value
@@ -0,0 +1,61 @@
+"""
+Practice Patch
+Partial updates of practice records by dotted path (workflow.replied, communication_history)
+"""
+from typing import Any, Dict, List
+
+
+def _parent(practice: Dict, path: str) -> tuple:
+    """Container dict and final key for a dotted path, creating missing levels"""
+    keys = path.split('.')
+    if not all(keys):
+        raise ValueError(f"invalid path: {path!r}")
+
+    node = practice
+    for key in keys[:-1]:
+        child = node.get(key)
+        if child is None:
+            child = node[key] = {}
+        elif not isinstance(child, dict):
+            raise ValueError(f"{path}: '{key}' is not an object")
+        node = child
+    return node, keys[-1]
+
+
+def apply_patch(practice: Dict, operation: Dict) -> Dict:
+    """
+    Apply one batch operation to a practice in place
+
+    operation:
+        set: {dotted.path: value}, missing parent objects are created
+        append: {dotted.path: item}, appends one item to a list (created if missing)
+    """
+    for path, value in (operation.get('set') or {}).items():
+        node, key = _parent(practice, path)
+        node[key] = value
+
+    for path, item in (operation.get('append') or {}).items():
+        node, key = _parent(practice, path)
+        items = node.get(key)
+        if items is None:
+            items = node[key] = []
+        elif not isinstance(items, list):
+            raise ValueError(f"{path} is not a list")
+        items.append(item)
+
+    return practice
+
+
+def validate_operations(operations: Any) -> List[Dict]:
+    """Check the shape of a batch: [{nr, set?, append?}, ...]"""
+    if not isinstance(operations, list):
+        raise ValueError("operations must be a list")
+    for op in operations:
+        if not isinstance(op, dict) or op.get('nr') is None:
+            raise ValueError("every operation needs an nr")
+        if 'nr' in (op.get('set') or {}):
+            raise ValueError("nr can't be changed")
+        for kind in ('set', 'append'):
+            if not isinstance(op.get(kind) or {}, dict):
+                raise ValueError(f"{kind} must be an object")
+    return operations
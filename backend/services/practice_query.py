@@ -0,0 +1,154 @@
+"""
+Practice Query
+Filtering, sorting, cursor pagination and field projection for practice lists
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend.services.practice_keys import (
+    practice_gemeente,
+    practice_score,
+    practice_stage,
+    practice_status,
+)
+
+# Sort key -> value extractor (None sorts last in both directions)
+SORT_KEYS = {
+    'nr': lambda p: None,
+    'naam': lambda p: (p.get('naam') or '').casefold() or None,
+    'gemeente': practice_gemeente,
+    'status': practice_status,
+    'stage': practice_stage,
+    'score': practice_score,
+}
+
+# Fields searched by the free-text filter
+TEXT_FIELDS = ('naam', 'praktijk', 'gemeente', 'email', 'tel', 'adres')
+
+MAX_LIMIT = 500
+
+
+def _nr_key(nr: Any) -> tuple:
+    return (0, nr) if isinstance(nr, (int, float)) else (1, str(nr))
+
+
+def _sort_key(practice: Dict, sort: str, descending: bool) -> list:
+    """Total order (value, nr) so keyset cursors never skip or repeat"""
+    value = SORT_KEYS[sort](practice)
+    present = value is not None
+    # reverse=True flips the flag too, keep missing values at the end
+    flag = int(present) if descending else int(not present)
+    return [flag, value if present else '', *_nr_key(practice.get('nr'))]
+
+
+def encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int = 4) -> list:
+    """Raises ValueError for cursors we did not hand out"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError('invalid cursor')
+    return key
+
+
+def _matches_text(practice: Dict, terms: List[str]) -> bool:
+    haystack = ' '.join(str(practice.get(f) or '') for f in TEXT_FIELDS).casefold()
+    return all(term in haystack for term in terms)
+
+
+def filter_practices(
+    practices: List[Dict],
+    status: Optional[Sequence[str]] = None,
+    gemeente: Optional[Sequence[str]] = None,
+    stage: Optional[Sequence[str]] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    q: Optional[str] = None
+) -> List[Dict]:
+    """Practices matching every given filter; list filters match any of their values"""
+    gemeenten = {g.strip().lower() for g in gemeente} if gemeente else None
+    terms = q.casefold().split() if q else None
+
+    result = []
+    for p in practices:
+        if status and practice_status(p) not in status:
+            continue
+        if gemeenten and practice_gemeente(p) not in gemeenten:
+            continue
+        if stage and practice_stage(p) not in stage:
+            continue
+        if min_score is not None and practice_score(p) < min_score:
+            continue
+        if max_score is not None and practice_score(p) > max_score:
+            continue
+        if terms and not _matches_text(p, terms):
+            continue
+        result.append(p)
+    return result
+
+
+def project(practice: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    """Keep only the requested top-level fields (nr is always included)"""
+    if not fields:
+        return practice
+    return {f: practice[f] for f in ('nr', *fields) if f in practice}
+
+
+def query_practices(
+    practices: List[Dict],
+    sort: str = 'nr',
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    **filters
+) -> Dict[str, Any]:
+    """
+    Filter, sort and page a practice list
+
+    Args:
+        sort: key from SORT_KEYS, prefix with '-' for descending
+        limit: page size (capped at MAX_LIMIT), None for everything
+        cursor: next_cursor of the previous page
+        fields: top-level fields to return
+        filters: see filter_practices
+
+    Returns:
+        {'practices': [...], 'total': int, 'next_cursor': str or None}
+    """
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in SORT_KEYS:
+        raise ValueError(f'unknown sort key: {sort}')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be at least 1')
+
+    matched = filter_practices(practices, **filters)
+    keyed = sorted(((_sort_key(p, sort, descending), p) for p in matched),
+                   key=lambda kp: kp[0], reverse=descending)
+
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        try:
+            if descending:
+                start = next((i for i, (k, _) in enumerate(keyed) if k < after), len(keyed))
+            else:
+                start = next((i for i, (k, _) in enumerate(keyed) if k > after), len(keyed))
+        except TypeError:
+            raise ValueError('cursor does not match sort key')
+
+    end = len(keyed) if limit is None else start + min(limit, MAX_LIMIT)
+    page = keyed[start:end]
+    next_cursor = encode_cursor(page[-1][0]) if page and end < len(keyed) else None
+
+    return {
+        'practices': [project(p, fields) for _, p in page],
+        'total': len(matched),
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,428 @@
+"""
+SQLite Practice Store
+Practices in SQLite with indexed lookup columns and the full record as JSON
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.services.practice_keys import (
+    INDEXED_FIELDS,
+    normalize_lookup_value,
+    normalize_practice,
+    practice_email,
+    practice_gemeente,
+    practice_phone,
+    practice_phones,
+    practice_stage,
+    practice_status,
+)
+from backend.services.practice_patch import apply_patch
+from backend.services.score_index import stored_score
+from backend.services.stage_counters import stage_contribution
+
+logger = logging.getLogger(__name__)
+
+
+class SQLitePracticeStore:
+    """
+    Practice storage engine backed by SQLite
+
+    Same interface as PracticeStore. The full practice lives in the `data`
+    JSON column; nr, normalized phone, lowercase email, gemeente, status and
+    pipeline stage are copied into indexed columns on every write so webhook,
+    reply-matching and stage lookups don't scan the whole table. Every number
+    of a multi-number tel field is listed in practice_phones. The stored lead
+    score (total_score, NULL when unscored) is indexed for top-k queries.
+    Triggers keep per-stage count, deal value and weighted value in
+    stage_counters, so pipeline summaries don't scan the practices.
+    """
+
+    # Lookup field -> indexed column
+    COLUMNS = {
+        'phone': 'phone',
+        'email': 'email',
+        'gemeente': 'gemeente',
+        'status': 'status',
+        'stage': 'stage',
+    }
+
+    def __init__(self, db_path: str = "data/practices.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._version_lock = threading.Lock()
+        self._version = 0
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Thread-local connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.data_version = None
+        return conn
+
+    def _init_database(self):
+        """Initialize practice tables"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS practices (
+                nr INTEGER PRIMARY KEY,
+                phone TEXT,
+                email TEXT,
+                gemeente TEXT,
+                status TEXT,
+                stage TEXT,
+                score INTEGER,
+                deal_value REAL NOT NULL DEFAULT 0,
+                weighted_value REAL NOT NULL DEFAULT 0,
+                data TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_phone ON practices(phone)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_email ON practices(email)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_gemeente ON practices(gemeente)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_status ON practices(status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_stage ON practices(stage)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(practices)")}
+        if 'score' not in columns:
+            # Databases from before the score index
+            conn.execute("ALTER TABLE practices ADD COLUMN score INTEGER")
+            rows = conn.execute("SELECT nr, data FROM practices").fetchall()
+            conn.executemany("UPDATE practices SET score = ? WHERE nr = ?",
+                             [(stored_score(json.loads(data)), nr) for nr, data in rows])
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_score ON practices(score DESC, nr)")
+        if 'deal_value' not in columns:
+            # Databases from before the stage counters (filled by rebuild_stage_totals below)
+            conn.execute("ALTER TABLE practices ADD COLUMN deal_value REAL NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE practices ADD COLUMN weighted_value REAL NOT NULL DEFAULT 0")
+        counters_exist = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stage_counters'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS stage_counters (
+                stage TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                value REAL NOT NULL DEFAULT 0,
+                weighted REAL NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS practices_stage_insert AFTER INSERT ON practices BEGIN
+                INSERT INTO stage_counters (stage, count, value, weighted)
+                VALUES (new.stage, 1, new.deal_value, new.weighted_value)
+                ON CONFLICT (stage) DO UPDATE SET
+                    count = count + 1, value = value + excluded.value, weighted = weighted + excluded.weighted;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS practices_stage_delete AFTER DELETE ON practices BEGIN
+                UPDATE stage_counters SET
+                    count = count - 1, value = value - old.deal_value, weighted = weighted - old.weighted_value
+                WHERE stage = old.stage;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS practices_stage_update AFTER UPDATE OF stage, deal_value, weighted_value ON practices
+            WHEN old.stage IS NOT new.stage OR old.deal_value != new.deal_value OR old.weighted_value != new.weighted_value
+            BEGIN
+                UPDATE stage_counters SET
+                    count = count - 1, value = value - old.deal_value, weighted = weighted - old.weighted_value
+                WHERE stage = old.stage;
+                INSERT INTO stage_counters (stage, count, value, weighted)
+                VALUES (new.stage, 1, new.deal_value, new.weighted_value)
+                ON CONFLICT (stage) DO UPDATE SET
+                    count = count + 1, value = value + excluded.value, weighted = weighted + excluded.weighted;
+            END
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practices_gemeente_score ON practices(gemeente, score DESC, nr)")
+        phones_exist = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'practice_phones'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS practice_phones (
+                phone TEXT NOT NULL,
+                nr INTEGER NOT NULL,
+                PRIMARY KEY (phone, nr)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_practice_phones_nr ON practice_phones(nr)")
+        if not phones_exist:
+            # Databases from before the reverse index
+            rows = conn.execute("SELECT data FROM practices").fetchall()
+            for row in rows:
+                self._write_phones(conn, json.loads(row[0]))
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                last INTEGER NOT NULL
+            )
+        """)
+        conn.commit()
+        if not counters_exist:
+            self.rebuild_stage_totals()
+        logger.info(f"✅ Practice database initialized: {self.db_path}")
+
+    @property
+    def version(self) -> int:
+        """Change counter, bumped on own writes and on commits by other connections"""
+        conn = self._connect()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._version_lock:
+            if self._local.data_version is not None and data_version != self._local.data_version:
+                self._version += 1
+            self._local.data_version = data_version
+            return self._version
+
+    def _bump_version(self):
+        with self._version_lock:
+            self._version += 1
+
+    @staticmethod
+    def _row_values(practice: Dict) -> tuple:
+        return (
+            practice.get('nr'),
+            practice_phone(practice),
+            practice_email(practice),
+            practice_gemeente(practice),
+            practice_status(practice),
+            practice_stage(practice),
+            stored_score(practice),
+            *stage_contribution(practice)[1:],
+            json.dumps(practice),
+        )
+
+    def _write(self, conn: sqlite3.Connection, practice: Dict):
+        cursor = conn.execute("""
+            INSERT INTO practices (nr, phone, email, gemeente, status, stage, score, deal_value, weighted_value,
+                                   data, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(nr) DO UPDATE SET
+                phone = excluded.phone,
+                email = excluded.email,
+                gemeente = excluded.gemeente,
+                status = excluded.status,
+                stage = excluded.stage,
+                score = excluded.score,
+                deal_value = excluded.deal_value,
+                weighted_value = excluded.weighted_value,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+        """, self._row_values(practice))
+
+        # Records without nr get the rowid SQLite assigned
+        if practice.get('nr') is None:
+            practice['nr'] = cursor.lastrowid
+            conn.execute("UPDATE practices SET data = ? WHERE nr = ?", (json.dumps(practice), practice['nr']))
+        self._write_phones(conn, practice)
+
+    @staticmethod
+    def _write_phones(conn: sqlite3.Connection, practice: Dict):
+        """Replace the practice_phones rows of a practice"""
+        conn.execute("DELETE FROM practice_phones WHERE nr = ?", (practice['nr'],))
+        conn.executemany(
+            "INSERT OR IGNORE INTO practice_phones (phone, nr) VALUES (?, ?)",
+            [(phone, practice['nr']) for phone in practice_phones(practice)]
+        )
+
+    def get_all(self) -> List[Dict]:
+        """Get all practices ordered by nr"""
+        rows = self._connect().execute("SELECT data FROM practices ORDER BY nr").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, practice_id: Any) -> Optional[Dict]:
+        """Primary key lookup"""
+        row = self._connect().execute("SELECT data FROM practices WHERE nr = ?", (practice_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM practices").fetchone()[0]
+
+    def find(self, field: str, value: Any) -> List[Dict]:
+        """Indexed lookup on phone (any number of the tel field), email, gemeente, status or stage"""
+        if field not in INDEXED_FIELDS:
+            raise KeyError(field)
+        value = normalize_lookup_value(field, value)
+        if field == 'phone':
+            rows = self._connect().execute("""
+                SELECT data FROM practices
+                WHERE nr IN (SELECT nr FROM practice_phones WHERE phone = ?)
+                ORDER BY nr
+            """, (value,)).fetchall()
+            return [json.loads(row[0]) for row in rows]
+        column = self.COLUMNS[field]
+        rows = self._connect().execute(
+            f"SELECT data FROM practices WHERE {column} = ? ORDER BY nr", (value,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def scored(self, low: float, high: float, limit: Optional[int] = None,
+               gemeente: Optional[str] = None) -> List[Dict]:
+        """Practices with a stored score in [low, high], highest first (ties by nr), from the score index"""
+        sql = "SELECT data FROM practices WHERE score BETWEEN ? AND ?"
+        params = [low, high]
+        if gemeente is not None:
+            sql += " AND gemeente = ?"
+            params.append(normalize_lookup_value('gemeente', gemeente))
+        sql += " ORDER BY score DESC, nr"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(limit, 0))
+        rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stage_totals(self) -> Dict[str, Dict]:
+        """Per-stage {'count', 'value', 'weighted'} from stage_counters (kept by triggers)"""
+        rows = self._connect().execute(
+            "SELECT stage, count, value, weighted FROM stage_counters WHERE count > 0"
+        ).fetchall()
+        return {stage: {'count': count, 'value': value, 'weighted': weighted}
+                for stage, count, value, weighted in rows}
+
+    def stage_page(self, stage: str, after: Any = None, limit: int = 50) -> List[Dict]:
+        """Practices in a pipeline stage ordered by nr, the first `limit` after nr `after` (stage index)"""
+        rows = self._connect().execute(
+            "SELECT data FROM practices WHERE stage = ? AND nr > ? ORDER BY nr LIMIT ?",
+            (stage, after if after is not None else -1, max(limit, 0))
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def rebuild_stage_totals(self) -> Dict[str, Dict]:
+        """
+        Recount stage_counters from the practices, returns the new totals
+
+        The stage and value columns are first recomputed from the JSON records,
+        then the counters are replaced by a GROUP BY in the same transaction.
+        """
+        conn = self._connect()
+        with conn:
+            rows = conn.execute("SELECT nr, stage, deal_value, weighted_value, data FROM practices").fetchall()
+            stale = []
+            for nr, stage, value, weighted, data in rows:
+                contribution = stage_contribution(json.loads(data))
+                if contribution != (stage, value, weighted):
+                    stale.append((*contribution, nr))
+            conn.executemany("UPDATE practices SET stage = ?, deal_value = ?, weighted_value = ? WHERE nr = ?", stale)
+            conn.execute("DELETE FROM stage_counters")
+            conn.execute("""
+                INSERT INTO stage_counters (stage, count, value, weighted)
+                SELECT stage, COUNT(*), SUM(deal_value), SUM(weighted_value) FROM practices GROUP BY stage
+            """)
+        return self.stage_totals()
+
+    def upsert(self, practice: Dict) -> bool:
+        """Insert or replace one practice"""
+        self.upsert_many([practice])
+        return True
+
+    def upsert_many(self, practices: List[Dict]) -> Dict[str, int]:
+        """
+        Insert or replace many practices in one transaction
+
+        Returns:
+            {'inserted': int, 'updated': int}
+        """
+        conn = self._connect()
+        inserted = 0
+        with conn:
+            for practice in practices:
+                nr = practice.get('nr')
+                if nr is None or conn.execute("SELECT 1 FROM practices WHERE nr = ?", (nr,)).fetchone() is None:
+                    inserted += 1
+                self._write(conn, practice)
+        self._bump_version()
+        return {'inserted': inserted, 'updated': len(practices) - inserted}
+
+    def patch_many(self, operations: List[Dict]) -> List[Dict]:
+        """
+        Apply partial updates ({nr, set, append}, see practice_patch) in one transaction
+
+        Returns:
+            [{'nr', 'success', 'error'?}, ...] in operation order
+        """
+        conn = self._connect()
+        results = []
+        with conn:
+            for op in operations:
+                nr = op.get('nr')
+                row = conn.execute("SELECT data FROM practices WHERE nr = ?", (nr,)).fetchone()
+                if row is None:
+                    results.append({'nr': nr, 'success': False, 'error': 'not found'})
+                    continue
+                try:
+                    practice = apply_patch(json.loads(row[0]), op)
+                except ValueError as e:
+                    results.append({'nr': nr, 'success': False, 'error': str(e)})
+                    continue
+                self._write(conn, normalize_practice(practice))
+                results.append({'nr': nr, 'success': True})
+        if any(r['success'] for r in results):
+            self._bump_version()
+        return results
+
+    def reserve_nrs(self, count: int = 1, floor: int = 0) -> range:
+        """
+        Reserve `count` consecutive new practice nrs
+
+        The sequence row and MAX(nr) (a rowid lookup) are read and bumped in
+        one IMMEDIATE transaction, which serializes concurrent reservations.
+        """
+        if count < 1:
+            return range(0)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT last FROM sequences WHERE name = 'practices'").fetchone()
+            max_nr = conn.execute("SELECT MAX(nr) FROM practices").fetchone()[0] or 0
+            start = max(row[0] if row else 0, max_nr, floor) + 1
+            conn.execute("""
+                INSERT INTO sequences (name, last) VALUES ('practices', ?)
+                ON CONFLICT(name) DO UPDATE SET last = excluded.last
+            """, (start + count - 1,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return range(start, start + count)
+
+    def delete(self, practice_id: Any) -> bool:
+        """Delete a practice, returns False if it did not exist"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM practices WHERE nr = ?", (practice_id,))
+            conn.execute("DELETE FROM practice_phones WHERE nr = ?", (practice_id,))
+        if cursor.rowcount:
+            self._bump_version()
+        return cursor.rowcount > 0
+
+    def import_json(self, json_path: str) -> int:
+        """Import a practices.json list, returns number of practices imported"""
+        with open(json_path, 'r') as f:
+            practices = json.load(f)
+        self.upsert_many([normalize_practice(p) for p in practices])
+        return len(practices)
+
+
+_stores: Dict[str, SQLitePracticeStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_practice_store(db_path: str) -> SQLitePracticeStore:
+    """Get the process-wide SQLite store for a database file"""
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SQLitePracticeStore(db_path)
+            _stores[key] = store
+        return store
@@ -0,0 +1,519 @@
+"""
+Practice Store
+Process-wide in-memory cache of the JSON practice file, keyed by practice nr
+"""
+import copy
+import json
+import logging
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from backend.config import Config
+from backend.services.practice_keys import INDEXED_FIELDS, normalize_lookup_value, normalize_practice
+from backend.services.practice_patch import apply_patch
+from backend.services.phone_index import PhoneIndex
+from backend.services.score_index import ScoreIndex
+from backend.services.stage_counters import StageCounters
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Signature that never matches a file, forces a reload
+_STALE = object()
+
+
+def _copied(practices: List[Dict]) -> List[Dict]:
+    """Private deep copies of practice records (a pickle round trip, far cheaper than deepcopy)"""
+    return pickle.loads(pickle.dumps(practices, pickle.HIGHEST_PROTOCOL))
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """Write JSON to a temp file, fsync it and rename it over `path`"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class PracticeStore:
+    """
+    In-memory practice store shared by every DatabaseService in the process
+
+    The JSON file is parsed once and kept as a list (file order) plus a
+    `nr -> position` index. The file's mtime/size is checked on every access
+    so edits made by other processes (scripts, other workers) are picked up.
+
+    In journal mode the JSON file is a snapshot: every write appends one
+    JSONL record to `<data_file>.log` and fsyncs, and a background thread
+    folds the log into a new snapshot. Loading replays the log tail.
+
+    Records go in and come out as deep copies: changing a returned practice
+    (appending to its communication_history, say) never touches the store
+    until it is written back via `upsert`. get_all is the exception: stored
+    records are never changed in place (writes replace them), so it hands
+    out shallow copies whose nested values are shared with the store.
+    Setting a field on one is private, nested values must be replaced
+    rather than mutated.
+    """
+
+    def __init__(
+        self,
+        data_file: str,
+        journal: bool = False,
+        compact_threshold: int = 500,
+        compact_interval: float = 60.0
+    ):
+        self.data_file = data_file
+        self.log_file = f"{data_file}.log"
+        self.lock_file = f"{data_file}.lock"
+        self.seq_file = f"{data_file}.seq"
+        self.journal = journal
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+
+        self._lock = threading.RLock()
+        self._practices: List[Dict] = []
+        self._index: Dict[Any, int] = {}
+        self._phones = PhoneIndex()
+        self._scores = ScoreIndex()
+        self._stages = StageCounters()
+        self._max_nr = 0
+        self._signature = None
+        self._version = 0
+
+        # Journal state: bytes of the log already applied and records pending compaction
+        self._log_offset = 0
+        self._log_records = 0
+        self._compactor = None
+        self._compact_wakeup = threading.Event()
+        self._closed = False
+
+    @property
+    def version(self) -> int:
+        """Change counter, bumped on every write or external reload"""
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        """Reload the snapshot and/or replay the log if they changed on disk"""
+        signature = self._file_signature()
+        changed = False
+
+        if signature != self._signature:
+            self._load_snapshot(signature)
+            changed = True
+
+        if self.journal and self._replay_log():
+            changed = True
+
+        if changed:
+            self._version += 1
+
+    def _load_snapshot(self, signature):
+        practices = []
+        if signature is not None:
+            with open(self.data_file, 'r') as f:
+                practices = json.load(f)
+            # Older files predate write-time normalization
+            for practice in practices:
+                normalize_practice(practice)
+
+        self._practices = practices
+        self._reindex()
+        self._signature = signature
+        self._log_offset = 0
+        self._log_records = 0
+        logger.info(f"Loaded {len(practices)} practices from {self.data_file}")
+
+    def _replay_log(self) -> bool:
+        """Apply log records written since the last replay, returns True if any"""
+        try:
+            size = os.path.getsize(self.log_file)
+        except FileNotFoundError:
+            size = 0
+
+        if size < self._log_offset:
+            # Log was truncated by a compaction elsewhere; the snapshot covers it
+            self._load_snapshot(self._file_signature())
+        if size <= self._log_offset:
+            return False
+
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read(size - self._log_offset)
+
+        # Only complete lines count; a torn tail from a crash is ignored
+        end = chunk.rfind(b'\n') + 1
+        applied = 0
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.error(f"Skipping corrupt journal record in {self.log_file}")
+                continue
+            self._apply(record)
+            applied += 1
+
+        self._log_offset += end
+        self._log_records += applied
+        return applied > 0
+
+    def _apply(self, record: Dict):
+        if record.get('op') == 'delete':
+            self._remove(record.get('nr'))
+        else:
+            self._put(record['practice'])
+
+    def _reindex(self):
+        self._index = {}
+        self._max_nr = 0
+        for i, practice in enumerate(self._practices):
+            nr = practice.get('nr')
+            if nr is not None and nr not in self._index:
+                self._index[nr] = i
+                self._track_nr(nr)
+        self._phones.rebuild(self._practices[i] for i in self._index.values())
+        self._scores.rebuild(self._practices[i] for i in self._index.values())
+        self._stages.rebuild(self._practices[i] for i in self._index.values())
+
+    def _track_nr(self, nr: Any):
+        if isinstance(nr, int) and not isinstance(nr, bool) and nr > self._max_nr:
+            self._max_nr = nr
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _writing(self):
+        """Hold the in-process and cross-process write locks, with fresh state"""
+        with self._lock, self._file_lock():
+            self._refresh()
+            try:
+                yield
+            except Exception:
+                # Memory may be ahead of disk now; force a reload on next access
+                self._signature = _STALE
+                raise
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+
+        directory = os.path.dirname(self.lock_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _write_snapshot(self):
+        atomic_write_json(self.data_file, self._practices, indent=2)
+        self._signature = self._file_signature()
+
+    def _persist(self, records: List[Dict]):
+        """Persist mutations already applied in memory"""
+        if self.journal:
+            self._append(records)
+        else:
+            self._write_snapshot()
+        self._version += 1
+
+    def _append(self, records: List[Dict]):
+        data = ''.join(json.dumps(r) + '\n' for r in records).encode('utf-8')
+        with open(self.log_file, 'ab') as f:
+            # Drop a torn tail left by a crashed writer before appending
+            if f.tell() > self._log_offset:
+                f.truncate(self._log_offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._log_offset += len(data)
+        self._log_records += len(records)
+        self._ensure_compactor()
+        if self._log_records >= self.compact_threshold:
+            self._compact_wakeup.set()
+
+    def compact(self) -> bool:
+        """Fold the journal into a fresh snapshot, returns True if it did work"""
+        with self._writing():
+            if not self.journal or self._log_records == 0:
+                return False
+            self._write_snapshot()
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(0)
+                os.fsync(f.fileno())
+            logger.info(f"Compacted {self._log_records} journal records into {self.data_file}")
+            self._log_offset = 0
+            self._log_records = 0
+            return True
+
+    def _ensure_compactor(self):
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(
+                target=self._compact_loop,
+                name='practice-store-compactor',
+                daemon=True
+            )
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while not self._closed:
+            self._compact_wakeup.wait(self.compact_interval)
+            self._compact_wakeup.clear()
+            if self._closed:
+                break
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Journal compaction error: {e}")
+
+    def close(self):
+        """Stop the compactor and fold any pending journal records"""
+        self._closed = True
+        self._compact_wakeup.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+        self.compact()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_all(self) -> List[Dict]:
+        """Get all practices (shallow copies, file order), see the class docstring"""
+        with self._lock:
+            self._refresh()
+            return [dict(p) for p in self._practices]
+
+    def get(self, practice_id: Any) -> Optional[Dict]:
+        """O(1) lookup by nr, returns a private copy"""
+        with self._lock:
+            self._refresh()
+            i = self._index.get(practice_id)
+            if i is None:
+                return None
+            return copy.deepcopy(self._practices[i])
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._practices)
+
+    def find(self, field: str, value: Any) -> List[Dict]:
+        """
+        Practices whose indexed key (see practice_keys) equals value
+
+        phone matches any of the numbers in a practice's tel field through the
+        reverse index, the other fields scan.
+        """
+        key = INDEXED_FIELDS[field]
+        with self._lock:
+            self._refresh()
+            if field == 'phone':
+                return _copied([self._practices[self._index[nr]] for nr in self._phones.lookup(value)])
+            value = normalize_lookup_value(field, value)
+            return _copied([p for p in self._practices if key(p) == value])
+
+    def scored(self, low: float, high: float, limit: Optional[int] = None,
+               gemeente: Optional[str] = None) -> List[Dict]:
+        """Practices with a stored score in [low, high], highest first, through the score index"""
+        with self._lock:
+            self._refresh()
+            nrs = self._scores.between(low, high, gemeente=gemeente, limit=limit)
+            return _copied([self._practices[self._index[nr]] for nr in nrs])
+
+    def stage_totals(self) -> Dict[str, Dict]:
+        """Maintained per-stage {'count', 'value', 'weighted'} (see StageCounters)"""
+        with self._lock:
+            self._refresh()
+            return self._stages.totals()
+
+    def stage_page(self, stage: str, after: Any = None, limit: int = 50) -> List[Dict]:
+        """Practices in a pipeline stage ordered by nr, the first `limit` after nr `after`"""
+        with self._lock:
+            self._refresh()
+            return _copied([self._practices[self._index[nr]] for nr in self._stages.page(stage, after, limit)])
+
+    def rebuild_stage_totals(self) -> Dict[str, Dict]:
+        """Recount the stage aggregates from the practices, returns them"""
+        with self._lock:
+            self._refresh()
+            self._stages.rebuild(self._practices[i] for i in self._index.values())
+            return self._stages.totals()
+
+    def _put(self, practice: Dict) -> bool:
+        """Insert or replace in memory, returns True if it was an insert"""
+        nr = practice.get('nr')
+        i = self._index.get(nr) if nr is not None else None
+        if nr is not None:
+            self._phones.add(practice)
+            self._scores.add(practice)
+            self._stages.add(practice)
+        if i is None:
+            self._practices.append(practice)
+            if nr is not None:
+                self._index[nr] = len(self._practices) - 1
+                self._track_nr(nr)
+            return True
+        self._practices[i] = practice
+        return False
+
+    def _remove(self, practice_id: Any) -> bool:
+        if practice_id not in self._index:
+            return False
+        self._practices = [p for p in self._practices if p.get('nr') != practice_id]
+        self._reindex()
+        return True
+
+    def upsert(self, practice: Dict) -> bool:
+        """Insert or replace one practice (a copy is stored)"""
+        practice = _copied([practice])[0]
+        with self._writing():
+            self._put(practice)
+            self._persist([{'op': 'upsert', 'practice': practice}])
+            return True
+
+    def upsert_many(self, practices: List[Dict]) -> Dict[str, int]:
+        """
+        Insert or replace many practices with a single file write
+
+        Every record is merged through the nr index (O(1) each); a nr that
+        appears twice in the batch is inserted once and then updated.
+
+        Returns:
+            {'inserted': int, 'updated': int}
+        """
+        practices = _copied(practices)
+        with self._writing():
+            inserted = 0
+            for practice in practices:
+                if self._put(practice):
+                    inserted += 1
+            self._persist([{'op': 'upsert', 'practice': p} for p in practices])
+            return {'inserted': inserted, 'updated': len(practices) - inserted}
+
+    def patch_many(self, operations: List[Dict]) -> List[Dict]:
+        """
+        Apply partial updates ({nr, set, append}, see practice_patch) with one write
+
+        Each operation works on a copy, so a failing one leaves its practice
+        untouched while the others are still saved.
+
+        Returns:
+            [{'nr', 'success', 'error'?}, ...] in operation order
+        """
+        results = []
+        changed = {}
+        with self._writing():
+            for op in operations:
+                nr = op.get('nr')
+                i = self._index.get(nr)
+                if i is None:
+                    results.append({'nr': nr, 'success': False, 'error': 'not found'})
+                    continue
+                try:
+                    practice = apply_patch(copy.deepcopy(self._practices[i]), op)
+                except ValueError as e:
+                    results.append({'nr': nr, 'success': False, 'error': str(e)})
+                    continue
+                normalize_practice(practice)
+                self._put(practice)
+                changed[nr] = practice
+                results.append({'nr': nr, 'success': True})
+
+            if changed:
+                self._persist([{'op': 'upsert', 'practice': p} for p in changed.values()])
+        return results
+
+    def reserve_nrs(self, count: int = 1, floor: int = 0) -> range:
+        """
+        Reserve `count` consecutive new practice nrs
+
+        The last handed-out nr is persisted in `<data_file>.seq`; new nrs start
+        above it, above every nr in the store and above `floor`. Runs under the
+        cross-process write lock, so threads and workers never get the same nr.
+        """
+        if count < 1:
+            return range(0)
+        with self._writing():
+            try:
+                with open(self.seq_file, 'r') as f:
+                    last = json.load(f)['last']
+            except FileNotFoundError:
+                last = 0
+            start = max(last, self._max_nr, floor) + 1
+            atomic_write_json(self.seq_file, {'last': start + count - 1}, indent=None)
+            return range(start, start + count)
+
+    def delete(self, practice_id: Any) -> bool:
+        """Delete a practice, returns False if it did not exist"""
+        with self._writing():
+            if not self._remove(practice_id):
+                return False
+            self._persist([{'op': 'delete', 'nr': practice_id}])
+            return True
+
+
+_stores: Dict[str, PracticeStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_practice_store(data_file: str) -> PracticeStore:
+    """Get the process-wide store for a data file"""
+    key = os.path.abspath(data_file)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = PracticeStore(
+                data_file,
+                journal=Config.PRACTICE_JOURNAL,
+                compact_threshold=Config.PRACTICE_JOURNAL_COMPACT_RECORDS,
+                compact_interval=Config.PRACTICE_JOURNAL_COMPACT_INTERVAL
+            )
+            _stores[key] = store
+        return store
@@ -0,0 +1,220 @@
+"""
+Score History
+Compacte lead score tijdreeks per praktijk (dag, score), los van het praktijkrecord
+"""
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Days are stored as uint16 offsets from DAY_ZERO (until 2199), scores as uint8
+DAY_ZERO = date(2020, 1, 1)
+MAX_DAY = 0xFFFF
+
+
+def _day(value) -> int:
+    """Day offset of a date, datetime or ISO string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - DAY_ZERO).days
+
+
+class ScoreHistory:
+    """
+    Append-only lead score history, one point per practice per day
+
+    Each practice has one row with two parallel arrays: `days` (uint16 days
+    since 2020-01-01, ascending) and `scores` (uint8 total_score), so a
+    point costs 3 bytes. A point is only added when the score changed; a
+    second change on the same day replaces that day's score. The score on
+    any day is the last point on or before it.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS score_history (
+                nr INTEGER PRIMARY KEY,
+                days BLOB NOT NULL,
+                scores BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _decode(days: bytes, scores: bytes) -> Tuple[array, array]:
+        day_array, score_array = array('H'), array('B')
+        day_array.frombytes(days)
+        score_array.frombytes(scores)
+        return day_array, score_array
+
+    def record(self, points: Iterable[Tuple[Any, Any, int]]) -> int:
+        """
+        Add (nr, day, score) points in one transaction, day as date/datetime/ISO string
+
+        Returns the number of practices whose history changed.
+        """
+        by_nr: Dict[Any, List[Tuple[int, int]]] = {}
+        for nr, day, score in points:
+            offset = _day(day)
+            if not 0 <= offset <= MAX_DAY:
+                logger.warning(f"⚠️ Score of practice {nr} on {day} outside the history range, skipped")
+                continue
+            by_nr.setdefault(nr, []).append((offset, min(100, max(0, int(score)))))
+
+        changed = 0
+        with self._lock, self._conn:
+            for nr, new_points in by_nr.items():
+                row = self._conn.execute("SELECT days, scores FROM score_history WHERE nr = ?", (nr,)).fetchone()
+                days, scores = self._decode(*row) if row else (array('H'), array('B'))
+                if self._merge(days, scores, new_points):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO score_history (nr, days, scores) VALUES (?, ?, ?)",
+                        (nr, days.tobytes(), scores.tobytes())
+                    )
+                    changed += 1
+        return changed
+
+    @staticmethod
+    def _merge(days: array, scores: array, points: List[Tuple[int, int]]) -> bool:
+        """Merge points into the arrays in place, True if anything changed"""
+        changed = False
+        for day, score in points:
+            i = bisect_right(days, day)
+            if i and days[i - 1] == day:
+                # Same day: the latest score of the day wins
+                if scores[i - 1] != score:
+                    scores[i - 1] = score
+                    changed = True
+                continue
+            if i and scores[i - 1] == score:
+                continue
+            days.insert(i, day)
+            scores.insert(i, score)
+            changed = True
+        return changed
+
+    def record_scores(self, practices: Iterable[Dict]) -> int:
+        """Record the stored score of practices, dated by its calculated_at"""
+        points = []
+        for practice in practices:
+            score = practice.get('score')
+            if practice.get('nr') is None or not isinstance(score, dict) or score.get('total_score') is None:
+                continue
+            points.append((practice['nr'], score.get('calculated_at') or datetime.now(), score['total_score']))
+        return self.record(points) if points else 0
+
+    def delete(self, nr: Any):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM score_history WHERE nr = ?", (nr,))
+
+    def _arrays(self, nr: Any) -> Tuple[array, array]:
+        with self._lock:
+            row = self._conn.execute("SELECT days, scores FROM score_history WHERE nr = ?", (nr,)).fetchone()
+        return self._decode(*row) if row else (array('H'), array('B'))
+
+    @staticmethod
+    def _score_on(days: array, scores: array, day: int) -> Optional[int]:
+        i = bisect_right(days, day)
+        return scores[i - 1] if i else None
+
+    def series(self, nr: Any) -> List[Dict]:
+        """Every stored point of a practice: [{'date', 'score'}], oldest first"""
+        days, scores = self._arrays(nr)
+        return [{'date': (DAY_ZERO + timedelta(days=d)).isoformat(), 'score': s} for d, s in zip(days, scores)]
+
+    def sparkline(self, nr: Any, days: int = 30, today: Optional[date] = None) -> List[Optional[int]]:
+        """Score per day for the last `days` days up to today (None before the first score)"""
+        end = _day(today or date.today())
+        point_days, scores = self._arrays(nr)
+        values = []
+        i = bisect_right(point_days, end - days + 1) - 1
+        current = scores[i] if i >= 0 else None
+        i += 1
+        for day in range(end - days + 1, end + 1):
+            while i < len(point_days) and point_days[i] <= day:
+                current = scores[i]
+                i += 1
+            values.append(current)
+        return values
+
+    def velocity(self, nr: Any, days: int = 7, today: Optional[date] = None) -> Optional[float]:
+        """
+        Score change per day over the last `days` days
+
+        Measured from the score at the start of the window, or from the first
+        point inside it for newer practices. None without any score.
+        """
+        end = _day(today or date.today())
+        point_days, scores = self._arrays(nr)
+        current = self._score_on(point_days, scores, end)
+        if current is None:
+            return None
+        start = end - days
+        previous = self._score_on(point_days, scores, start)
+        if previous is None:
+            first = bisect_left(point_days, start)
+            start, previous = point_days[first], scores[first]
+        return round((current - previous) / max(end - start, 1), 2)
+
+    def movers(self, days: int = 7, limit: int = 10, direction: Optional[str] = None,
+               today: Optional[date] = None) -> List[Dict]:
+        """
+        Practices whose score changed most over the last `days` days
+
+        direction: 'up' (heating up), 'down' (cooling down) or None (both,
+        by size of the change). Practices without a score at the start of the
+        window aren't movers. Returns [{'nr', 'score', 'previous', 'change'}].
+        """
+        end = _day(today or date.today())
+        start = end - days
+        with self._lock:
+            rows = self._conn.execute("SELECT nr, days, scores FROM score_history").fetchall()
+
+        movers = []
+        for nr, day_bytes, score_bytes in rows:
+            point_days, scores = self._decode(day_bytes, score_bytes)
+            previous = self._score_on(point_days, scores, start)
+            if previous is None:
+                continue
+            score = self._score_on(point_days, scores, end)
+            change = score - previous
+            if change and (direction is None or (change > 0) == (direction == 'up')):
+                movers.append({'nr': nr, 'score': score, 'previous': previous, 'change': change})
+
+        if direction == 'down':
+            movers.sort(key=lambda m: (m['change'], m['nr']))
+        else:
+            movers.sort(key=lambda m: (-abs(m['change']), m['nr']))
+        return movers[:limit]
+
+    def close(self):
+        self._conn.close()
+
+
+_histories: Dict[str, ScoreHistory] = {}
+_histories_lock = threading.Lock()
+
+
+def get_score_history(db_path: str) -> ScoreHistory:
+    """Get the process-wide score history for a database file"""
+    key = os.path.abspath(db_path)
+    with _histories_lock:
+        history = _histories.get(key)
+        if history is None:
+            history = ScoreHistory(db_path)
+            _histories[key] = history
+        return history
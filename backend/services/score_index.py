@@ -0,0 +1,117 @@
+"""
+Score Index
+Practice nrs ordered by stored lead score, for top-k and score range queries
+"""
+import math
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.services.practice_keys import practice_gemeente
+
+# Lead category -> total_score range (same thresholds as LeadScoringService)
+CATEGORY_RANGES: Dict[str, Tuple[int, int]] = {
+    'hot': (75, 100),
+    'warm': (50, 74),
+    'cold': (25, 49),
+    'frozen': (0, 24),
+}
+
+
+def stored_score(practice: Dict) -> Optional[int]:
+    """total_score of the stored lead score, None when the practice was never scored"""
+    score = practice.get('score')
+    if not isinstance(score, dict) or score.get('total_score') is None:
+        return None
+    return int(score['total_score'])
+
+
+class ScoreIndex:
+    """
+    Maintained index of practices by stored lead score
+
+    Entries are (-score, nr) in sorted lists, one over all practices and one
+    per gemeente, so the best k of a score range are a bisect plus a slice:
+    O(log n + k). Ties are ordered by nr. Unscored practices are not listed.
+    Callers keep it in sync by calling add() on every write and discard()
+    on deletes, like PhoneIndex.
+    """
+
+    def __init__(self):
+        self._all: List[Tuple[int, Any]] = []
+        self._by_gemeente: Dict[str, List[Tuple[int, Any]]] = {}
+        self._keys: Dict[Any, Tuple[Tuple[int, Any], Optional[str]]] = {}  # nr -> (entry, gemeente)
+
+    def rebuild(self, practices: Iterable[Dict]):
+        self._all = []
+        self._by_gemeente = {}
+        self._keys = {}
+        for practice in practices:
+            nr = practice.get('nr')
+            score = stored_score(practice)
+            if nr is None or score is None or nr in self._keys:
+                continue
+            entry = (-score, nr)
+            gemeente = practice_gemeente(practice)
+            self._keys[nr] = (entry, gemeente)
+            self._all.append(entry)
+            if gemeente:
+                self._by_gemeente.setdefault(gemeente, []).append(entry)
+        self._all.sort()
+        for entries in self._by_gemeente.values():
+            entries.sort()
+
+    def add(self, practice: Dict):
+        """Index (or re-index) a practice under its current score and gemeente"""
+        nr = practice.get('nr')
+        if nr is None:
+            return
+        score = stored_score(practice)
+        entry = (-score, nr) if score is not None else None
+        gemeente = practice_gemeente(practice)
+        if entry is not None and self._keys.get(nr) == (entry, gemeente):
+            return
+        self.discard(nr)
+        if entry is None:
+            return
+        self._keys[nr] = (entry, gemeente)
+        insort(self._all, entry)
+        if gemeente:
+            insort(self._by_gemeente.setdefault(gemeente, []), entry)
+
+    def discard(self, nr: Any):
+        key = self._keys.pop(nr, None)
+        if key is None:
+            return
+        entry, gemeente = key
+        self._all.pop(bisect_left(self._all, entry))
+        if gemeente:
+            entries = self._by_gemeente[gemeente]
+            entries.pop(bisect_left(entries, entry))
+            if not entries:
+                del self._by_gemeente[gemeente]
+
+    def between(self, low: float, high: float, gemeente: Optional[str] = None,
+                limit: Optional[int] = None) -> List[Any]:
+        """nrs scoring low <= score <= high, highest first (ties by nr)"""
+        if gemeente is not None:
+            entries = self._by_gemeente.get((gemeente or '').strip().lower(), [])
+        else:
+            entries = self._all
+        # Entries hold -score: the range is [(-floor(high),), (-ceil(low) + 1,))
+        start = bisect_left(entries, (-math.floor(high),))
+        end = bisect_left(entries, (-math.ceil(low) + 1,))
+        if limit is not None:
+            end = min(end, start + max(limit, 0))
+        return [nr for _, nr in entries[start:end]]
+
+    def top_k(self, category: str, k: int, gemeente: Optional[str] = None) -> List[Any]:
+        """nrs of the k best scored practices of a category ('hot', 'warm', ...)"""
+        low, high = CATEGORY_RANGES[category]
+        return self.between(low, high, gemeente=gemeente, limit=k)
+
+    def score(self, nr: Any) -> Optional[int]:
+        key = self._keys.get(nr)
+        return -key[0][0] if key else None
+
+    def __len__(self) -> int:
+        return len(self._keys)
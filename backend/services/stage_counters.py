@@ -0,0 +1,107 @@
+"""
+Stage Counters
+Per pipeline stage count, deal value and weighted value, maintained on every practice write
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.services.practice_keys import practice_deal_value, practice_stage, practice_weighted_value
+
+
+def stage_contribution(practice: Dict) -> Tuple[str, float, float]:
+    """(stage, deal value, weighted value) a practice adds to the counters"""
+    return practice_stage(practice), practice_deal_value(practice), practice_weighted_value(practice)
+
+
+class StageCounters:
+    """
+    Materialized pipeline aggregates: {stage: {'count', 'value', 'weighted'}}
+
+    Each practice's contribution is remembered by nr, so add() moves it
+    between stages (move_deal, deal value edits) without a scan. The nrs
+    of every stage are kept sorted as well, so a Kanban column pages with
+    a bisect (page()). Callers keep it in sync by calling add() on every
+    write and discard() on deletes, like PhoneIndex; rebuild() recounts
+    from scratch.
+    """
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._contributions: Dict[Any, Tuple[str, float, float]] = {}
+        self._members: Dict[str, List[Any]] = {}
+
+    def rebuild(self, practices: Iterable[Dict]):
+        self._totals = {}
+        self._contributions = {}
+        self._members = {}
+        for practice in practices:
+            nr = practice.get('nr')
+            if nr is None or nr in self._contributions:
+                continue
+            contribution = stage_contribution(practice)
+            self._contributions[nr] = contribution
+            stage, value, weighted = contribution
+            self._members.setdefault(stage, []).append(nr)
+            totals = self._totals.setdefault(stage, {'count': 0, 'value': 0, 'weighted': 0})
+            totals['count'] += 1
+            totals['value'] += value
+            totals['weighted'] += weighted
+        for members in self._members.values():
+            members.sort()
+
+    def add(self, practice: Dict):
+        """Count (or re-count) a practice under its current stage and values"""
+        nr = practice.get('nr')
+        if nr is None:
+            return
+        contribution = stage_contribution(practice)
+        if self._contributions.get(nr) == contribution:
+            return
+        self.discard(nr)
+        self._contributions[nr] = contribution
+        stage, value, weighted = contribution
+        insort(self._members.setdefault(stage, []), nr)
+        totals = self._totals.setdefault(stage, {'count': 0, 'value': 0, 'weighted': 0})
+        totals['count'] += 1
+        totals['value'] += value
+        totals['weighted'] += weighted
+
+    def discard(self, nr: Any):
+        contribution = self._contributions.pop(nr, None)
+        if contribution is None:
+            return
+        stage, value, weighted = contribution
+        totals = self._totals[stage]
+        totals['count'] -= 1
+        totals['value'] -= value
+        totals['weighted'] -= weighted
+        members = self._members[stage]
+        members.pop(bisect_left(members, nr))
+        if not totals['count']:
+            del self._totals[stage]
+            del self._members[stage]
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the aggregates per stage (stages without practices are left out)"""
+        return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+    def page(self, stage: str, after: Optional[Any] = None, limit: int = 50) -> List[Any]:
+        """nrs in a stage, ascending, the first `limit` after nr `after`"""
+        members = self._members.get(stage, [])
+        start = bisect_right(members, after) if after is not None else 0
+        return members[start:start + max(limit, 0)]
+
+    def __len__(self) -> int:
+        return len(self._contributions)
+
+
+def diff_totals(stored: Dict[str, Dict], expected: Dict[str, Dict], tolerance: float = 0.005) -> Dict[str, Dict]:
+    """Stages whose stored aggregates differ from a recount: {stage: {'stored', 'expected'}}"""
+    empty = {'count': 0, 'value': 0, 'weighted': 0}
+    differences = {}
+    for stage in set(stored) | set(expected):
+        have, want = stored.get(stage, empty), expected.get(stage, empty)
+        if have['count'] != want['count'] or any(abs(have[key] - want[key]) > tolerance
+                                                 for key in ('value', 'weighted')):
+            differences[stage] = {'stored': have, 'expected': want}
+    return differences
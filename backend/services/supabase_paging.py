@@ -0,0 +1,101 @@
+"""
+Supabase paging helpers
+Range-paginated reads and bounded, retried upserts against PostgREST
+"""
+import logging
+import time
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# PostgREST caps responses at `max-rows` (1000 on Supabase by default)
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_RETRIES = 2
+
+
+def iter_pages(
+    client,
+    table: str,
+    columns: str = "*",
+    page_size: int = DEFAULT_PAGE_SIZE,
+    order: str = 'nr'
+) -> Iterator[List[Dict]]:
+    """
+    Yield a table page by page using Range (offset/limit) requests
+
+    Pages are ordered by `order` so offsets stay stable. The server may
+    return fewer rows than asked for (max-rows), so paging only stops on an
+    empty page rather than on a short one.
+    """
+    start = 0
+    while True:
+        response = (
+            client.table(table)
+            .select(columns)
+            .order(order)
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows = response.data or []
+        if not rows:
+            return
+        yield rows
+        start += len(rows)
+
+
+def fetch_all(client, table: str, columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict]:
+    """All rows of a table, fetched in pages"""
+    rows = []
+    for page in iter_pages(client, table, columns=columns, page_size=page_size):
+        rows.extend(page)
+    return rows
+
+
+def upsert_in_batches(
+    client,
+    table: str,
+    rows: List[Dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = 0.5,
+    key: str = 'nr'
+) -> Dict[str, Any]:
+    """
+    Upsert rows in bounded batches
+
+    A failing batch is retried with exponential backoff; if it keeps failing
+    it is split in half and each half is retried, so one bad row only costs
+    itself instead of the whole import.
+
+    Returns:
+        {'success': bool, 'upserted': int, 'failed': [key values of rows not written]}
+    """
+    failed: List[Any] = []
+
+    def upsert(batch: List[Dict]):
+        for attempt in range(retries + 1):
+            try:
+                client.table(table).upsert(batch).execute()
+                return
+            except Exception as e:
+                error = e
+                if attempt < retries:
+                    time.sleep(backoff * (2 ** attempt))
+
+        if len(batch) > 1:
+            middle = len(batch) // 2
+            upsert(batch[:middle])
+            upsert(batch[middle:])
+        else:
+            logger.error(f"Supabase upsert failed for {key}={batch[0].get(key)}: {error}")
+            failed.append(batch[0].get(key))
+
+    for i in range(0, len(rows), batch_size):
+        upsert(rows[i:i + batch_size])
+
+    return {
+        'success': not failed,
+        'upserted': len(rows) - len(failed),
+        'failed': failed
+    }
@@ -1,14 +1,21 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Container, Row, Col, Card, ListGroup, Badge, Form,
   InputGroup, Button, Alert, Spinner
 } from 'react-bootstrap';
 import { FaEnvelope, FaSms, FaWhatsapp, FaSearch, FaPaperPlane } from 'react-icons/fa';
 
+const PAGE_SIZE = 50;
+
 const Inbox = () => {
   const [conversations, setConversations] = useState([]);
+  const [conversationsCursor, setConversationsCursor] = useState(null);
   const [selectedConversation, setSelectedConversation] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [messagesCursor, setMessagesCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Polling refreshes the first page only; once older pages are loaded their cursor stays
+  const olderPagesLoaded = useRef(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [unreadCount, setUnreadCount] = useState(0);
@@ -16,24 +23,88 @@ const Inbox = () => {
   const [replyText, setReplyText] = useState('');
   const [replyChannel, setReplyChannel] = useState('sms');
   const [sending, setSending] = useState(false);
+  // Live updates: while the event stream is open, polling is paused
+  const streamOpen = useRef(false);
+  const selectedId = useRef(null);
 
   useEffect(() => {
     loadConversations();
     loadUnreadCount();
-    // Poll for updates every 10 seconds
+
+    const events = new EventSource('/api/inbox/events');
+    events.onopen = () => { streamOpen.current = true; };
+    events.onerror = () => { streamOpen.current = false; };  // EventSource reconnects by itself
+    events.addEventListener('hello', (e) => {
+      setUnreadCount(JSON.parse(e.data).unread_total);
+      loadConversations();
+    });
+    events.addEventListener('resync', () => {
+      loadConversations();
+      loadUnreadCount();
+    });
+    events.addEventListener('message', (e) => applyNewMessage(JSON.parse(e.data)));
+    events.addEventListener('read', (e) => {
+      const data = JSON.parse(e.data);
+      setUnreadCount(data.unread_total);
+      setConversations(prev => prev.map(c => (
+        c.id === data.conversation_id ? { ...c, unread_count: 0 } : c
+      )));
+    });
+
+    // Fallback polling when the stream is down
     const interval = setInterval(() => {
+      if (streamOpen.current) return;
       loadConversations();
       loadUnreadCount();
     }, 10000);
-    return () => clearInterval(interval);
+    return () => {
+      events.close();
+      clearInterval(interval);
+    };
   }, []);
 
+  const applyNewMessage = ({ message, practice_name, unread_delta, unread_total }) => {
+    setUnreadCount(unread_total);
+    setConversations(prev => {
+      const current = prev.find(c => c.id === message.conversation_id) || {
+        id: message.conversation_id,
+        practice_id: message.practice_id,
+        practice_name,
+        channels: [],
+        unread_count: 0
+      };
+      const updated = {
+        ...current,
+        channels: current.channels.includes(message.channel) ? current.channels : [...current.channels, message.channel],
+        last_message: message,
+        unread_count: current.unread_count + unread_delta,
+        updated_at: message.timestamp
+      };
+      return [updated, ...prev.filter(c => c.id !== message.conversation_id)];
+    });
+
+    if (selectedId.current === message.conversation_id) {
+      setMessages(prev => (prev.some(m => m.id === message.id) ? prev : [...prev, message]));
+      if (unread_delta > 0) {
+        fetch(`/api/inbox/conversation/${message.conversation_id}/mark-read`, { method: 'PUT' });
+      }
+    }
+  };
+
   const loadConversations = async () => {
     try {
-      const response = await fetch('/api/inbox/conversations');
+      const response = await fetch(`/api/inbox/conversations?limit=${PAGE_SIZE}`);
       const data = await response.json();
       if (data.success) {
-        setConversations(data.conversations);
+        // Refresh the first page, keep older pages that were already loaded
+        setConversations(prev => {
+          const fresh = new Set(data.conversations.map(c => c.id));
+          const older = prev.slice(PAGE_SIZE).filter(c => !fresh.has(c.id));
+          return [...data.conversations, ...older];
+        });
+        if (!olderPagesLoaded.current) {
+          setConversationsCursor(data.next_cursor);
+        }
       }
       setLoading(false);
     } catch (err) {
@@ -42,6 +113,26 @@ const Inbox = () => {
     }
   };
 
+  const loadMoreConversations = async () => {
+    if (!conversationsCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetch(`/api/inbox/conversations?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(conversationsCursor)}`);
+      const data = await response.json();
+      if (data.success) {
+        setConversations(prev => {
+          const known = new Set(prev.map(c => c.id));
+          return [...prev, ...data.conversations.filter(c => !known.has(c.id))];
+        });
+        setConversationsCursor(data.next_cursor);
+        olderPagesLoaded.current = true;
+      }
+    } catch (err) {
+      setError('Failed to load conversations');
+    }
+    setLoadingMore(false);
+  };
+
   const loadUnreadCount = async () => {
     try {
       const response = await fetch('/api/inbox/unread-count');
@@ -56,23 +147,45 @@ const Inbox = () => {
 
   const loadConversation = async (conversationId) => {
     try {
-      const response = await fetch(`/api/inbox/conversation/${conversationId}`);
+      const response = await fetch(`/api/inbox/conversation/${conversationId}?limit=${PAGE_SIZE}`);
       const data = await response.json();
       if (data.success) {
+        selectedId.current = conversationId;
         setSelectedConversation(data.conversation);
         setMessages(data.conversation.messages || []);
-        // Mark as read
+        setMessagesCursor(data.next_cursor);
+        // Mark as read; the stream's read event updates the counts
         await fetch(`/api/inbox/conversation/${conversationId}/mark-read`, {
           method: 'PUT'
         });
-        loadConversations();
-        loadUnreadCount();
+        if (!streamOpen.current) {
+          loadConversations();
+          loadUnreadCount();
+        }
       }
     } catch (err) {
       setError('Failed to load conversation');
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!selectedConversation || !messagesCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetch(
+        `/api/inbox/conversation/${selectedConversation.id}?limit=${PAGE_SIZE}&before=${encodeURIComponent(messagesCursor)}`
+      );
+      const data = await response.json();
+      if (data.success) {
+        setMessages(prev => [...(data.conversation.messages || []), ...prev]);
+        setMessagesCursor(data.next_cursor);
+      }
+    } catch (err) {
+      setError('Failed to load older messages');
+    }
+    setLoadingMore(false);
+  };
+
   const sendReply = async () => {
     if (!replyText.trim() || !selectedConversation) return;
 
@@ -117,6 +230,22 @@ const Inbox = () => {
     return <Badge bg={colors[channel]} className="ms-1">{channel.toUpperCase()}</Badge>;
   };
 
+  // Stored media is served (cached, range requests) from the inbox media endpoint
+  const renderAttachment = (att, key) => {
+    const url = typeof att === 'string' ? att : (att.sha256 ? `/api/inbox/media/${att.sha256}` : att.url);
+    const type = (typeof att === 'object' && att.type) || '';
+    if (type.startsWith('image/')) {
+      return <a key={key} href={url} target="_blank" rel="noreferrer"><img src={url} alt="" loading="lazy" style={{ maxWidth: '100%' }} /></a>;
+    }
+    if (type.startsWith('video/')) {
+      return <video key={key} src={url} controls preload="metadata" style={{ maxWidth: '100%' }} />;
+    }
+    if (type.startsWith('audio/')) {
+      return <audio key={key} src={url} controls preload="metadata" />;
+    }
+    return <div key={key}><a href={url} target="_blank" rel="noreferrer">📎 {type || 'attachment'}</a></div>;
+  };
+
   const formatTimestamp = (timestamp) => {
     const date = new Date(timestamp);
     const now = new Date();
@@ -211,6 +340,13 @@ const Inbox = () => {
                 ))}
             </ListGroup>
           )}
+          {conversationsCursor && (
+            <div className="text-center my-2">
+              <Button variant="outline-secondary" size="sm" onClick={loadMoreConversations} disabled={loadingMore}>
+                {loadingMore ? <Spinner size="sm" /> : 'Meer laden'}
+              </Button>
+            </div>
+          )}
         </Col>
 
         {/* Message Thread */}
@@ -237,9 +373,16 @@ const Inbox = () => {
 
               {/* Messages */}
               <div className="flex-grow-1 overflow-auto mb-3" style={{ maxHeight: 'calc(100% - 180px)' }}>
+                {messagesCursor && (
+                  <div className="text-center mb-3">
+                    <Button variant="outline-secondary" size="sm" onClick={loadOlderMessages} disabled={loadingMore}>
+                      {loadingMore ? <Spinner size="sm" /> : 'Oudere berichten laden'}
+                    </Button>
+                  </div>
+                )}
                 {messages.map((msg, idx) => (
                   <div
-                    key={idx}
+                    key={msg.id || idx}
                     className={`mb-3 d-flex ${msg.direction === 'outbound' ? 'justify-content-end' : 'justify-content-start'}`}
                   >
                     <Card
@@ -259,7 +402,7 @@ const Inbox = () => {
                         <div>{msg.content}</div>
                         {msg.attachments && msg.attachments.length > 0 && (
                           <div className="mt-2">
-                            📎 {msg.attachments.length} attachment(s)
+                            {msg.attachments.map((att, i) => renderAttachment(att, i))}
                           </div>
                         )}
                       </Card.Body>
@@ -6,6 +6,7 @@ function Leads() {
   const [gemeente, setGemeente] = useState('')
   const [leads, setLeads] = useState([])
   const [loading, setLoading] = useState(false)
+  const [added, setAdded] = useState([])
 
   const searchLeads = async () => {
     if (!gemeente) return
@@ -14,6 +15,7 @@ function Leads() {
     try {
       const response = await axios.post('/api/leads/search', { gemeente })
       setLeads(response.data)
+      setAdded([])
       setLoading(false)
     } catch (error) {
       console.error('Error searching leads:', error)
@@ -21,6 +23,19 @@ function Leads() {
     }
   }
 
+  const addLeads = async (indexes) => {
+    const toAdd = indexes.filter(i => !added.includes(i))
+    if (toAdd.length === 0) return
+
+    try {
+      await axios.post('/api/leads/import', { leads: toAdd.map(i => leads[i]) })
+      setAdded(prev => [...prev, ...toAdd])
+    } catch (error) {
+      console.error('Error importing leads:', error)
+      alert('Fout bij toevoegen: ' + (error.response?.data?.error || error.message))
+    }
+  }
+
   return (
     <div>
       <div className="page-header">
@@ -48,6 +63,18 @@ function Leads() {
           </button>
         </div>
 
+        {leads.length > 0 && (
+          <div style={{ marginBottom: '1rem' }}>
+            <button
+              className="btn btn-primary"
+              onClick={() => addLeads(leads.map((_, i) => i))}
+              disabled={added.length === leads.length}
+            >
+              Alles toevoegen ({leads.length - added.length})
+            </button>
+          </div>
+        )}
+
         {leads.length > 0 && (
           <table className="table">
             <thead>
@@ -67,8 +94,12 @@ function Leads() {
                   <td>{lead.email || '-'}</td>
                   <td>{lead.tel || '-'}</td>
                   <td>
-                    <button className="btn btn-sm btn-primary">
-                      Toevoegen
+                    <button
+                      className="btn btn-sm btn-primary"
+                      onClick={() => addLeads([index])}
+                      disabled={added.includes(index)}
+                    >
+                      {added.includes(index) ? 'Toegevoegd' : 'Toevoegen'}
                     </button>
                   </td>
                 </tr>
@@ -15,7 +15,10 @@ import {
 import { CSS } from '@dnd-kit/utilities'
 import { TrendingUp, AlertCircle, Zap } from 'lucide-react'
 
-// Sortable deal card component
+// Cards per column page; columns load more on demand
+const PAGE_SIZE = 20
+
+// Sortable deal card component (compact card from /api/pipeline/board)
 function DealCard({ practice, stage }) {
   const {
     attributes,
@@ -40,8 +43,8 @@ function DealCard({ practice, stage }) {
     cursor: 'grab',
   }
 
-  const getDealValue = () => practice.pipeline?.deal_value || 0
-  const getProbability = () => practice.pipeline?.probability || 0
+  const getDealValue = () => practice.deal_value || 0
+  const getProbability = () => practice.probability || 0
 
   return (
     <div ref={setNodeRef} style={style} {...attributes} {...listeners}>
@@ -62,19 +65,19 @@ function DealCard({ practice, stage }) {
       </div>
 
       {/* Score Badge */}
-      {practice.score && (
+      {practice.score != null && (
         <div style={{
           display: 'inline-block',
           padding: '0.25rem 0.5rem',
           borderRadius: '0.25rem',
           fontSize: '0.75rem',
           fontWeight: '600',
-          background: practice.score.category === 'hot' ? '#fee2e2' :
-                    practice.score.category === 'warm' ? '#fef3c7' : '#e0e7ff',
-          color: practice.score.category === 'hot' ? '#991b1b' :
-                 practice.score.category === 'warm' ? '#92400e' : '#3730a3'
+          background: practice.category === 'hot' ? '#fee2e2' :
+                    practice.category === 'warm' ? '#fef3c7' : '#e0e7ff',
+          color: practice.category === 'hot' ? '#991b1b' :
+                 practice.category === 'warm' ? '#92400e' : '#3730a3'
         }}>
-          🔥 {practice.score.total_score}
+          🔥 {practice.score}
         </div>
       )}
 
@@ -102,7 +105,9 @@ function DealCard({ practice, stage }) {
 
 function Pipeline() {
   const [stages, setStages] = useState([])
-  const [deals, setDeals] = useState({})
+  // stage id -> {count, value, cards, next_cursor}
+  const [board, setBoard] = useState({})
+  const [loadingMore, setLoadingMore] = useState(null)
   const [summary, setSummary] = useState(null)
   const [loading, setLoading] = useState(true)
   const [activeId, setActiveId] = useState(null)
@@ -127,9 +132,9 @@ function Pipeline() {
       const stagesRes = await axios.get('/api/pipeline/stages')
       setStages(stagesRes.data)
       
-      // Fetch deals by stage
-      const dealsRes = await axios.get('/api/pipeline/deals')
-      setDeals(dealsRes.data)
+      // First page of cards per stage, totals from the stage counters
+      const boardRes = await axios.get(`/api/pipeline/board?limit=${PAGE_SIZE}`)
+      setBoard(boardRes.data.stages)
       
       // Fetch summary
       const summaryRes = await axios.get('/api/pipeline/summary')
@@ -142,6 +147,33 @@ function Pipeline() {
     }
   }
 
+  const loadMore = async (stageId) => {
+    const column = board[stageId]
+    if (!column?.next_cursor) return
+    try {
+      setLoadingMore(stageId)
+      const res = await axios.get(`/api/pipeline/board/${stageId}`, {
+        params: { limit: PAGE_SIZE, cursor: column.next_cursor }
+      })
+      setBoard(current => {
+        const existing = current[stageId]?.cards || []
+        // Cards dropped into this column may come back on a later page
+        const known = new Set(existing.map(p => p.nr))
+        return {
+          ...current,
+          [stageId]: {
+            ...res.data,
+            cards: [...existing, ...res.data.cards.filter(p => !known.has(p.nr))]
+          }
+        }
+      })
+    } catch (error) {
+      console.error('Error loading deals:', error)
+    } finally {
+      setLoadingMore(null)
+    }
+  }
+
   const handleDragStart = (event) => {
     setActiveId(event.active.id)
   }
@@ -161,8 +193,8 @@ function Pipeline() {
     let sourcePractice = null
     let sourceStage = null
     
-    for (const [stageId, practices] of Object.entries(deals)) {
-      const found = practices.find(p => p.nr === active.id)
+    for (const [stageId, column] of Object.entries(board)) {
+      const found = column.cards.find(p => p.nr === active.id)
       if (found) {
         sourcePractice = found
         sourceStage = stageId
@@ -177,10 +209,24 @@ function Pipeline() {
 
     try {
       // Optimistic UI update
-      const newDeals = { ...deals }
-      newDeals[sourceStage] = newDeals[sourceStage].filter(p => p.nr !== active.id)
-      newDeals[targetStage] = [...(newDeals[targetStage] || []), sourcePractice]
-      setDeals(newDeals)
+      const source = board[sourceStage]
+      const target = board[targetStage] || { count: 0, value: 0, cards: [], next_cursor: null }
+      const value = sourcePractice.deal_value || 0
+      setBoard({
+        ...board,
+        [sourceStage]: {
+          ...source,
+          count: source.count - 1,
+          value: source.value - value,
+          cards: source.cards.filter(p => p.nr !== active.id)
+        },
+        [targetStage]: {
+          ...target,
+          count: target.count + 1,
+          value: target.value + value,
+          cards: [...target.cards, sourcePractice]
+        }
+      })
 
       // Update backend
       await axios.post('/api/pipeline/move', {
@@ -273,7 +319,7 @@ function Pipeline() {
             <SortableContext
               key={stage.id}
               id={stage.id}
-              items={deals[stage.id]?.map(p => p.nr) || []}
+              items={board[stage.id]?.cards.map(p => p.nr) || []}
               strategy={verticalListSortingStrategy}
             >
               <div
@@ -314,21 +360,31 @@ function Pipeline() {
                       fontSize: '0.75rem',
                       fontWeight: '600'
                     }}>
-                      {deals[stage.id]?.length || 0}
+                      {board[stage.id]?.count || 0}
                     </span>
                   </div>
-                  {summary && summary.stages[stage.id] && (
+                  {board[stage.id] && (
                     <div style={{ fontSize: '0.75rem', color: '#6b7280' }}>
-                      €{summary.stages[stage.id].value.toLocaleString()}
+                      €{board[stage.id].value.toLocaleString()}
                     </div>
                   )}
                 </div>
 
                 {/* Deal Cards */}
                 <div style={{ minHeight: '100px' }}>
-                  {deals[stage.id]?.map((practice) => (
+                  {board[stage.id]?.cards.map((practice) => (
                     <DealCard key={practice.nr} practice={practice} stage={stage} />
                   ))}
+                  {board[stage.id]?.next_cursor && (
+                    <button
+                      className="btn btn-secondary"
+                      style={{ width: '100%' }}
+                      disabled={loadingMore === stage.id}
+                      onClick={() => loadMore(stage.id)}
+                    >
+                      {loadingMore === stage.id ? 'Laden...' : `Meer laden (${board[stage.id].count - board[stage.id].cards.length})`}
+                    </button>
+                  )}
                 </div>
               </div>
             </SortableContext>
@@ -343,7 +399,7 @@ function Pipeline() {
             ✅ Gewonnen ({summary?.won_count || 0})
           </h3>
           <div style={{ maxHeight: '300px', overflowY: 'auto' }}>
-            {deals['won']?.map(practice => (
+            {board['won']?.cards.map(practice => (
               <div key={practice.nr} style={{
                 padding: '0.75rem',
                 marginBottom: '0.5rem',
@@ -357,6 +413,11 @@ function Pipeline() {
                 </div>
               </div>
             ))}
+            {board['won']?.next_cursor && (
+              <button className="btn btn-secondary" onClick={() => loadMore('won')}>
+                Meer laden
+              </button>
+            )}
           </div>
         </div>
 
@@ -365,7 +426,7 @@ function Pipeline() {
             ❌ Verloren ({summary?.lost_count || 0})
           </h3>
           <div style={{ maxHeight: '300px', overflowY: 'auto' }}>
-            {deals['lost']?.map(practice => (
+            {board['lost']?.cards.map(practice => (
               <div key={practice.nr} style={{
                 padding: '0.75rem',
                 marginBottom: '0.5rem',
@@ -379,6 +440,11 @@ function Pipeline() {
                 </div>
               </div>
             ))}
+            {board['lost']?.next_cursor && (
+              <button className="btn btn-secondary" onClick={() => loadMore('lost')}>
+                Meer laden
+              </button>
+            )}
           </div>
         </div>
       </div>
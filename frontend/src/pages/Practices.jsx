@@ -1,10 +1,16 @@
 import { useEffect, useState } from 'react'
 import axios from 'axios'
-import { Plus, Edit, Trash2, X } from 'lucide-react'
+import { Plus, Edit, Trash2, X, Search } from 'lucide-react'
+
+const PAGE_SIZE = 100
+const LIST_FIELDS = 'naam,gemeente,email,tel,website,adres,workflow'
 
 function Practices() {
   const [practices, setPractices] = useState([])
   const [loading, setLoading] = useState(true)
+  const [search, setSearch] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [total, setTotal] = useState(0)
   const [showModal, setShowModal] = useState(false)
   const [editingPractice, setEditingPractice] = useState(null)
   const [formData, setFormData] = useState({
@@ -20,10 +26,15 @@ function Practices() {
     fetchPractices()
   }, [])
 
-  const fetchPractices = async () => {
+  const fetchPractices = async (cursor = null) => {
     try {
-      const response = await axios.get('/api/practices')
-      setPractices(response.data)
+      const params = { limit: PAGE_SIZE, sort: 'naam', fields: LIST_FIELDS }
+      if (search) params.q = search
+      if (cursor) params.cursor = cursor
+      const response = await axios.get('/api/practices', { params })
+      setPractices(prev => cursor ? [...prev, ...response.data.practices] : response.data.practices)
+      setNextCursor(response.data.next_cursor)
+      setTotal(response.data.total)
       setLoading(false)
     } catch (error) {
       console.error('Error fetching practices:', error)
@@ -126,6 +137,20 @@ function Practices() {
       </div>
 
       <div className="card">
+        <div style={{ display: 'flex', gap: '1rem', marginBottom: '1rem' }}>
+          <input
+            type="text"
+            className="form-input"
+            placeholder="Zoek op naam, gemeente, email of telefoon"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            onKeyPress={(e) => e.key === 'Enter' && fetchPractices()}
+          />
+          <button className="btn btn-primary" onClick={() => fetchPractices()}>
+            <Search size={16} style={{ marginRight: '0.5rem', display: 'inline' }} />
+            Zoeken
+          </button>
+        </div>
         <table className="table">
           <thead>
             <tr>
@@ -182,6 +207,13 @@ function Practices() {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <div style={{ textAlign: 'center', marginTop: '1rem' }}>
+            <button className="btn" onClick={() => fetchPractices(nextCursor)}>
+              Meer laden ({practices.length} van {total})
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal for Add/Edit */}
@@ -1,6 +1,7 @@
 # modules/supabase_client.py
 from supabase import create_client, Client
 from config import Config
+from backend.services.supabase_paging import fetch_all, iter_pages, upsert_in_batches
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,18 +42,27 @@ class SupabaseDB:
                 logger.error(f"JSON load error: {e}")
         return []
 
-    def get_practices(self):
-        """Haal alle practices op"""
+    def get_practices(self, columns="*"):
+        """Haal alle practices op (gepagineerd, optioneel enkel bepaalde kolommen)"""
         if self.client:
             try:
-                response = self.client.table('practices').select("*").execute()
-                return response.data
+                return fetch_all(self.client, 'practices', columns=columns)
             except Exception as e:
                 logger.error(f"Supabase fetch error: {e}")
         
         # Fallback to JSON
         return self._load_from_json()
 
+    def iter_practices(self, columns="*", page_size=1000):
+        """Stream practices per pagina"""
+        if not self.client:
+            practices = self._load_from_json()
+            for i in range(0, len(practices), page_size):
+                yield practices[i:i + page_size]
+            return
+
+        yield from iter_pages(self.client, 'practices', columns=columns, page_size=page_size)
+
     def get_practice(self, practice_id):
         """Haal specifieke practice op"""
         if not self.client: return None
@@ -66,6 +76,19 @@ class SupabaseDB:
             logger.error(f"Supabase fetch error: {e}")
             return None
 
+    def max_nr(self):
+        """Hoogste practice nr (0 als er geen zijn)"""
+        if not self.client:
+            practices = self._load_from_json()
+            return max([p.get('nr', 0) for p in practices], default=0)
+        
+        try:
+            response = self.client.table('practices').select('nr').order('nr', desc=True).limit(1).execute()
+            return response.data[0]['nr'] if response.data else 0
+        except Exception as e:
+            logger.error(f"Supabase fetch error: {e}")
+            return 0
+
     def upsert_practice(self, practice_data):
         """Update of maak practice aan"""
         if not self.client: return False
@@ -88,14 +111,11 @@ class SupabaseDB:
             logger.error(f"Supabase delete error: {e}")
             return False
 
-    def bulk_upsert(self, practices_list):
-        """Bulk update/insert"""
+    def bulk_upsert(self, practices_list, batch_size=500):
+        """Bulk update/insert in begrensde batches, met retry per batch"""
         if not self.client: return False
         
-        try:
-            # Supabase upsert supports lists
-            self.client.table('practices').upsert(practices_list).execute()
-            return True
-        except Exception as e:
-            logger.error(f"Supabase bulk error: {e}")
-            return False
+        result = upsert_in_batches(self.client, 'practices', practices_list, batch_size=batch_size)
+        if result['failed']:
+            logger.error(f"Supabase bulk error: {len(result['failed'])} practices not saved")
+        return result['success']
@@ -0,0 +1,38 @@
+# scripts/archive_inbox.py
+"""
+Move old inbox messages into yearly archive files and compact the inbox database
+
+Usage: python scripts/archive_inbox.py [days] [crm.db]
+       (default: INBOX_ARCHIVE_AFTER_DAYS, data/crm.db)
+Run it from cron, e.g. weekly; reruns are safe.
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import Config
+from backend.services.inbox_service import InboxService
+
+def archive(days=None, db_path="data/crm.db"):
+    days = int(days) if days is not None else Config.INBOX_ARCHIVE_AFTER_DAYS
+    print(f"🚀 Archiving inbox messages older than {days} days...")
+
+    if not os.path.exists(db_path):
+        print(f"❌ Inbox database not found: {db_path}")
+        return
+
+    inbox = InboxService(db_path)
+    size_before = os.path.getsize(db_path)
+    archived = inbox.archive_messages(datetime.now() - timedelta(days=days))
+    if not archived:
+        print("✅ Nothing to archive")
+        return
+
+    for year, count in sorted(archived.items()):
+        print(f"📦 {count} messages -> {inbox.archive_path(year)}")
+    inbox.vacuum()
+    print(f"✅ {db_path}: {size_before / 1024 / 1024:.1f} MB -> {os.path.getsize(db_path) / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    archive(*sys.argv[1:3])
@@ -0,0 +1,100 @@
+# scripts/bench_bulk_upsert.py
+"""
+Benchmark: bulk upsert of a 1,000-practice campaign update into the JSON store
+
+Compares the old DatabaseService._save_to_json_bulk (load file, nested rescan
+per incoming practice, rewrite) with PracticeStore.upsert_many (nr index,
+single atomic write) at 1k / 10k / 50k practices.
+
+Usage: python scripts/bench_bulk_upsert.py [sizes...]
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.practice_store import PracticeStore
+
+BATCH_SIZE = 1000
+
+
+def make_practices(count):
+    return [{
+        'nr': nr,
+        'naam': f'Praktijk {nr}',
+        'gem': 'Hasselt',
+        'tel': f'011{nr:06d}',
+        'email': f'info{nr}@praktijk.be',
+        'status': 'Nog niet benaderd',
+        'workflow': {'emails_sent': 0, 'status': 'Nieuw'}
+    } for nr in range(1, count + 1)]
+
+
+def make_batch(count):
+    """Half updates spread over the file, half new practices"""
+    updates = [{'nr': nr, 'naam': f'Praktijk {nr}', 'workflow': {'emails_sent': 1, 'status': 'Contacted'}}
+               for nr in range(count, 0, -max(1, count // (BATCH_SIZE // 2)))][:BATCH_SIZE // 2]
+    inserts = [{'nr': count + i, 'naam': f'Nieuw {i}'} for i in range(1, BATCH_SIZE - len(updates) + 1)]
+    return updates + inserts
+
+
+def legacy_bulk_save(data_file, new_practices):
+    """The pre-index implementation, kept here for comparison"""
+    with open(data_file, 'r') as f:
+        existing = json.load(f)
+    existing_ids = {p.get('nr') for p in existing}
+
+    for practice in new_practices:
+        practice_id = practice.get('nr')
+        if practice_id in existing_ids:
+            for i, p in enumerate(existing):
+                if p.get('nr') == practice_id:
+                    existing[i] = practice
+                    break
+        else:
+            existing.append(practice)
+
+    with open(data_file, 'w') as f:
+        json.dump(existing, f, indent=2)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        batch = make_batch(size)
+
+        with open(data_file, 'w') as f:
+            json.dump(make_practices(size), f, indent=2)
+        legacy, _ = timed(lambda: legacy_bulk_save(data_file, batch))
+
+        with open(data_file, 'w') as f:
+            json.dump(make_practices(size), f, indent=2)
+        store = PracticeStore(data_file)
+        store.count()  # warm: the shared store is loaded once per process
+        indexed, counts = timed(lambda: store.upsert_many(batch))
+
+        journal_file = os.path.join(tmp, 'journal.json')
+        with open(journal_file, 'w') as f:
+            json.dump(make_practices(size), f, indent=2)
+        journal = PracticeStore(journal_file, journal=True, compact_threshold=10 ** 9, compact_interval=3600)
+        journal.count()
+        journaled, _ = timed(lambda: journal.upsert_many(batch))
+
+    print(f"{size:>7,} practices | legacy {legacy * 1000:9.1f} ms | "
+          f"indexed {indexed * 1000:8.1f} ms | journal {journaled * 1000:6.1f} ms | "
+          f"{legacy / indexed:5.1f}x | inserted {counts['inserted']}, updated {counts['updated']}")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"🏁 Bulk upsert of {BATCH_SIZE} practices (half updates, half inserts)\n")
+    for size in sizes:
+        run(size)
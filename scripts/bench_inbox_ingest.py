@@ -0,0 +1,87 @@
+# scripts/bench_inbox_ingest.py
+"""
+Benchmark: sustained inbound message ingestion into the inbox
+
+Compares the old connection handling (sqlite3.connect per call, rollback
+journal, default PRAGMAs) with InboxService's thread-local WAL connections
+and with the webhook path (InboxIngestQueue group commits), with 1 and 8
+writer threads (webhook bursts).
+
+Usage: python scripts/bench_inbox_ingest.py [messages_per_thread]
+"""
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inbox_ingest import InboxIngestQueue
+from backend.services.inbox_service import InboxService
+
+PRACTICES = 200
+
+
+class PerCallInboxService(InboxService):
+    """The pre-pool behaviour: a fresh default connection for every call"""
+
+    def _connect(self):
+        self._local.data_version = None
+        return sqlite3.connect(self.db_path)
+
+
+class QueuedInboxService(InboxService):
+    """Webhook path: add_message only queues, a writer thread group-commits"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.queue = InboxIngestQueue(self)
+
+    def add_message(self, **message):
+        self.queue.submit(**message)
+
+
+def ingest(inbox, thread_no, count):
+    for i in range(count):
+        practice_id = (thread_no * count + i) % PRACTICES + 1
+        inbox.add_message(
+            practice_id=practice_id,
+            practice_name=f'Praktijk {practice_id}',
+            channel='sms' if i % 2 else 'whatsapp',
+            direction='inbound',
+            content=f'Bericht {i} van thread {thread_no}: graag terugbellen',
+            sender=f'+3211{practice_id:06d}',
+            recipient='+3211000000'
+        )
+
+
+def run(service_class, threads, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = service_class(os.path.join(tmp, 'inbox.db'))
+        workers = [threading.Thread(target=ingest, args=(inbox, n, count)) for n in range(threads)]
+
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        if isinstance(inbox, QueuedInboxService):
+            inbox.queue.flush()
+        elapsed = time.perf_counter() - start
+
+        total = sqlite3.connect(inbox.db_path).execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        assert total == threads * count, total
+        return elapsed, total
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"🏁 Inbound ingestion, {count} messages per thread over {PRACTICES} conversations\n")
+
+    for threads in (1, 8):
+        legacy, total = run(PerCallInboxService, threads, count)
+        pooled, _ = run(InboxService, threads, count)
+        queued, _ = run(QueuedInboxService, threads, count)
+        print(f"{threads} thread(s), {total:>5} msgs | per-call connect {total / legacy:8.0f} msg/s | "
+              f"pooled WAL {total / pooled:8.0f} msg/s | queued {total / queued:8.0f} msg/s")
@@ -0,0 +1,75 @@
+# scripts/bench_inbox_render.py
+"""
+Benchmark: loading and rendering a 10k-message conversation
+
+Times get_conversation() (rows -> Message objects), to_dict() + JSON
+encoding and to_json() (what the API sends, stored JSON spliced in)
+separately, and measures the memory the loaded messages hold.
+
+Usage: python scripts/bench_inbox_render.py [messages]
+"""
+import sys
+import os
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inbox_service import InboxService
+
+RUNS = 5
+
+
+def fill(inbox, count):
+    start = datetime(2024, 1, 1, 9, 0, 0, 1)
+    inbox.add_messages([
+        dict(practice_id=1, practice_name='Praktijk 1', channel=('sms', 'whatsapp', 'email')[i % 3],
+             direction=('inbound', 'outbound')[i % 2], content=f'Bericht {i}: graag een afspraak volgende week',
+             sender='+32470000000', recipient='You', timestamp=start + timedelta(minutes=i),
+             metadata={'twilio_sid': f'SM{i:032d}', 'from': '+32470000000'} if i % 2 == 0 else None,
+             attachments=[{'url': f'https://example.com/{i}.jpg', 'type': 'image/jpeg'}] if i % 50 == 0 else None)
+        for i in range(count)
+    ])
+
+
+def best_of(fn):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        fill(inbox, count)
+
+        load_ms, conversation = best_of(lambda: inbox.get_conversation('conv_1'))
+        render_ms, body = best_of(lambda: json.dumps(conversation.to_dict()))
+        to_json_ms, _ = best_of(lambda: inbox.get_conversation('conv_1').to_json())
+        total_ms, _ = best_of(lambda: json.dumps(inbox.get_conversation('conv_1').to_dict()))
+        page_ms, _ = best_of(lambda: json.dumps(inbox.get_conversation('conv_1', limit=50).to_dict()))
+
+        del conversation
+        gc.collect()
+        tracemalloc.start()
+        conversation = inbox.get_conversation('conv_1')
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"🏁 {len(conversation.messages)} messages, {len(body) / 1024:.0f} KiB JSON")
+        print(f"   load   {load_ms:7.1f} ms  (get_conversation)")
+        print(f"   render {render_ms:7.1f} ms  (to_dict + json.dumps)")
+        print(f"   total  {total_ms:7.1f} ms  ({total_ms / len(conversation.messages) * 1000:.1f} µs/message, to_dict)")
+        print(f"   api    {to_json_ms:7.1f} ms  ({to_json_ms / len(conversation.messages) * 1000:.1f} µs/message, to_json)")
+        print(f"   page   {page_ms:7.1f} ms  (newest 50)")
+        print(f"   memory {held / 1024 / 1024:7.1f} MiB held by the loaded conversation "
+              f"({held / len(conversation.messages):.0f} B/message)")
+        inbox.close()
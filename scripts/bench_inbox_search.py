@@ -0,0 +1,87 @@
+# scripts/bench_inbox_search.py
+"""
+Benchmark: inbox message search, FTS5 index vs. the LIKE scan
+
+Fills a temporary inbox with synthetic messages and times a few typical
+queries (word, prefix while typing, filtered by channel/practice).
+
+Usage: python scripts/bench_inbox_search.py [messages]
+"""
+import sys
+import os
+import itertools
+import random
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inbox_service import InboxService
+
+PRACTICES = 2000
+# Real words spread over the frequency ranks of a Zipf vocabulary, from very common to rare
+WORDS = ('graag', 'bedankt', 'afspraak', 'morgen', 'vraag', 'één', 'dinsdag', 'planning',
+         'tandarts', 'huisarts', 'factuur', 'website', 'terugbellen', 'patiënt', 'offerte', 'kinesist')
+VOCABULARY = 20000
+
+QUERIES = (
+    ('woord', 'offerte', {}),
+    ('zeldzaam', 'kinesist', {}),
+    ('twee woorden', 'afspraak dinsdag', {}),
+    ('prefix', 'terugb', {}),
+    ('diacritics', 'patient', {}),
+    ('kanaal', 'factuur', {'channel': 'sms'}),
+    ('praktijk', 'graag', {'practice_id': 42}),
+)
+
+
+def vocabulary(rnd):
+    syllables = ['ba', 'de', 'ko', 'lu', 'mi', 'ne', 'po', 'ra', 'si', 'te', 'vo', 'wi', 'an', 'er', 'ij', 'ou']
+    words = {''.join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4))) for _ in range(VOCABULARY * 2)}
+    words = sorted(words)[:VOCABULARY]
+    rnd.shuffle(words)
+    for n, word in enumerate(WORDS):
+        words[int(1.6 ** n) + n] = word
+    return words
+
+
+def fill(inbox, count):
+    rnd = random.Random(7)
+    words = vocabulary(rnd)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    conn = inbox._connect()
+    rows = []
+    for i in range(count):
+        practice_id = rnd.randrange(PRACTICES) + 1
+        content = ' '.join(rnd.choices(words, cum_weights=cum_weights, k=rnd.randint(4, 20)))
+        rows.append((f'msg_{i}', f'conv_{practice_id}', practice_id, rnd.choice(('sms', 'whatsapp', 'email')),
+                     'inbound', content, '+32', 'You', f'2024-01-01T00:00:{i % 60:02d}.{i:06d}'))
+    with conn:
+        conn.executemany("""
+            INSERT INTO messages (id, conversation_id, practice_id, channel, direction, content,
+                                  sender, recipient, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+
+def timed(inbox, query, filters, runs=5):
+    start = time.perf_counter()
+    for _ in range(runs):
+        results = inbox.search_messages(query, **filters)
+    return (time.perf_counter() - start) / runs * 1000, len(results)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        print(f"🏁 Filling {count} messages...")
+        start = time.perf_counter()
+        fill(inbox, count)
+        print(f"   {time.perf_counter() - start:.1f}s incl. index triggers\n")
+
+        for name, query, filters in QUERIES:
+            inbox.fts_enabled = True
+            fts_ms, hits = timed(inbox, query, filters)
+            inbox.fts_enabled = False
+            like_ms, _ = timed(inbox, query, filters, runs=1)
+            print(f"{name:<13} {query!r:<20} FTS5 {fts_ms:8.1f} ms | LIKE {like_ms:8.1f} ms | {hits} hits")
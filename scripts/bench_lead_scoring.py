@@ -0,0 +1,76 @@
+# scripts/bench_lead_scoring.py
+"""
+Benchmark: bulk lead scoring, per practice vs. the numpy column path
+
+Times bulk_score(), get_hot_leads() and needs_attention() over synthetic
+practices, once with the per-practice loop and once vectorized.
+
+Usage: python scripts/bench_lead_scoring.py [practices]
+"""
+import sys
+import os
+import copy
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services import lead_scoring
+from backend.services.lead_scoring import LeadScoringService
+
+RUNS = 3
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+def practices(count):
+    rnd = random.Random(42)
+    result = []
+    for nr in range(1, count + 1):
+        workflow = {key: rnd.random() < 0.3 for key in
+                    ('email_opened', 'email_clicked', 'replied', 'phone_contacted', 'meeting_booked')}
+        workflow['emails_sent'] = rnd.randint(0, 5)
+        if workflow['emails_sent']:
+            workflow['last_email_date'] = (NOW - timedelta(minutes=rnd.randint(0, 90 * 24 * 60))).isoformat()
+        result.append({
+            'nr': nr, 'naam': f'Praktijk {nr}', 'email': f'info{nr}@praktijk.be',
+            'tel': '011 22 33 44' if rnd.random() < 0.6 else '',
+            'artsen': ['Dr. X'] * rnd.randint(0, 6), 'workflow': workflow
+        })
+    return result
+
+
+def best(fn, data):
+    times = []
+    for _ in range(RUNS):
+        batch = copy.deepcopy(data)
+        start = time.perf_counter()
+        fn(batch)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    if lead_scoring.np is None:
+        sys.exit("numpy is not installed")
+    logging.disable(logging.ERROR)
+    data = practices(count)
+    print(f"📊 {count} practices, best of {RUNS}")
+
+    cases = (
+        ('bulk_score', lambda p: LeadScoringService.bulk_score(p, now=NOW)),
+        ('get_hot_leads', lambda p: LeadScoringService.get_hot_leads(p, 10, now=NOW)),
+        ('needs_attention', lambda p: LeadScoringService.needs_attention(p, now=NOW)),
+    )
+    numpy = lead_scoring.np
+    for name, fn in cases:
+        lead_scoring.np = None
+        loop = best(fn, data)
+        lead_scoring.np = numpy
+        vectorized = best(fn, data)
+        print(f"  {name:<16} per practice {loop:8.1f} ms   vectorized {vectorized:8.1f} ms   x{loop / vectorized:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# scripts/check_pipeline_counters.py
+"""
+Consistency check of the materialized pipeline stage counters
+
+Recounts count, deal value and weighted value per stage from all practices
+and compares them with the counters the store maintains on every write.
+With --rebuild the counters are replaced by the recount (also when they
+already match).
+
+Usage: python scripts/check_pipeline_counters.py [--rebuild]
+Exits with 1 when differences were found and not rebuilt.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.database import get_database
+from backend.services.stage_counters import StageCounters, diff_totals
+
+def check(rebuild=False) -> bool:
+    print("🚀 Checking pipeline stage counters...")
+
+    db = get_database()
+    stored = db.stage_totals()
+    recount = StageCounters()
+    recount.rebuild(db.get_practices())
+    differences = diff_totals(stored, recount.totals())
+
+    for stage, diff in sorted(differences.items()):
+        print(f"⚠️ {stage}: stored {diff['stored']} != counted {diff['expected']}")
+    if not differences:
+        print(f"✅ Counters match {len(recount)} practices")
+
+    if rebuild:
+        totals = db.rebuild_stage_totals()
+        print(f"✅ Counters rebuilt: {sum(t['count'] for t in totals.values())} practices in {len(totals)} stages")
+        return True
+    return not differences
+
+if __name__ == "__main__":
+    sys.exit(0 if check('--rebuild' in sys.argv[1:]) else 1)
@@ -0,0 +1,22 @@
+# scripts/migrate_inbox_last_message.py
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inbox_service import InboxService
+
+def migrate(db_path="data/crm.db"):
+    print("🚀 Backfilling conversation last-message columns...")
+
+    if not os.path.exists(db_path):
+        print(f"❌ Inbox database not found: {db_path}")
+        return
+
+    # Opening the service adds missing columns and backfills them
+    inbox = InboxService(db_path)
+    updated = inbox.backfill_last_messages(only_missing=False)
+
+    print(f"📦 Updated {updated} conversations in {db_path}")
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:2])
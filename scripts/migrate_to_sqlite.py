@@ -0,0 +1,25 @@
+# scripts/migrate_to_sqlite.py
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import Config
+from backend.services.practice_sqlite import SQLitePracticeStore
+
+def migrate(json_path=None, db_path=None):
+    print("🚀 Starting migration to SQLite...")
+
+    json_path = json_path or Config.DATA_FILE
+    db_path = db_path or Config.PRACTICE_DB_FILE
+    if not os.path.exists(json_path):
+        print(f"❌ Data file not found: {json_path}")
+        return
+
+    store = SQLitePracticeStore(db_path)
+    total = store.import_json(json_path)
+
+    print(f"📦 Imported {total} practices into {db_path} ({store.count()} rows)")
+    print("👉 Set PRACTICE_STORAGE=sqlite in .env to use it")
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:3])
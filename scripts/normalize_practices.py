@@ -0,0 +1,34 @@
+# scripts/normalize_practices.py
+"""
+One-off backfill: write the gem/praktijk/notitie field normalization into
+existing practices, so reads no longer need to do it.
+
+New and updated practices are normalized on write by DatabaseService.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.database import DatabaseService
+from backend.services.practice_keys import normalize_practice
+
+def backfill():
+    print("🚀 Normalizing stored practices...")
+
+    db = DatabaseService()
+    changed = []
+    for page in db.iter_practices():
+        for practice in page:
+            before = dict(practice)
+            if normalize_practice(practice) != before:
+                changed.append(practice)
+
+    if not changed:
+        print("✅ Nothing to do, all practices are normalized")
+        return
+
+    result = db.bulk_upsert(changed)
+    print(f"📦 Normalized {len(changed)} practices (success: {result['success']})")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,25 @@
+# scripts/rebuild_inbox_search.py
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inbox_service import InboxService
+
+def rebuild(db_path="data/crm.db"):
+    print("🚀 Rebuilding inbox full-text search index...")
+
+    if not os.path.exists(db_path):
+        print(f"❌ Inbox database not found: {db_path}")
+        return
+
+    # Opening the service creates messages_fts and its triggers when missing
+    inbox = InboxService(db_path)
+    if not inbox.fts_enabled:
+        print("❌ This SQLite build has no FTS5, search keeps using LIKE")
+        return
+
+    count = inbox.rebuild_search_index()
+    print(f"📦 Indexed {count} messages in {db_path}")
+
+if __name__ == "__main__":
+    rebuild(*sys.argv[1:2])
@@ -0,0 +1,40 @@
+# scripts/rescore_leads.py
+"""
+Time decay of stored lead scores
+
+Rescores only the practices whose recency bucket ended since they were
+scored (today -> this_week -> this_month -> older), that have no stored
+score yet or whose scoring inputs were edited without a rescore (e.g. by a
+batch patch or an import), and writes just their 'score' field back.
+
+Usage: python scripts/rescore_leads.py
+Run it from cron, e.g. hourly; reruns are safe.
+"""
+import sys
+import os
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.database import get_database
+from backend.services.lead_scoring import LeadScoringService
+
+def rescore():
+    print("🚀 Refreshing lead scores...")
+
+    db = get_database()
+    practices = db.get_practices()
+    due = LeadScoringService.refresh_scores(practices, verify_inputs=True)
+    if not due:
+        print(f"✅ All {len(practices)} scores current")
+        return
+
+    results = db.patch_practices([{'nr': p['nr'], 'set': {'score': p['score']}} for p in due])
+    failed = [r['nr'] for r in results if not r['success']]
+    for bucket, count in sorted(Counter(p['score']['recency_bucket'] for p in due).items()):
+        print(f"📉 {count} -> {bucket}")
+    if failed:
+        print(f"❌ {len(failed)} scores not written: {failed[:20]}")
+    print(f"✅ {len(due) - len(failed)} of {len(practices)} practices rescored")
+
+if __name__ == "__main__":
+    rescore()
@@ -0,0 +1,91 @@
+"""Test conditional GET and compression of polled endpoints"""
+import sys
+import gzip
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask, jsonify
+
+from backend.services.http_cache import ResponseLayer
+
+
+def _app():
+    state = {'version': 1, 'versioned': True, 'calls': 0}
+    app = Flask(__name__)
+
+    @app.route('/api/items')
+    def items():
+        state['calls'] += 1
+        return jsonify([{'nr': i, 'naam': f'Praktijk {i}'} for i in range(200)])
+
+    @app.route('/api/small')
+    def small():
+        return jsonify({'ok': True})
+
+    layer = ResponseLayer(min_size=1024)
+    layer.register('items', lambda: state['version'] if state['versioned'] else None)
+    layer.init_app(app)
+    return app, layer, state
+
+
+def test_conditional_get():
+    print("🧪 Testing conditional GET...")
+
+    app, layer, state = _app()
+    client = app.test_client()
+
+    first = client.get('/api/items')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/') and first.headers['Last-Modified']
+
+    again = client.get('/api/items', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert state['calls'] == 1
+    print("✅ Matching If-None-Match answered with 304 without running the view")
+
+    since = client.get('/api/items', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    print("✅ If-Modified-Since honoured")
+
+    state['version'] += 1
+    changed = client.get('/api/items', headers={'If-None-Match': etag,
+                                                'If-Modified-Since': first.headers['Last-Modified']})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert client.get('/api/items', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 200
+    print("✅ New version invalidates ETag and Last-Modified, even within the same second")
+
+    state['versioned'] = False
+    assert 'ETag' not in client.get('/api/items').headers
+    print("✅ Unversioned source (Supabase) skips conditional GET")
+
+    metrics = layer.metrics()['items']
+    assert metrics['requests'] == 6 and metrics['not_modified'] == 2
+    assert metrics['hit_ratio'] == round(2 / 6, 3)
+    print("✅ Hit ratio reported")
+
+
+def test_compression():
+    print("🧪 Testing compression...")
+
+    app, layer, _ = _app()
+    client = app.test_client()
+
+    response = client.get('/api/items', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.data))) == 200
+    print("✅ Large JSON body gzipped")
+
+    assert 'Content-Encoding' not in client.get('/api/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/api/items').headers
+    print("✅ Small bodies and clients without gzip left alone")
+
+    assert layer.metrics()['items']['bytes_sent'] < layer.metrics()['items']['bytes_raw']
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_conditional_get()
+    test_compression()
@@ -0,0 +1,111 @@
+"""Test archiving old inbox messages into yearly archive files"""
+import sys
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services.inbox_service import InboxService
+
+
+def _fill(inbox):
+    start = datetime(2022, 11, 1, 9, 0, 0, 1)
+    inbox.add_messages([
+        dict(practice_id=1 + i % 3, practice_name=f'Praktijk {1 + i % 3}', channel='sms',
+             direction=('inbound', 'outbound')[i % 2], content=f'Bericht {i} over de factuur' if i % 10 == 0 else f'Bericht {i}',
+             sender='+32', recipient='You', timestamp=start + timedelta(days=7 * i))
+        for i in range(120)  # Nov 2022 .. Feb 2025
+    ])
+
+
+def _thread(inbox, conversation_id, limit=None):
+    if limit is None:
+        return [m.id for m in inbox.get_conversation(conversation_id).messages]
+    ids, cursor = [], None
+    while True:
+        page = inbox.get_conversation(conversation_id, limit=limit, before=cursor)
+        ids = [m.id for m in page.messages] + ids
+        cursor = page.next_cursor
+        if not cursor:
+            return ids
+
+
+def test_archive_messages():
+    print("🧪 Testing message archival...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        _fill(inbox)
+        threads = {c: _thread(inbox, c) for c in ('conv_1', 'conv_2', 'conv_3')}
+        hits = sorted(m.id for m in inbox.search_messages('factuur', limit=100))
+        unread = inbox.get_unread_count()
+
+        archived = inbox.archive_messages(datetime(2024, 7, 1))
+        assert set(archived) == {2022, 2023, 2024} and sum(archived.values()) == 87
+        assert inbox.archive_path(2023).exists()
+        assert inbox._connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 33
+        assert inbox.archive_messages(datetime(2024, 7, 1)) == {}
+        inbox.vacuum()
+        print("✅ 87 of 120 messages moved into 3 yearly archives, rerun is a no-op")
+
+        for conversation_id, ids in threads.items():
+            assert _thread(inbox, conversation_id) == ids
+            assert _thread(inbox, conversation_id, limit=4) == ids
+        assert sorted(m.id for m in inbox.search_messages('factuur', limit=100)) == hits
+        assert all(m.snippet for m in inbox.search_messages('factuur'))
+        assert {m.practice_id for m in inbox.search_messages('factuur', practice_id=2, limit=100)} == {2}
+        assert inbox.get_unread_count() == unread
+        print("✅ Threads, keyset pages and search read across the archives")
+
+        # bm25 is ranked per file, the files' results are interleaved
+        firsts = [m.timestamp for m in inbox.search_messages('factuur', limit=4)]
+        assert [t.year for t in firsts] == [2024, 2024, 2023, 2022] and firsts[0] >= datetime(2024, 7, 1) > firsts[1]
+        print("✅ Search interleaves per-file rankings: inbox, then newest archive first")
+
+        inbox.mark_as_read('conv_1')
+        assert all(m.read for m in inbox.get_conversation('conv_1').messages)
+        print("✅ mark_as_read reaches archived messages")
+
+        # A new thread connection with room for one attached archive
+        inbox.close()
+        inbox._connect().setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 1)
+        assert _thread(inbox, 'conv_2') == threads['conv_2']
+        print("✅ Archives detached and re-attached past the attach limit")
+        inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+def test_archive_interrupted():
+    print("🧪 Testing an archive run interrupted between its two commits...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        _fill(inbox)
+        threads = {c: _thread(inbox, c) for c in ('conv_1', 'conv_2', 'conv_3')}
+
+        # Step 1 of 2023 committed (copied into the archive), crash before step 2
+        conn = inbox._connect()
+        schema = inbox._attach_archive(conn, 2023)
+        conn.execute(f"""
+            INSERT INTO {schema}.messages SELECT * FROM main.messages
+            WHERE timestamp >= '2023-01-01' AND timestamp < '2024-01-01'
+        """)
+        conn.commit()
+        copied = conn.execute(f"SELECT COUNT(*) FROM {schema}.messages").fetchone()[0]
+        assert copied and conn.execute("SELECT COUNT(*) FROM main.messages").fetchone()[0] == 120
+
+        archived = inbox.archive_messages(datetime(2024, 7, 1))
+        assert archived[2023] == copied and sum(archived.values()) == 87
+        assert conn.execute("SELECT COUNT(*) FROM main.messages").fetchone()[0] == 33
+        for conversation_id, ids in threads.items():
+            assert _thread(inbox, conversation_id) == ids
+        print("✅ Rerun finishes the move: nothing lost, nothing doubled")
+        inbox.close()
+
+
+if __name__ == "__main__":
+    test_archive_messages()
+    test_archive_interrupted()
@@ -0,0 +1,122 @@
+"""Test live inbox events and the running unread total"""
+import sys
+import json
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import inbox_api
+from backend.services.inbox_events import InboxEvents
+from backend.services.inbox_service import InboxService
+
+
+def _message(practice_id, n, direction='inbound'):
+    return dict(practice_id=practice_id, practice_name=f'Praktijk {practice_id}', channel='sms',
+                direction=direction, content=f'Bericht {n}', sender='+32', recipient='You')
+
+
+def test_unread_events():
+    print("🧪 Testing inbox events...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inbox.db')
+        inbox = InboxService(db_path)
+        listener = inbox.events.subscribe()
+
+        inbox.add_message(**_message(1, 1))
+        inbox.add_message(**_message(1, 2, direction='outbound'))
+        inbox.add_messages([_message(2, 3), _message(2, 4)])
+
+        events = [listener.get(timeout=1) for _ in range(4)]
+        assert [e[0] for e in events] == ['message'] * 4
+        assert [e[1]['unread_delta'] for e in events] == [1, 0, 1, 1]
+        assert events[0][1]['message']['content'] == 'Bericht 1' and events[0][1]['practice_name'] == 'Praktijk 1'
+        assert events[-1][1]['unread_total'] == 3 and inbox.get_unread_count() == 3
+        print("✅ message events with unread delta and running total")
+
+        inbox.mark_as_read('conv_2')
+        inbox.mark_as_read('conv_2')  # nothing left to clear, no event
+        assert listener.get(timeout=1) == ('read', {'conversation_id': 'conv_2', 'unread_delta': -2, 'unread_total': 1})
+        assert listener.get(timeout=0.05) is None
+        assert inbox.get_unread_count() == inbox.refresh_unread_count() == 1
+        print("✅ read event, running total matches SUM(unread_count)")
+
+        inbox.events.unsubscribe(listener)
+        # Another worker on the same database: its writes reach our cached total
+        other = InboxService(db_path)
+        assert other.get_unread_count() == 1
+        other.add_message(**_message(3, 5))
+        assert inbox.get_unread_count() == 2
+        other.mark_as_read('conv_1')
+        assert inbox.get_unread_count() == 1 and other.get_unread_count() == 1
+        print("✅ Running total follows writes of other workers")
+
+        # Reads and writes move the total without a full SUM over conversations
+        statements = []
+        inbox._connect().set_trace_callback(statements.append)
+        inbox.add_messages([_message(4, 6), _message(4, 7)])
+        inbox.mark_as_read('conv_4')
+        assert inbox.get_unread_count() == other.get_unread_count() == 1
+        assert not [sql for sql in statements if 'SUM(' in sql.upper()]
+        inbox._connect().set_trace_callback(None)
+        other.close()
+        print("✅ No SUM(unread_count) on reads or writes")
+
+        # Databases from before the counter get it, counted once
+        conn = inbox._connect()
+        for trigger in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER conversations_unread_{trigger}")
+        conn.execute("DROP TABLE inbox_counters")
+        conn.commit()
+        assert InboxService(db_path).get_unread_count() == 1
+        inbox.close()
+
+    events = InboxEvents(queue_size=2)
+    slow = events.subscribe()
+    for n in range(5):
+        events.publish('message', {'n': n})
+    assert slow.get(timeout=0) == ('resync', {})
+    assert slow.get(timeout=0) is None
+    print("✅ Slow listener gets one resync instead of a backlog")
+
+
+def test_event_stream():
+    print("🧪 Testing /api/inbox/events...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        inbox.add_message(**_message(1, 1))
+        shared = inbox_api.inbox_service
+        inbox_api.inbox_service = inbox
+
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(inbox_api.inbox_bp, url_prefix='/api/inbox')
+            response = app.test_client().get('/api/inbox/events')
+            assert response.mimetype == 'text/event-stream'
+            stream = (chunk.decode() for chunk in response.response)
+
+            assert next(stream) == 'event: hello\ndata: {"unread_total": 1}\n\n'
+            inbox.add_message(**_message(1, 2))
+            chunk = next(stream)
+            event, data = chunk.split('\n')[:2]
+            assert event == 'event: message'
+            assert json.loads(data[len('data: '):])['unread_total'] == 2
+            print("✅ hello and message events streamed as SSE")
+
+            response.close()
+            assert inbox.events.subscribers == 0
+            print("✅ Subscription released when the client disconnects")
+        finally:
+            inbox_api.inbox_service = shared
+            inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_unread_events()
+    test_event_stream()
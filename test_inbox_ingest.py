@@ -0,0 +1,146 @@
+"""Test queued, group-committed ingestion of inbound messages"""
+import sys
+import os
+import tempfile
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import inbox_api
+from backend.services.inbox_ingest import InboxIngestQueue
+from backend.services.inbox_service import InboxService
+
+
+def _message(practice_id, n, channel='sms', **extra):
+    return dict(practice_id=practice_id, practice_name=f'Praktijk {practice_id}', channel=channel,
+                direction='inbound', content=f'Bericht {n}', sender='+32', recipient='You', **extra)
+
+
+def test_add_messages_batch():
+    print("🧪 Testing batched add_messages...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        inbox.add_message(**_message(1, 0, channel='email'))
+
+        added = inbox.add_messages([
+            _message(1, 1), _message(1, 2, channel='whatsapp', message_id='SM2'),
+            _message(2, 3), _message(1, 4, message_id='SM2')
+        ])
+        assert [m.id for m in added][1] == 'SM2' and len(added) == 3
+
+        conversations = {c.id: c for c in inbox.get_conversations()}
+        assert conversations['conv_1'].channels == ['email', 'sms', 'whatsapp']
+        assert conversations['conv_1'].unread_count == 3 and conversations['conv_2'].unread_count == 1
+        assert conversations['conv_1'].last_message.id == 'SM2'
+        print("✅ Conversations updated once per batch: channels, unread, last message")
+
+        assert inbox.add_messages([_message(1, 5, message_id='SM2')]) == []
+        assert len(inbox.get_conversation('conv_1').messages) == 3
+        print("✅ Retried message ids are skipped")
+        inbox.close()
+
+
+def test_ingest_queue():
+    print("🧪 Testing ingest queue...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        ingest = InboxIngestQueue(inbox, batch_size=50)
+
+        def burst(thread_no):
+            for n in range(100):
+                ingest.submit(**_message(thread_no * 100 + n % 10, n))
+
+        threads = [threading.Thread(target=burst, args=(t,)) for t in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert ingest.flush(timeout=10)
+
+        stats = ingest.stats()
+        assert stats['messages'] == 800 and stats['queued'] == 0 and stats['failed'] == 0
+        assert stats['batches'] < 800 and stats['largest_batch'] <= 50
+        conversations = inbox.get_conversations(limit=100)
+        assert len(conversations) == 80 and sum(c.unread_count for c in conversations) == 800
+        print(f"✅ 800 messages from 8 threads in {stats['batches']} transactions")
+
+        # A message that can't be stored doesn't take its batch down
+        ingest.submit(**_message(1, 'ok'))
+        ingest.submit(**{**_message(1, 'bad'), 'content': None})
+        ingest.submit(**_message(1, 'ok too'))
+        ingest.flush()
+        assert ingest.stats()['failed'] == 1 and ingest.stats()['messages'] == 802
+        print("✅ Failed batch retried one by one")
+        ingest.close()
+
+        # commit durability: submit returns once the message is stored
+        durable = InboxIngestQueue(inbox, durability='commit')
+        msg_id = durable.submit(**_message(7, 'durable'))
+        assert inbox.get_conversation('conv_7').messages[-1].id == msg_id
+        try:
+            durable.submit(**{**_message(7, 'bad'), 'content': None})
+            assert False
+        except Exception:
+            pass
+        durable.close()
+        print("✅ commit durability acknowledges after the commit and reports errors")
+
+        # The after-write hook sees what was stored, retries and failures left out
+        written = []
+        hooked = InboxIngestQueue(inbox, on_written=written.extend)
+        hooked.submit(**_message(8, 'first', message_id='SM8'))
+        hooked.submit(**_message(8, 'retry', message_id='SM8'))
+        hooked.submit(**{**_message(8, 'bad'), 'content': None})
+        hooked.flush()
+        assert [m['content'] for m in written] == ['Bericht first']
+        hooked.close()
+        print("✅ After-write hook gets the stored messages of each batch")
+
+        try:
+            InboxIngestQueue(inbox, durability='eventually')
+            assert False
+        except ValueError:
+            pass
+        inbox.close()
+
+
+def test_webhook_queues_message():
+    print("🧪 Testing webhook ingestion...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        shared = inbox_api.inbox_service, inbox_api.ingest_queue
+        inbox_api.inbox_service = inbox
+        inbox_api.ingest_queue = InboxIngestQueue(inbox)
+
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(inbox_api.inbox_bp, url_prefix='/api/inbox')
+            client = app.test_client()
+
+            for _ in range(2):  # Twilio retries with the same MessageSid
+                response = client.post('/api/inbox/webhook/sms', data={
+                    'From': '+32470000000', 'Body': 'Graag terugbellen', 'MessageSid': 'SM123'
+                })
+                assert response.status_code == 200
+            inbox_api.ingest_queue.flush()
+
+            messages = inbox.search_messages('terugbellen')
+            assert [m.id for m in messages] == ['SM123']
+            print("✅ Webhook acknowledged, message written once by the queue")
+        finally:
+            inbox_api.ingest_queue.close()
+            inbox_api.inbox_service, inbox_api.ingest_queue = shared
+            inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_add_messages_batch()
+    test_ingest_queue()
+    test_webhook_queues_message()
@@ -0,0 +1,76 @@
+"""Test the denormalized last-message pointer on conversations"""
+import sys
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services.inbox_service import InboxService
+
+
+def _old_database(path):
+    """Schema and data as written before the last-message columns existed"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE messages (
+            id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, practice_id INTEGER NOT NULL,
+            channel TEXT NOT NULL, direction TEXT NOT NULL, content TEXT NOT NULL,
+            sender TEXT NOT NULL, recipient TEXT NOT NULL, timestamp TEXT NOT NULL,
+            status TEXT DEFAULT 'sent', metadata TEXT, read INTEGER DEFAULT 0,
+            attachments TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE conversations (
+            id TEXT PRIMARY KEY, practice_id INTEGER NOT NULL UNIQUE, practice_name TEXT NOT NULL,
+            channels TEXT NOT NULL, unread_count INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP, updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX idx_messages_conversation ON messages(conversation_id);
+        INSERT INTO conversations VALUES ('conv_1', 1, 'Praktijk A', '["sms"]', 1, '2024-01-01T09:00:00', '2024-01-02T09:00:00');
+        INSERT INTO messages (id, conversation_id, practice_id, channel, direction, content, sender, recipient, timestamp)
+        VALUES ('m1', 'conv_1', 1, 'sms', 'outbound', 'Eerste', 'You', '+32', '2024-01-01T09:00:00'),
+               ('m2', 'conv_1', 1, 'whatsapp', 'inbound', 'Laatste antwoord', '+32', 'You', '2024-01-02T09:00:00');
+    """)
+    conn.commit()
+    conn.close()
+
+
+def test_last_message_pointer():
+    print("🧪 Testing last-message pointer...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inbox.db')
+        _old_database(db_path)
+
+        inbox = InboxService(db_path)
+        conv = inbox.get_conversations()[0]
+        assert conv.last_message.id == 'm2' and conv.last_message.content == 'Laatste antwoord'
+        assert conv.last_message.channel == 'whatsapp'
+        print("✅ Old database migrated and backfilled")
+
+        indexes = {row[1] for row in inbox._connect().execute("PRAGMA index_list(messages)")}
+        assert 'idx_messages_conversation_timestamp_id' in indexes and 'idx_messages_conversation' not in indexes
+        print("✅ Composite (conversation_id, timestamp, id) index")
+
+        msg = inbox.add_message(practice_id=1, practice_name='Praktijk A', channel='email', direction='inbound',
+                                content='x' * 500, sender='a@b.be', recipient='You')
+        inbox.add_message(practice_id=2, practice_name='Praktijk B', channel='sms', direction='outbound',
+                          content='Hallo B', sender='You', recipient='+32')
+        conversations = {c.id: c for c in inbox.get_conversations()}
+        assert conversations['conv_1'].last_message.id == msg.id
+        assert len(conversations['conv_1'].last_message.content) == InboxService.PREVIEW_LENGTH
+        assert conversations['conv_2'].last_message.content == 'Hallo B'
+        assert [c.id for c in inbox.get_conversations(unread_only=True)] == ['conv_1']
+        print("✅ Pointer maintained by add_message")
+
+        # The listing no longer touches the messages table
+        plan = ' '.join(str(row) for row in inbox._connect().execute(
+            "EXPLAIN QUERY PLAN SELECT last_message_id FROM conversations ORDER BY updated_at DESC LIMIT 50"))
+        assert 'messages' not in plan
+        inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_last_message_pointer()
@@ -0,0 +1,148 @@
+"""Test the content-addressed media store and inbox media endpoint"""
+import sys
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+from twilio.request_validator import RequestValidator
+
+from backend.api import inbox_api
+from backend.config import Config
+from backend.services.blob_store import BlobStore, BlobTooLarge
+from backend.services.inbox_ingest import InboxIngestQueue
+from backend.services.inbox_media import MediaFetcher, download, is_twilio_media_url
+from backend.services.inbox_service import InboxService
+
+
+def test_blob_store():
+    print("🧪 Testing blob store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp, max_bytes=250, max_file_bytes=200)
+        first = store.put(b'a' * 100, 'image/jpeg')
+        again = store.put(b'a' * 100, 'image/jpeg')
+        assert first == again and first['sha256'] == hashlib.sha256(b'a' * 100).hexdigest()
+        assert store.get(first['sha256'])['path'].read_bytes() == b'a' * 100
+        assert store.total_size() == 100
+        print("✅ Identical content stored once under its sha256")
+
+        second = store.put(b'b' * 100)
+        store.TOUCH_INTERVAL = 0
+        store.get(first['sha256'])  # first is now the most recently used
+        third = store.put(b'c' * 100)
+        assert store.get(second['sha256']) is None and store.get(first['sha256']) and store.get(third['sha256'])
+        assert store.total_size() == 200
+        print("✅ Least recently used blob evicted past max_bytes")
+
+        try:
+            store.put_chunks([b'x' * 150, b'x' * 150])
+            assert False
+        except BlobTooLarge:
+            pass
+        assert not [f for f in os.listdir(tmp) if f.startswith('.incoming-')]
+        print("✅ Oversized media rejected without leftovers")
+
+
+def test_media_hosts():
+    print("🧪 Testing which media URLs are fetched...")
+
+    for url in ('https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME1',
+                'https://media.twiliocdn.com/AC1/ME1'):
+        assert is_twilio_media_url(url), url
+    for url in ('https://eviltwilio.com/Media/ME1', 'https://api.twilio.com.evil.net/x',
+                'http://api.twilio.com/Media/ME1', 'https://169.254.169.254/latest/meta-data/',
+                'file:///etc/passwd'):
+        assert not is_twilio_media_url(url), url
+        try:
+            next(download(url))
+            assert False, url
+        except ValueError:
+            pass
+    print("✅ Only https Twilio hosts, lookalikes never get a request or credentials")
+
+
+def test_webhook_media():
+    print("🧪 Testing webhook media download and serving...")
+
+    media = {'https://api.twilio.com/Media/ME1': b'\x89PNG' + bytes(range(256)) * 40}
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        shared = inbox_api.inbox_service, inbox_api.ingest_queue, inbox_api.media_store, inbox_api.media_fetcher
+        inbox_api.inbox_service = inbox
+        inbox_api.ingest_queue = InboxIngestQueue(inbox)
+        inbox_api.media_store = BlobStore(os.path.join(tmp, 'media'), max_bytes=10 ** 6)
+        inbox_api.media_fetcher = MediaFetcher(inbox_api.media_store, inbox, wait_for=inbox_api.ingest_queue.flush,
+                                               fetch=lambda url: [media[url]])
+        auth_token, Config.TWILIO_AUTH_TOKEN = Config.TWILIO_AUTH_TOKEN, 'test-auth-token'
+
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(inbox_api.inbox_bp, url_prefix='/api/inbox')
+            client = app.test_client()
+
+            url = 'http://localhost/api/inbox/webhook/whatsapp'
+            form = {
+                'From': 'whatsapp:+32470000001', 'Body': 'Foto', 'MessageSid': 'SM1', 'NumMedia': '1',
+                'MediaUrl0': 'https://api.twilio.com/Media/ME1', 'MediaContentType0': 'image/png'
+            }
+            signature = RequestValidator(Config.TWILIO_AUTH_TOKEN).compute_signature(url, form)
+
+            # Unsigned or forged webhooks are stored, their media is not fetched
+            for sid, headers in (('SM0', {}), ('SMX', {'X-Twilio-Signature': 'forged'})):
+                response = client.post(url, data=dict(form, MessageSid=sid), headers=headers)
+                assert response.status_code == 200
+            inbox_api.ingest_queue.flush()
+            inbox_api.media_fetcher.flush()
+            unsigned = inbox.get_conversation('conv_0').messages
+            assert len(unsigned) == 2 and all('sha256' not in m.attachments[0] for m in unsigned)
+            print("✅ Media of unsigned webhooks is not fetched")
+
+            response = client.post(url, data=form, headers={'X-Twilio-Signature': signature})
+            assert response.status_code == 200
+            inbox_api.media_fetcher.flush()
+
+            message = next(m for m in inbox.get_conversation('conv_0').messages if m.id == 'SM1')
+            attachment = message.attachments[0]
+            sha256 = hashlib.sha256(media['https://api.twilio.com/Media/ME1']).hexdigest()
+            assert attachment == {'url': 'https://api.twilio.com/Media/ME1', 'type': 'image/png',
+                                  'sha256': sha256, 'size': 10244}
+            print("✅ Media fetched in the background, message points at its sha256")
+
+            response = client.get(f'/api/inbox/media/{sha256}')
+            assert response.status_code == 200 and response.mimetype == 'image/png'
+            assert response.data == media['https://api.twilio.com/Media/ME1']
+            assert 'immutable' in response.headers['Cache-Control'] and response.headers['Accept-Ranges'] == 'bytes'
+
+            partial = client.get(f'/api/inbox/media/{sha256}', headers={'Range': 'bytes=0-3'})
+            assert partial.status_code == 206 and partial.data == b'\x89PNG'
+            assert client.get(f'/api/inbox/media/{sha256}', headers={'If-None-Match': f'"{sha256}"'}).status_code == 304
+            assert client.get('/api/inbox/media/' + '0' * 64).status_code == 404
+            assert client.get('/api/inbox/media/../secret').status_code == 404
+            print("✅ Served with Range, ETag and immutable caching")
+
+            # Evicted between the store lookup and send_file
+            lookup = inbox_api.media_store.get
+            def evicted_after_lookup(sha256):
+                blob = lookup(sha256)
+                os.unlink(blob['path'])
+                return blob
+            inbox_api.media_store.get = evicted_after_lookup
+            assert client.get(f'/api/inbox/media/{sha256}').status_code == 404
+            print("✅ Media evicted during a request is a 404")
+        finally:
+            inbox_api.ingest_queue.close()
+            inbox_api.media_fetcher.close()
+            inbox_api.inbox_service, inbox_api.ingest_queue, inbox_api.media_store, inbox_api.media_fetcher = shared
+            Config.TWILIO_AUTH_TOKEN = auth_token
+            inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_blob_store()
+    test_media_hosts()
+    test_webhook_media()
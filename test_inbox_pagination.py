@@ -0,0 +1,97 @@
+"""Test keyset pagination of inbox conversations and message threads"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import inbox_api
+from backend.services.inbox_service import InboxService
+
+
+def _inbox(db_path):
+    inbox = InboxService(db_path)
+    for practice_id in range(1, 13):
+        inbox.add_message(practice_id=practice_id, practice_name=f'Praktijk {practice_id}', channel='sms',
+                          direction='inbound', content=f'Hallo {practice_id}', sender='+32', recipient='You')
+    for i in range(25):
+        inbox.add_message(practice_id=1, practice_name='Praktijk 1', channel='whatsapp', direction='outbound',
+                          content=f'Bericht {i}', sender='You', recipient='+32', message_id=f'm{i:02d}')
+
+    # Ties on the sort column: only the id keeps the order total
+    conn = inbox._connect()
+    conn.execute("UPDATE conversations SET updated_at = '2024-03-01T10:00:00' WHERE practice_id BETWEEN 3 AND 9")
+    conn.execute("UPDATE messages SET timestamp = '2024-03-01T10:00:00' WHERE id BETWEEN 'm05' AND 'm15'")
+    conn.commit()
+    return inbox
+
+
+def test_inbox_pagination():
+    print("🧪 Testing inbox keyset pagination...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = _inbox(os.path.join(tmp, 'inbox.db'))
+
+        seen, cursor = [], None
+        while True:
+            page = inbox.get_conversations_page(limit=5, cursor=cursor)
+            seen.extend(page['conversations'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert [c.id for c in seen] == [c.id for c in inbox.get_conversations(limit=50)]
+        assert len({c.id for c in seen}) == 12
+        print("✅ Conversation pages cover every conversation once, in listing order")
+
+        # Walk a thread backwards with `before`
+        full = [m.id for m in inbox.get_conversation('conv_1').messages]
+        thread = inbox.get_conversation('conv_1', limit=10)
+        assert [m.id for m in thread.messages] == full[-10:]
+        assert thread.last_message.id == 'm24' and thread.next_cursor
+        messages = thread.messages
+        while thread.next_cursor:
+            thread = inbox.get_conversation('conv_1', limit=10, before=thread.next_cursor)
+            messages = thread.messages + messages
+        assert len(messages) == 26 and len({m.id for m in messages}) == 26
+        assert [m.id for m in messages] == full
+        assert thread.last_message.id == 'm24'
+        print("✅ Message pages load older messages, oldest first per page")
+
+        try:
+            inbox.get_conversations_page(cursor='nonsense')
+            assert False
+        except ValueError:
+            pass
+        print("✅ Invalid cursor rejected")
+
+        shared_inbox, inbox_api.inbox_service = inbox_api.inbox_service, inbox
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(inbox_api.inbox_bp, url_prefix='/api/inbox')
+            client = app.test_client()
+
+            data = client.get('/api/inbox/conversations?limit=8').get_json()
+            assert data['count'] == 8 and data['next_cursor']
+            more = client.get(f"/api/inbox/conversations?limit=8&cursor={data['next_cursor']}").get_json()
+            assert more['count'] == 4 and more['next_cursor'] is None
+            assert client.get('/api/inbox/conversations?offset=8&limit=8').get_json()['count'] == 4
+
+            data = client.get('/api/inbox/conversation/conv_1?limit=20').get_json()
+            assert len(data['conversation']['messages']) == 20 and data['next_cursor']
+            older = client.get(f"/api/inbox/conversation/conv_1?limit=20&before={data['next_cursor']}").get_json()
+            assert len(older['conversation']['messages']) == 6 and older['next_cursor'] is None
+            assert len(client.get('/api/inbox/conversation/conv_1').get_json()['conversation']['messages']) == 26
+
+            assert client.get('/api/inbox/conversations?cursor=nonsense').status_code == 400
+            print("✅ API returns next_cursor, offset still works")
+        finally:
+            inbox_api.inbox_service = shared_inbox
+            inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_inbox_pagination()
@@ -0,0 +1,100 @@
+"""Test full-text search of inbox messages"""
+import sys
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services.inbox_service import InboxService, fts_query
+
+
+def test_fts_query():
+    print("🧪 Testing search query building...")
+
+    assert fts_query('afspraak morg') == 'content : ("afspraak" "morg"*)'
+    assert fts_query('tand* "OR" NEAR(') == 'content : ("tand"* "OR" "NEAR"*)'
+    assert fts_query('factuur', channel='sms', practice_id=7) == \
+        'content : ("factuur"*) AND channel : "sms" AND practice_id : "7"'
+    assert fts_query('?!') is None
+    print("✅ User input quoted, last word as prefix, filters in the index")
+
+
+def test_search_messages():
+    print("🧪 Testing message search...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inbox.db')
+
+        # Messages written before the search index existed
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            CREATE TABLE messages (
+                id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, practice_id INTEGER NOT NULL,
+                channel TEXT NOT NULL, direction TEXT NOT NULL, content TEXT NOT NULL,
+                sender TEXT NOT NULL, recipient TEXT NOT NULL, timestamp TEXT NOT NULL,
+                status TEXT DEFAULT 'sent', metadata TEXT, read INTEGER DEFAULT 0,
+                attachments TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            INSERT INTO messages (id, conversation_id, practice_id, channel, direction, content, sender, recipient, timestamp)
+            VALUES ('old', 'conv_3', 3, 'email', 'inbound', 'Oude offerte voor de website', 'a@b.be', 'You', '2024-01-01T09:00:00')
+        """)
+        conn.commit()
+        conn.close()
+
+        inbox = InboxService(db_path)
+        assert inbox.fts_enabled
+        assert [m.id for m in inbox.search_messages('offerte')] == ['old']
+        print("✅ Index created and rebuilt for an existing database")
+
+        inbox.add_message(practice_id=1, practice_name='Praktijk A', channel='sms', direction='inbound',
+                          content='Graag een afspraak op dinsdag, één patiënt', sender='+32', recipient='You',
+                          message_id='m1')
+        inbox.add_message(practice_id=1, practice_name='Praktijk A', channel='whatsapp', direction='inbound',
+                          content='Afspraak afspraak afspraak bevestigd', sender='+32', recipient='You',
+                          message_id='m2')
+        inbox.add_message(practice_id=2, practice_name='Praktijk B', channel='sms', direction='outbound',
+                          content='Wij bellen u terug over de afspraak met de sms module', sender='You', recipient='+32',
+                          message_id='m3')
+
+        results = inbox.search_messages('afspraak')
+        assert [m.id for m in results][0] == 'm2' and len(results) == 3
+        assert '<mark>Afspraak</mark>' in results[0].snippet
+        assert results[0].to_dict()['snippet'] == results[0].snippet
+        print("✅ bm25 ranking with highlighted snippets")
+
+        assert [m.id for m in inbox.search_messages('een patient')] == ['m1']
+        assert [m.id for m in inbox.search_messages('afspraak dinsd')] == ['m1']
+        assert [m.id for m in inbox.search_messages('bel*  terug')] == ['m3']
+        print("✅ Diacritics folded, prefix queries")
+
+        assert {m.id for m in inbox.search_messages('afspraak', channel='sms')} == {'m1', 'm3'}
+        assert [m.id for m in inbox.search_messages('afspraak', channel='sms', practice_id=2)] == ['m3']
+        # Channel names are only matched through the filter, not as content
+        assert [m.id for m in inbox.search_messages('sms')] == ['m3']
+        assert [m.id for m in inbox.search_messages('"afspraak" -(bevestigd')] == ['m2']
+        print("✅ Channel/practice filters, no FTS syntax errors from user input")
+
+        conn = inbox._connect()
+        conn.execute("UPDATE messages SET content = 'Gewijzigde tekst' WHERE id = 'm2'")
+        conn.execute("DELETE FROM messages WHERE id = 'm3'")
+        conn.commit()
+        assert {m.id for m in inbox.search_messages('afspraak')} == {'m1'}
+        assert [m.id for m in inbox.search_messages('gewijzigd')] == ['m2']
+        assert inbox.rebuild_search_index() == 3
+        assert [m.id for m in inbox.search_messages('gewijzigd')] == ['m2']
+        print("✅ Triggers follow updates and deletes, rebuild keeps results")
+
+        inbox.fts_enabled = False
+        assert [m.id for m in inbox.search_messages('Gewijzigde')] == ['m2']
+        print("✅ LIKE fallback without FTS5")
+        inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_fts_query()
+    test_search_messages()
@@ -0,0 +1,197 @@
+"""Test event-driven lead scores and the time-decay pass"""
+import sys
+import copy
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import pipeline_api
+from backend.api import practices as practices_api
+from backend.services import lead_scoring
+from backend.services.database import DatabaseService
+from backend.services.lead_scoring import LeadScoringService
+from backend.services.practice_store import PracticeStore
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+def _practices():
+    practices = []
+    for nr, hours in enumerate((None, 1, 30, 6 * 24, 20 * 24, 60 * 24, -2), 1):
+        workflow = {'email_opened': True, 'email_clicked': nr % 2 == 0, 'meeting_booked': nr > 4, 'emails_sent': 1}
+        if hours is not None:
+            workflow['last_email_date'] = (NOW - timedelta(hours=hours)).isoformat()
+        practices.append({'nr': nr, 'naam': f'Praktijk {nr}', 'email': f'info{nr}@praktijk.be',
+                          'tel': '011 22 33 44', 'artsen': ['Dr. X', 'Dr. Y'], 'workflow': workflow})
+    return practices
+
+
+def test_recency_buckets():
+    print("🧪 Testing recency buckets and their end...")
+
+    buckets = {p['nr']: LeadScoringService.calculate_score(p, now=NOW) for p in _practices()}
+    assert [buckets[nr]['recency_bucket'] for nr in range(1, 8)] == [
+        'no_contact', 'today', 'this_week', 'this_week', 'this_month', 'older', 'this_week'
+    ]
+    assert buckets[2]['rescore_at'] == '2024-06-16T11:00:00.000000'
+    assert buckets[3]['rescore_at'] == '2024-06-22T06:00:00.000000'
+    assert buckets[7]['rescore_at'] == '2024-06-15T14:00:00.000000'  # future date: today from then on
+    assert buckets[1]['rescore_at'] is None and buckets[6]['rescore_at'] is None
+    print("✅ Bucket and rescore_at per practice")
+
+    # Stored scores are refreshed exactly when their bucket ends
+    for numpy in (lead_scoring.np, None):
+        saved, lead_scoring.np = lead_scoring.np, numpy
+        try:
+            practices = _practices()
+            assert len(LeadScoringService.refresh_scores(practices, now=NOW)) == len(practices)
+            assert LeadScoringService.refresh_scores(practices, now=NOW + timedelta(minutes=30)) == []
+
+            later = NOW + timedelta(hours=23)
+            due = LeadScoringService.refresh_scores(practices, now=later)
+            assert [p['nr'] for p in due] == [2, 7]
+            for practice in practices:
+                assert practice['score'] == {**LeadScoringService.calculate_score(practice, now=later),
+                                             'calculated_at': practice['score']['calculated_at']}
+        finally:
+            lead_scoring.np = saved
+    print("✅ refresh_scores only rescores practices whose bucket ended")
+
+
+def test_record_event():
+    print("🧪 Testing workflow events...")
+
+    practice = _practices()[0]
+    workflow = practice['workflow']
+    before = LeadScoringService.calculate_score(practice, now=NOW)
+
+    changes = LeadScoringService.record_event(practice, 'sms_replied', now=NOW)
+    assert workflow.get('sms_replied') is None, "workflow is replaced, not mutated"
+    assert practice['workflow']['sms_replied'] is True
+    assert changes['workflow.last_sms_reply'] == NOW.isoformat()
+    assert changes['score'] is practice['score']
+    assert practice['score']['engagement_score'] == before['engagement_score'] + LeadScoringService.WEIGHTS['email_replied']
+
+    LeadScoringService.record_event(practice, 'email_opened', now=NOW)
+    LeadScoringService.record_event(practice, 'email_sent', now=NOW)
+    assert practice['workflow']['open_count'] == 1
+    assert practice['workflow']['emails_sent'] == 2
+    assert practice['score']['recency_bucket'] == 'today'
+
+    try:
+        LeadScoringService.record_event(practice, 'deal_won')
+        assert False, "unknown event accepted"
+    except ValueError:
+        pass
+    print("✅ Events update the workflow and the stored score")
+
+
+def test_stored_reads_match_fresh_scores():
+    print("🧪 Testing hot/attention from stored scores...")
+
+    practices = _practices()
+    for practice in practices:
+        practice['workflow']['replied'] = practice['nr'] in (3, 5)
+    LeadScoringService.refresh_scores(practices, now=NOW - timedelta(hours=1))
+
+    later = NOW + timedelta(days=3)
+    expected_hot = [p['nr'] for p in LeadScoringService.get_hot_leads(copy.deepcopy(practices), 10, now=later)]
+    expected_attention = [(p['nr'], p['attention_reason'])
+                          for p in LeadScoringService.needs_attention(copy.deepcopy(practices), now=later)]
+    # /leads/hot: top_leads over the stored-score order (the score index)
+    ranked = sorted(practices, key=lambda p: (-p['score']['total_score'], p['nr']))
+    assert [p['nr'] for p in LeadScoringService.top_leads(lambda n: ranked[:n], 'hot', 10, now=later)] == expected_hot
+    assert [(p['nr'], p['attention_reason'])
+            for p in LeadScoringService.stored_needs_attention(practices, now=later)] == expected_attention
+    assert expected_hot and expected_attention
+    print("✅ Same hot leads and attention list as a full recompute")
+
+
+def test_edits_rescore():
+    print("🧪 Testing that edited scoring inputs don't leave a stale score...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump([], f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        shared, practices_api.db = practices_api.db, db
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(practices_api.practices_bp, url_prefix='/api')
+            client = app.test_client()
+
+            nr = client.post('/api/practices', json={'naam': 'Nieuw'}).get_json()['nr']
+            assert db.get_practice(nr)['score']['total_score'] == 2
+            client.put(f'/api/practices/{nr}', json={'email': 'info@nieuw.be', 'tel': '011 22 33 44',
+                                                     'website': 'nieuw.be', 'artsen': ['A', 'B', 'C', 'D', 'E']})
+            stored = db.get_practice(nr)
+            assert stored['score']['total_score'] == LeadScoringService.calculate_score(stored)['total_score'] == 15
+            calculated_at = stored['score']['calculated_at']
+            client.put(f'/api/practices/{nr}', json={'naam': 'Hernoemd'})
+            assert db.get_practice(nr)['score']['calculated_at'] == calculated_at
+            print("✅ PUT rescores when a scoring input changed, not otherwise")
+        finally:
+            practices_api.db = shared
+
+    # Edited without a rescore (batch patch, import): only the full pass catches it
+    practices = _practices()
+    LeadScoringService.refresh_scores(practices, now=NOW)
+    practices[0]['tel'] = ''
+    practices[1]['workflow']['meeting_booked'] = True
+    assert LeadScoringService.refresh_scores(practices, now=NOW) == []
+    assert [p['nr'] for p in LeadScoringService.refresh_scores(practices, now=NOW, verify_inputs=True)] == [1, 2]
+    assert practices[0]['score'] == LeadScoringService.calculate_score(practices[0], now=NOW)
+    print("✅ verify_inputs rescores stored scores whose inputs were edited")
+
+
+def test_automation_trigger_endpoint():
+    print("🧪 Testing /automation/trigger and /leads/hot...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        practices = _practices()
+        # The endpoints score against the real clock
+        practices[3]['workflow']['last_email_date'] = (datetime.now() - timedelta(hours=1)).isoformat()
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        shared, pipeline_api.db = pipeline_api.db, db
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(pipeline_api.pipeline_bp, url_prefix='/api')
+            client = app.test_client()
+
+            response = client.post('/api/automation/trigger', json={'practice_id': 4, 'event': 'email_replied'})
+            assert response.status_code == 200
+            stored = db.get_practice(4)
+            assert stored['workflow']['replied'] is True
+            assert stored['score']['category'] == 'hot'
+
+            hot = client.get('/api/leads/hot').get_json()
+            assert [lead['nr'] for lead in hot['leads']] == [4]
+            assert hot['leads'][0]['score']['calculated_at'] == stored['score']['calculated_at']
+            print("✅ Event stored with its score, /leads/hot reads it back")
+        finally:
+            pipeline_api.db = shared
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_recency_buckets()
+    test_record_event()
+    test_stored_reads_match_fresh_scores()
+    test_edits_rescore()
+    test_automation_trigger_endpoint()
@@ -0,0 +1,85 @@
+"""Test that vectorized lead scoring matches the per-practice path"""
+import sys
+import copy
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services import lead_scoring
+from backend.services.lead_scoring import LeadScoringService
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+def _practices(count=3000, seed=11):
+    rnd = random.Random(seed)
+    practices = []
+    for nr in range(1, count + 1):
+        workflow = {key: rnd.random() < 0.3 for key in
+                    ('email_opened', 'email_clicked', 'replied', 'sms_replied', 'whatsapp_replied',
+                     'phone_contacted', 'meeting_booked')}
+        workflow['emails_sent'] = rnd.choice([0, 0, 1, 2, 3, 4, 6])
+        kind = rnd.random()
+        if kind < 0.6:
+            last = NOW - timedelta(seconds=rnd.randint(-86400, 90 * 86400))
+            workflow['last_email_date'] = rnd.choice([last.isoformat(), last.isoformat() + 'Z', last.isoformat() + '+02:00'])
+        elif kind < 0.65:
+            workflow['last_email_date'] = 'gisteren'
+        elif kind < 0.7:
+            workflow['last_email_date'] = ''
+        practice = {'nr': nr, 'workflow': workflow}
+        if rnd.random() < 0.7:
+            practice['email'] = f'info{nr}@praktijk.be'
+        if rnd.random() < 0.6:
+            practice['tel'] = '011 22 33 44'
+        if rnd.random() < 0.4:
+            practice['website'] = 'https://praktijk.be'
+        artsen = rnd.random()
+        if artsen < 0.8:
+            practice['artsen'] = ['Dr. X'] * rnd.randint(0, 7)
+        elif artsen < 0.9:
+            practice['artsen'] = 'Dr. X, Dr. Y'
+        practices.append(practice)
+    # Exactly on day boundaries
+    for nr, delta in enumerate((timedelta(0), timedelta(days=1), timedelta(days=7), timedelta(days=30, microseconds=1)), 1):
+        practices[nr]['workflow']['last_email_date'] = (NOW - delta).isoformat()
+    return practices
+
+
+def _run(method, practices, *args):
+    return [(p['nr'], p['score'], p.get('attention_reason')) for p in method(practices, *args, now=NOW)]
+
+
+def _per_practice(method, practices, *args):
+    numpy = lead_scoring.np
+    lead_scoring.np = None
+    try:
+        return _run(method, practices, *args)
+    finally:
+        lead_scoring.np = numpy
+
+
+def test_vectorized_parity():
+    print("🧪 Testing vectorized lead scoring parity...")
+    assert lead_scoring.np is not None, "numpy required for this test"
+
+    practices = _practices()
+    for name, method, args in (('bulk_score', LeadScoringService.bulk_score, ()),
+                               ('get_hot_leads', LeadScoringService.get_hot_leads, (25,)),
+                               ('needs_attention', LeadScoringService.needs_attention, ())):
+        expected = _per_practice(method, copy.deepcopy(practices), *args)
+        assert _run(method, copy.deepcopy(practices), *args) == expected, name
+        print(f"✅ {name}: {len(expected)} results identical")
+
+    scored = {p['nr']: p['score'] for p in LeadScoringService.bulk_score(copy.deepcopy(practices), now=NOW)}
+    for practice in practices[:200]:
+        assert LeadScoringService.calculate_score(practice, now=NOW) == scored[practice['nr']]
+    assert LeadScoringService.bulk_score([]) == []
+    print("✅ Same score dicts as calculate_score with the same now")
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_vectorized_parity()
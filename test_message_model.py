@@ -0,0 +1,73 @@
+"""Test the slotted, lazily decoded Message/Conversation models"""
+import sys
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.models.message import Message, Conversation
+from backend.services.inbox_service import InboxService
+
+
+def test_lazy_message():
+    print("🧪 Testing lazy Message decoding...")
+
+    row = ('SM1', 'conv_1', 1, 'sms', 'inbound', 'Hallo', '+32470000000', 'You',
+           '2024-03-01T10:15:00.000001', 'sent', '{"twilio_sid": "SM1"}', 1, '[]')
+    message = Message.from_row(row)
+    assert not hasattr(message, '__dict__')
+    assert message._timestamp == row[8] and message._metadata == row[10]
+
+    # to_json splices the stored JSON text in, nothing is decoded
+    rendered = message.to_json()
+    assert message._metadata == row[10] and message._attachments == '[]'
+    assert json.loads(rendered) == json.loads(json.dumps(message.to_dict()))
+    print("✅ to_json renders the row without decoding metadata or attachments")
+
+    data = message.to_dict()
+    assert data['timestamp'] == '2024-03-01T10:15:00.000001' and isinstance(message._timestamp, str)
+    assert data['metadata'] == {'twilio_sid': 'SM1'} and data['attachments'] == [] and data['read'] is True
+    assert message.timestamp == datetime(2024, 3, 1, 10, 15, 0, 1)
+    print("✅ Row values decoded on first access, timestamps serialized without parsing")
+
+    message.metadata['seen'] = True
+    assert message.to_dict()['metadata'] == {'twilio_sid': 'SM1', 'seen': True}
+    built = Message('m', 'conv_1', 1, 'sms', 'outbound', 'x', 'You', '+32', datetime(2024, 1, 1))
+    assert built.metadata == {} and built.attachments == [] and built.to_dict()['timestamp'] == '2024-01-01T00:00:00'
+    print("✅ Decoded values cached, constructor keeps accepting Python values")
+
+    conversation = Conversation('conv_1', 1, 'Praktijk 1', '["sms", "email"]',
+                                created_at='2024-03-01T10:00:00', updated_at='2024-03-01T10:15:00')
+    assert conversation.to_dict()['updated_at'] == '2024-03-01T10:15:00'
+    assert conversation.channels == ['sms', 'email'] and conversation.created_at.hour == 10
+    conversation.messages = [message, built]
+    conversation.last_message = built
+    assert json.loads(conversation.to_json()) == json.loads(json.dumps(conversation.to_dict()))
+
+
+def test_inbox_round_trip():
+    print("🧪 Testing inbox reads with row-backed messages...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        added = inbox.add_message(practice_id=1, practice_name='Praktijk 1', channel='whatsapp',
+                                  direction='inbound', content='Foto van de factuur', sender='+32', recipient='You',
+                                  metadata={'from': '+32'}, attachments=[{'url': 'https://x/1.jpg'}])
+
+        stored = inbox.get_conversation('conv_1').messages[0]
+        assert stored.to_dict() == added.to_dict()
+        assert json.loads(inbox.get_conversation('conv_1').to_json()) == \
+            json.loads(json.dumps(inbox.get_conversation('conv_1').to_dict()))
+        assert inbox.search_messages('factuur')[0].to_dict()['attachments'] == [{'url': 'https://x/1.jpg'}]
+        assert inbox.get_conversations()[0].to_dict()['channels'] == ['whatsapp']
+        print("✅ Same API output as the eagerly built messages")
+        inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_lazy_message()
+    test_inbox_round_trip()
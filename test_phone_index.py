@@ -0,0 +1,128 @@
+"""Test the phone number reverse index used to match inbound SMS/WhatsApp"""
+import sys
+import json
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import inbox_api
+from backend.services.database import DatabaseService
+from backend.services.inbox_ingest import InboxIngestQueue
+from backend.services.inbox_service import InboxService
+from backend.services.lead_scoring import LeadScoringService
+from backend.services.practice_keys import normalize_phone_number, practice_phones
+from backend.services.practice_sqlite import SQLitePracticeStore
+from backend.services.practice_store import PracticeStore
+
+
+def _practices():
+    return [
+        {'nr': 1, 'naam': 'Huisartsen Centrum', 'tel': '011/22.33.44'},
+        {'nr': 2, 'naam': 'Groepspraktijk', 'tel': '+32 11 55 66 77; 0470 12 34 56'},
+        {'nr': 3, 'naam': 'Dokter Zonder Nummer', 'tel': ''},
+        {'nr': 4, 'naam': 'Zelfde Gebouw', 'tel': '0032 11 22 33 44'},
+    ]
+
+
+def test_practice_phones():
+    print("🧪 Testing phone normalization...")
+
+    assert normalize_phone_number('0032 11 22 33 44') == '+3211223344'
+    assert normalize_phone_number('whatsapp:+32470123456') == '+32470123456'
+    assert practice_phones({'tel': '011/22.33.44'}) == ['+3211223344']
+    assert practice_phones({'tel': '+32 11 55 66 77; 0470 12 34 56, 0470123456'}) == ['+3211556677', '+32470123456']
+    assert practice_phones({'tel': ' ; '}) == [] and practice_phones({}) == []
+    print("✅ Multi-number tel fields split, 00 prefix, duplicates dropped")
+
+
+def _check_store(store):
+    assert [p['nr'] for p in store.find('phone', '+32470123456')] == [2]
+    assert [p['nr'] for p in store.find('phone', '+3211556677')] == [2]
+    assert sorted(p['nr'] for p in store.find('phone', '011 22 33 44')) == [1, 4]
+    assert store.find('phone', '+3200000000') == []
+
+    store.upsert({'nr': 2, 'naam': 'Groepspraktijk', 'tel': '0471 00 00 00'})
+    assert store.find('phone', '+32470123456') == []
+    assert [p['nr'] for p in store.find('phone', 'whatsapp:+32471000000')] == [2]
+    store.patch_many([{'nr': 3, 'set': {'tel': '0471000000'}}])
+    assert [p['nr'] for p in store.find('phone', '+32471000000')] == [2, 3]
+    store.delete(2)
+    assert [p['nr'] for p in store.find('phone', '+32471000000')] == [3]
+
+
+def test_phone_index_stores():
+    print("🧪 Testing phone lookups in the practice stores...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(_practices(), f)
+
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        _check_store(PracticeStore(data_file))
+        print("✅ JSON store: every number indexed, updated on upsert/patch/delete")
+
+        _check_store(sqlite_store)
+
+        # Databases from before practice_phones get it filled on open
+        conn = sqlite_store._connect()
+        conn.execute("DROP TABLE practice_phones")
+        conn.commit()
+        reopened = SQLitePracticeStore(sqlite_store.db_path)
+        assert [p['nr'] for p in reopened.find('phone', '+3211556677')] == []
+        assert sorted(p['nr'] for p in reopened.find('phone', '+3211223344')) == [1, 4]
+        print("✅ SQLite store: practice_phones table, backfilled for old databases")
+
+
+def test_inbox_webhook_matches_practice():
+    print("🧪 Testing inbox webhook practice matching...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(_practices(), f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        inbox = InboxService(os.path.join(tmp, 'inbox.db'))
+        shared = inbox_api.db, inbox_api.inbox_service, inbox_api.ingest_queue
+        inbox_api.db, inbox_api.inbox_service = db, inbox
+        inbox_api.ingest_queue = InboxIngestQueue(inbox, on_written=inbox_api._record_replies)
+
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(inbox_api.inbox_bp, url_prefix='/api/inbox')
+            client = app.test_client()
+
+            client.post('/api/inbox/webhook/whatsapp', data={'From': 'whatsapp:+32470123456', 'Body': 'Hallo'})
+            client.post('/api/inbox/webhook/sms', data={'From': '+32499999999', 'Body': 'Wie is dit?'})
+            inbox_api.ingest_queue.flush()
+
+            conversations = {c.practice_id: c for c in inbox.get_conversations()}
+            assert conversations[2].practice_name == 'Groepspraktijk'
+            assert conversations[inbox_api.UNKNOWN_PRACTICE_ID].practice_name == inbox_api.UNKNOWN_PRACTICE_NAME
+            assert 1 not in conversations
+            print("✅ Sender matched to its practice, unknown numbers kept apart")
+
+            practice = db.get_practice(2)
+            assert practice['workflow']['whatsapp_replied'] is True
+            assert practice['score']['engagement_score'] == LeadScoringService.WEIGHTS['email_replied']
+            print("✅ Reply recorded on the practice and its lead score updated")
+        finally:
+            inbox_api.ingest_queue.close()
+            inbox_api.db, inbox_api.inbox_service, inbox_api.ingest_queue = shared
+            inbox.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_practice_phones()
+    test_phone_index_stores()
+    test_inbox_webhook_matches_practice()
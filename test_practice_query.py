@@ -0,0 +1,126 @@
+"""Test server-side filtering, sorting and pagination of practices"""
+import sys
+import json
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import practices as practices_api
+from backend.services.database import DatabaseService
+from backend.services.practice_query import query_practices
+from backend.services.practice_store import PracticeStore
+
+
+def _practices():
+    return [{
+        'nr': nr,
+        'naam': f'Praktijk {chr(ord("A") + nr % 26)}{nr}',
+        'gem': 'Hasselt' if nr % 2 else 'Genk',
+        'tel': f'011{nr:06d}',
+        'status': 'Lead' if nr % 3 == 0 else 'Nog niet benaderd',
+        'score': {'total_score': nr * 3 % 100},
+        **({'pipeline': {'current_stage': 'contacted'}} if nr % 5 == 0 else {})
+    } for nr in range(1, 41)]
+
+
+def test_query_practices():
+    print("🧪 Testing practice queries...")
+
+    practices = _practices()
+
+    result = query_practices(practices, gemeente=['hasselt'], status=['Lead'])
+    assert {p['nr'] for p in result['practices']} == {nr for nr in range(1, 41) if nr % 2 and nr % 3 == 0}
+    assert result['total'] == len(result['practices']) and result['next_cursor'] is None
+    print("✅ Filters combine, gemeente matches 'gem' case-insensitively")
+
+    result = query_practices(practices, stage=['contacted'], min_score=20, max_score=80)
+    assert all(p['nr'] % 5 == 0 and 20 <= p['score']['total_score'] <= 80 for p in result['practices'])
+    assert query_practices(practices, q='praktijk b27')['total'] == 1
+    print("✅ Stage, score range and free text")
+
+    # Walk every page with the cursor, descending on a key with ties
+    seen, cursor = [], None
+    while True:
+        page = query_practices(practices, sort='-score', limit=7, cursor=cursor, fields=['score'])
+        seen.extend(page['practices'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 40 and len({p['nr'] for p in seen}) == 40
+    scores = [p['score']['total_score'] for p in seen]
+    assert scores == sorted(scores, reverse=True)
+    assert set(seen[0]) == {'nr', 'score'}
+    print("✅ Cursor pages cover every practice once, with projection")
+
+    for bad in ({'sort': 'telefoon'}, {'limit': 0}, {'cursor': 'nonsense'}):
+        try:
+            query_practices(practices, **bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✅ Bad sort, limit and cursor rejected")
+
+
+def test_practices_endpoint():
+    print("🧪 Testing GET /api/practices...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(_practices(), f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        shared_db, practices_api.db = practices_api.db, db
+
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(practices_api.practices_bp, url_prefix='/api')
+            client = app.test_client()
+
+            # No paging params: plain list, normalized at load time
+            data = client.get('/api/practices').get_json()
+            assert isinstance(data, list) and len(data) == 40
+            assert data[0]['gemeente'] == data[0]['gem']
+            print("✅ Plain list kept for old clients, gem -> gemeente on load")
+
+            data = client.get('/api/practices?gemeente=Genk&sort=naam&limit=5&fields=naam').get_json()
+            assert data['total'] == 20 and len(data['practices']) == 5 and data['next_cursor']
+            assert set(data['practices'][0]) == {'nr', 'naam'}
+            more = client.get(f"/api/practices?gemeente=Genk&sort=naam&limit=5&cursor={data['next_cursor']}").get_json()
+            assert not {p['nr'] for p in data['practices']} & {p['nr'] for p in more['practices']}
+            print("✅ Filtered page with cursor and fields")
+
+            assert client.get('/api/practices?sort=foo').status_code == 400
+            print("✅ Invalid query returns 400")
+
+            # Normalization happens on write
+            client.post('/api/practices', json={'nr': 100, 'praktijk': 'Tandarts Z', 'naam': 'Team', 'notitie': 'Markt 1'})
+            with open(data_file) as f:
+                stored = next(p for p in json.load(f) if p['nr'] == 100)
+            assert stored['naam'] == 'Tandarts Z' and stored['adres'] == 'Markt 1'
+            print("✅ praktijk/notitie normalized when written")
+
+            response = client.patch('/api/practices/batch', json=[
+                {'nr': 1, 'set': {'workflow.replied': True}, 'append': {'communication_history': {'type': 'sms'}}},
+                {'nr': 404, 'set': {'status': 'Lead'}}
+            ])
+            data = response.get_json()
+            assert data['updated'] == 1 and data['failed'] == 1
+            assert data['results'][1] == {'nr': 404, 'success': False, 'error': 'not found'}
+            assert db.get_practice(1)['workflow'] == {'replied': True}
+            assert client.patch('/api/practices/batch', json=[{'set': {}}]).status_code == 400
+            print("✅ PATCH /practices/batch with per-item results")
+        finally:
+            practices_api.db = shared_db
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_query_practices()
+    test_practices_endpoint()
@@ -0,0 +1,304 @@
+"""Test script for the in-memory practice store"""
+import sys
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services.practice_store import PracticeStore, get_practice_store
+from backend.services.practice_sqlite import SQLitePracticeStore
+
+
+def _write_practices(path, practices):
+    with open(path, 'w') as f:
+        json.dump(practices, f)
+
+
+def test_practice_store():
+    print("🧪 Testing Practice Store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [
+            {'nr': 1, 'naam': 'Praktijk A', 'workflow': {'emails_sent': 0}},
+            {'nr': 2, 'naam': 'Praktijk B'}
+        ])
+
+        store = PracticeStore(data_file)
+        assert store.count() == 2
+        assert store.get(2)['naam'] == 'Praktijk B'
+        assert store.get(99) is None
+        print("✅ Loaded and indexed by nr")
+
+        # get() hands out private copies
+        practice = store.get(1)
+        practice['workflow']['emails_sent'] = 5
+        assert store.get(1)['workflow']['emails_sent'] == 0
+        print("✅ get() returns a copy")
+
+        # Writes go through the index and keep file order
+        store.upsert({'nr': 1, 'naam': 'Praktijk A2'})
+        store.upsert({'nr': 3, 'naam': 'Praktijk C'})
+        with open(data_file) as f:
+            on_disk = json.load(f)
+        assert [p['nr'] for p in on_disk] == [1, 2, 3]
+        assert on_disk[0]['naam'] == 'Praktijk A2'
+        print("✅ Upsert persisted")
+
+        counts = store.upsert_many([
+            {'nr': 2, 'naam': 'Praktijk B2'},
+            {'nr': 4, 'naam': 'Praktijk D'},
+            {'nr': 4, 'naam': 'Praktijk D2'}
+        ])
+        assert counts == {'inserted': 1, 'updated': 2}
+        assert store.count() == 4 and store.get(4)['naam'] == 'Praktijk D2'
+        print("✅ Bulk upsert reports inserted/updated")
+
+        assert store.delete(2)
+        assert not store.delete(2)
+        assert store.get(3)['naam'] == 'Praktijk C'
+        print("✅ Delete reindexes")
+
+        # External edits are picked up via mtime/size
+        version = store.version
+        time.sleep(0.01)
+        _write_practices(data_file, [{'nr': 7, 'naam': 'Extern'}])
+        assert store.get(7)['naam'] == 'Extern'
+        assert store.version > version
+        print("✅ Reloaded after external change")
+
+        assert get_practice_store(data_file) is get_practice_store(data_file)
+        print("✅ Store is shared per data file")
+
+    print("\n✨ All tests passed!")
+
+
+def test_practice_journal():
+    print("🧪 Testing Practice Journal...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [{'nr': 1, 'naam': 'Praktijk A'}])
+
+        store = PracticeStore(data_file, journal=True, compact_threshold=1000, compact_interval=3600)
+        store.upsert({'nr': 1, 'naam': 'Praktijk A2'})
+        store.upsert({'nr': 2, 'naam': 'Praktijk B'})
+        store.delete(1)
+
+        # Snapshot untouched, changes live in the log
+        with open(data_file) as f:
+            assert json.load(f) == [{'nr': 1, 'naam': 'Praktijk A'}]
+        with open(store.log_file) as f:
+            assert len(f.readlines()) == 3
+        print("✅ Writes appended to journal")
+
+        # A fresh process replays snapshot + log; a torn tail is ignored
+        with open(store.log_file, 'a') as f:
+            f.write('{"op": "upsert", "practice": {"nr": 9')
+        replayed = PracticeStore(data_file, journal=True, compact_threshold=1000, compact_interval=3600)
+        assert replayed.get(1) is None
+        assert replayed.get(2)['naam'] == 'Praktijk B'
+        assert replayed.get(9) is None
+        print("✅ Log replayed on startup")
+
+        # Appends from another store are seen without a snapshot change
+        replayed.upsert({'nr': 3, 'naam': 'Praktijk C'})
+        assert store.get(3)['naam'] == 'Praktijk C'
+        print("✅ Log tail replayed across instances")
+
+        assert replayed.compact()
+        assert os.path.getsize(store.log_file) == 0
+        with open(data_file) as f:
+            assert [p['nr'] for p in json.load(f)] == [2, 3]
+        assert store.get(2)['naam'] == 'Praktijk B'
+        assert not os.path.exists(data_file + '.tmp')
+        print("✅ Compacted into snapshot")
+
+        store.close()
+        replayed.close()
+
+    print("\n✨ All tests passed!")
+
+
+def test_sqlite_practice_store():
+    print("🧪 Testing SQLite Practice Store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [
+            {'nr': 1, 'naam': 'Praktijk A', 'gem': 'Hasselt', 'tel': '011 25 11 10',
+             'email': 'Info@PraktijkA.be', 'status': 'Lead'},
+            {'nr': 2, 'naam': 'Praktijk B', 'gemeente': 'Genk', 'tel': '+3289123456',
+             'pipeline': {'current_stage': 'contacted'}}
+        ])
+
+        store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        assert store.import_json(data_file) == 2
+        assert store.get(1)['naam'] == 'Praktijk A'
+        print("✅ Imported practices.json")
+
+        assert [p['nr'] for p in store.find('phone', '+3211251110')] == [1]
+        assert [p['nr'] for p in store.find('email', 'info@praktijka.be')] == [1]
+        assert [p['nr'] for p in store.find('gemeente', 'HASSELT')] == [1]
+        assert [p['nr'] for p in store.find('stage', 'contacted')] == [2]
+        assert [p['nr'] for p in store.find('stage', 'new_lead')] == [1]
+        print("✅ Indexed lookups")
+
+        # Index columns follow record updates
+        version = store.version
+        practice = store.get(1)
+        practice['pipeline'] = {'current_stage': 'won'}
+        store.upsert(practice)
+        assert store.find('stage', 'new_lead') == []
+        assert store.version > version
+        print("✅ Upsert updates index columns")
+
+        assert store.upsert_many([{'nr': 2, 'naam': 'B2'}, {'nr': 5}]) == {'inserted': 1, 'updated': 1}
+        assert store.delete(5)
+
+        new = {'naam': 'Zonder nr'}
+        store.upsert(new)
+        assert new['nr'] == 3 and store.get(3)['nr'] == 3
+        assert store.delete(3) and not store.delete(3)
+        print("✅ Insert without nr and delete")
+
+        # Same lookups work on the JSON store
+        json_store = PracticeStore(data_file)
+        assert [p['nr'] for p in json_store.find('phone', '011251110')] == [1]
+        print("✅ JSON store find()")
+
+    print("\n✨ All tests passed!")
+
+
+def test_practice_nr_allocation():
+    print("🧪 Testing practice nr allocation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [{'nr': 1}, {'nr': 40}])
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.upsert_many([{'nr': 1}, {'nr': 40}])
+
+        # Two stores on one file stand in for two workers
+        for stores in ([PracticeStore(data_file), PracticeStore(data_file)], [sqlite_store]):
+            assert stores[0].reserve_nrs(1) == range(41, 42)
+
+            got = []
+            lock = threading.Lock()
+
+            def worker(store):
+                for _ in range(25):
+                    nrs = store.reserve_nrs(2)
+                    with lock:
+                        got.extend(nrs)
+
+            threads = [threading.Thread(target=worker, args=(stores[i % len(stores)],)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert sorted(got) == list(range(42, 442))
+
+            # Explicit nrs written above the sequence and a floor are respected
+            stores[0].upsert({'nr': 1000})
+            assert stores[-1].reserve_nrs(3) == range(1001, 1004)
+            assert stores[0].reserve_nrs(1, floor=5000) == range(5001, 5002)
+        print("✅ Unique, contiguous reservations across threads and instances (JSON and SQLite)")
+
+        # Deleting the highest practice doesn't hand its nr out again
+        store = PracticeStore(data_file)
+        store.delete(1000)
+        assert store.reserve_nrs(1)[0] == 5002
+        print("✅ Sequence is persisted")
+
+    print("\n✨ All tests passed!")
+
+
+def test_practice_patch():
+    print("🧪 Testing batch patches...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [{'nr': 1, 'workflow': {'status': 'Nieuw'}}, {'nr': 2, 'workflow': 'oud'}])
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        for store in (PracticeStore(data_file), sqlite_store):
+            version = store.version
+            results = store.patch_many([
+                {'nr': 1, 'set': {'workflow.replied': True, 'status': 'Lead'},
+                 'append': {'communication_history': {'type': 'sms'}}},
+                {'nr': 1, 'append': {'communication_history': {'type': 'whatsapp'}}},
+                {'nr': 2, 'set': {'workflow.replied': True}},
+                {'nr': 99, 'set': {'status': 'Lead'}},
+            ])
+            assert [r['success'] for r in results] == [True, True, False, False]
+            assert results[3]['error'] == 'not found'
+
+            practice = store.get(1)
+            assert practice['workflow'] == {'status': 'Nieuw', 'replied': True}
+            assert [m['type'] for m in practice['communication_history']] == ['sms', 'whatsapp']
+            assert store.find('status', 'Lead')[0]['nr'] == 1
+            assert store.get(2)['workflow'] == 'oud'
+            assert store.version > version
+        print("✅ set/append by path in one write, failures reported per item")
+
+        with open(data_file) as f:
+            assert json.load(f)[0]['communication_history'][1]['type'] == 'whatsapp'
+        print("✅ Persisted")
+
+    print("\n✨ All tests passed!")
+
+
+def test_practice_copies():
+    print("🧪 Testing that reads and writes don't share nested records...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        _write_practices(data_file, [{'nr': 1, 'tel': '0470 11 22 33', 'score': {'total_score': 80},
+                                      'pipeline': {'current_stage': 'won'}, 'communication_history': []}])
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        for name, store in (('JSON', PracticeStore(data_file)), ('SQLite', sqlite_store)):
+            # What the sms/whatsapp webhooks do before upsert_practice
+            for read in (store.find('phone', '0470112233')[0],
+                         store.scored(0, 100)[0], store.stage_page('won')[0]):
+                read['communication_history'].append({'type': 'sms'})
+                read['pipeline']['current_stage'] = 'lost'
+            assert store.get(1)['communication_history'] == []
+            assert store.stage_totals()['won']['count'] == 1
+
+            # get_all: fields set on a record (scoring, stalled deals) stay private
+            read = store.get_all()[0]
+            read['score'] = {'total_score': 0}
+            read['pipeline'] = {**read['pipeline'], 'current_stage': 'lost'}
+            read['days_in_stage'] = 9
+            assert store.get(1)['score'] == {'total_score': 80}
+            assert store.get(1)['pipeline']['current_stage'] == 'won'
+            assert 'days_in_stage' not in store.get(1)
+            assert store.get_all()[0] == store.get(1)
+
+            practice = store.get(1)
+            store.upsert(practice)
+            practice['communication_history'].append({'type': 'sms'})
+            batch = [store.get(1)]
+            store.upsert_many(batch)
+            batch[0]['pipeline']['current_stage'] = 'lost'
+            assert store.get(1)['communication_history'] == []
+            assert store.get(1)['pipeline']['current_stage'] == 'won'
+            print(f"✅ {name} store: changes to read or written records stay out of the store")
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_practice_store()
+    test_practice_journal()
+    test_sqlite_practice_store()
+    test_practice_nr_allocation()
+    test_practice_patch()
+    test_practice_copies()
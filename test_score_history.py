@@ -0,0 +1,115 @@
+"""Test the lead score history: compact storage, sparklines, velocity and movers"""
+import sys
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import pipeline_api
+from backend.services.database import DatabaseService
+from backend.services.lead_scoring import LeadScoringService
+from backend.services.practice_store import PracticeStore
+from backend.services.score_history import ScoreHistory
+
+TODAY = date(2024, 6, 15)
+
+
+def _day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def test_score_history():
+    print("🧪 Testing score history storage...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ScoreHistory(os.path.join(tmp, 'history.db'))
+        history.record([(1, _day(-10), 40), (1, _day(-6), 55), (1, _day(-6), 60),
+                        (1, _day(-3), 60), (1, _day(0), 80)])
+        assert [p['score'] for p in history.series(1)] == [40, 60, 80], "same day replaced, unchanged skipped"
+        assert history.series(1)[0]['date'] == '2024-06-05'
+
+        days, scores = history._conn.execute("SELECT days, scores FROM score_history WHERE nr = 1").fetchone()
+        assert len(days) == 6 and len(scores) == 3, "3 bytes per point"
+
+        # Out of order points land in place, reruns change nothing
+        history.record([(1, _day(-8), 50)])
+        assert [p['score'] for p in history.series(1)] == [40, 50, 60, 80]
+        assert history.record([(1, _day(-8), 50), (1, _day(0), 80)]) == 0
+        print("✅ One point per day, only on change, 3 bytes each")
+
+        assert history.sparkline(1, 12, today=TODAY) == [None, 40, 40, 50, 50, 60, 60, 60, 60, 60, 60, 80]
+        assert history.sparkline(2, 3, today=TODAY) == [None, None, None]
+        assert history.velocity(1, 7, today=TODAY) == round((80 - 50) / 7, 2)
+        assert history.velocity(2, 7, today=TODAY) is None
+        print("✅ Sparkline forward-fills, velocity per day over the window")
+
+        history.record([(2, _day(-9), 90), (2, _day(-1), 30),
+                        (3, _day(-20), 20), (3, _day(-2), 45),
+                        (4, _day(-2), 99),                      # new lead, no score a week ago
+                        (5, _day(-30), 70)])                    # unchanged
+        assert [(m['nr'], m['change']) for m in history.movers(7, today=TODAY)] == [(2, -60), (1, 30), (3, 25)]
+        assert [m['nr'] for m in history.movers(7, direction='up', today=TODAY)] == [1, 3]
+        assert [m['nr'] for m in history.movers(7, limit=1, direction='down', today=TODAY)] == [2]
+        assert history.movers(7, today=TODAY)[0] == {'nr': 2, 'score': 30, 'previous': 90, 'change': -60}
+        print("✅ Biggest movers up and down")
+
+        history.delete(2)
+        assert history.series(2) == []
+        history.close()
+
+
+def test_score_history_endpoints():
+    print("🧪 Testing score history through the database writes and API...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump([{'nr': nr, 'naam': f'Praktijk {nr}', 'email': f'info{nr}@praktijk.be',
+                        'workflow': {'emails_sent': 1}} for nr in (1, 2)], f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        db.score_history = ScoreHistory(os.path.join(tmp, 'history.db'))
+        shared, pipeline_api.db = pipeline_api.db, db
+        try:
+            week_ago = datetime.now() - timedelta(days=8)
+            for nr in (1, 2):
+                practice = db.get_practice(nr)
+                db.patch_practices([{'nr': nr, 'set': {'score': LeadScoringService.rescore(practice, now=week_ago)}}])
+            practice = db.get_practice(1)
+            db.patch_practices([{'nr': 1, 'set': LeadScoringService.record_event(practice, 'meeting_booked')}])
+
+            app = Flask(__name__)
+            app.register_blueprint(pipeline_api.pipeline_bp, url_prefix='/api')
+            client = app.test_client()
+
+            response = client.get('/api/leads/1/score-history?days=10').get_json()
+            assert len(response['points']) == 2
+            assert response['sparkline'][-1] == db.get_practice(1)['score']['total_score']
+            assert response['sparkline'][0] is None and response['velocity'] > 0
+
+            movers = client.get('/api/leads/movers?direction=up').get_json()
+            assert [m['nr'] for m in movers['movers']] == [1] and movers['movers'][0]['naam'] == 'Praktijk 1'
+            assert client.get('/api/leads/movers?direction=sideways').status_code == 400
+            print("✅ Score writes are recorded, history and movers served by the API")
+
+            assert set(db.get_practice(1)) == {'nr', 'naam', 'email', 'workflow', 'score'}
+            print("✅ Practice records carry no history")
+
+            db.delete_practice(2)
+            assert db.score_history.series(2) == []
+        finally:
+            pipeline_api.db = shared
+            db.score_history.close()
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_score_history()
+    test_score_history_endpoints()
@@ -0,0 +1,175 @@
+"""Test the score-ordered index behind hot leads and score range queries"""
+import sys
+import copy
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.services.automation_engine import AutomationEngine
+from backend.services.database import DatabaseService
+from backend.services.lead_scoring import LeadScoringService
+from backend.services.practice_sqlite import SQLitePracticeStore
+from backend.services.practice_store import PracticeStore
+from backend.services.score_index import ScoreIndex
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+GEMEENTES = ('Hasselt', 'Genk', 'Gent', None)
+
+
+def _practices(count=300, seed=7):
+    rng = random.Random(seed)
+    practices = []
+    for nr in range(1, count + 1):
+        practice = {'nr': nr, 'naam': f'Praktijk {nr}', 'gemeente': rng.choice(GEMEENTES)}
+        if nr % 10:
+            practice['score'] = {'total_score': rng.randint(0, 100)}
+        practices.append(practice)
+    return practices
+
+
+def _expected(practices, low, high, gemeente=None, limit=None):
+    """Brute force: filter, sort by score desc then nr"""
+    matches = [p for p in practices if 'score' in p and low <= p['score']['total_score'] <= high
+               and (gemeente is None or (p.get('gemeente') or '').lower() == gemeente.lower())]
+    matches.sort(key=lambda p: (-p['score']['total_score'], p['nr']))
+    return [p['nr'] for p in matches][:limit]
+
+
+def test_score_index():
+    print("🧪 Testing ScoreIndex ranges and top-k...")
+
+    practices = _practices()
+    index = ScoreIndex()
+    index.rebuild(practices)
+    assert len(index) == 270, "unscored practices aren't indexed"
+
+    for low, high, gemeente, limit in [(75, 100, None, 10), (0, 100, None, None), (50, 74, 'gent', 5),
+                                       (74.5, 80.2, None, None), (40, 30, None, None), (0, 24, 'GENK', 3)]:
+        assert index.between(low, high, gemeente=gemeente, limit=limit) == _expected(practices, low, high, gemeente, limit)
+    assert index.top_k('hot', 7) == _expected(practices, 75, 100, limit=7)
+    assert index.top_k('warm', 4, gemeente='Hasselt') == _expected(practices, 50, 74, 'Hasselt', 4)
+    print("✅ Ranges, ties by nr and per-gemeente lists match a full sort")
+
+    practices[4]['score'] = {'total_score': 100}
+    practices[5]['gemeente'] = 'Gent'
+    del practices[6]['score']
+    for nr in (5, 6, 7):
+        index.add(practices[nr - 1])
+    index.discard(8)
+    practices = [p for p in practices if p['nr'] != 8]
+    assert index.score(5) == 100 and index.score(7) is None and index.score(8) is None
+    assert index.between(0, 100) == _expected(practices, 0, 100)
+    assert index.between(0, 100, gemeente='gent') == _expected(practices, 0, 100, 'gent')
+    print("✅ add/discard keep the index in order")
+
+
+def test_score_index_stores():
+    print("🧪 Testing scored() in the practice stores...")
+
+    practices = _practices()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        for name, store in (('JSON', PracticeStore(data_file)), ('SQLite', sqlite_store)):
+            assert [p['nr'] for p in store.scored(75, 100, limit=10)] == _expected(practices, 75, 100, limit=10)
+            assert [p['nr'] for p in store.scored(20, 60, gemeente='Genk')] == _expected(practices, 20, 60, 'Genk')
+
+            store.patch_many([{'nr': 10, 'set': {'score': {'total_score': 99}}}])
+            store.upsert({'nr': 1, 'naam': 'Praktijk 1'})
+            store.delete(2)
+            current = store.get_all()
+            assert [p['nr'] for p in store.scored(0, 100)] == _expected(current, 0, 100)
+            print(f"✅ {name} store: index follows upsert/patch/delete")
+
+        # Databases from before the score column get it filled on open
+        conn = sqlite_store._connect()
+        conn.execute("DROP INDEX idx_practices_score")
+        conn.execute("DROP INDEX idx_practices_gemeente_score")
+        conn.execute("ALTER TABLE practices DROP COLUMN score")
+        conn.commit()
+        reopened = SQLitePracticeStore(sqlite_store.db_path)
+        assert [p['nr'] for p in reopened.scored(0, 100)] == _expected(reopened.get_all(), 0, 100)
+        print("✅ SQLite store: score column backfilled for old databases")
+
+
+def _scored_practices():
+    """Practices with a stored score, part of them past their recency bucket at NOW"""
+    rng = random.Random(3)
+    practices = []
+    for nr in range(1, 201):
+        workflow = {'email_opened': rng.random() < 0.7, 'email_clicked': rng.random() < 0.5,
+                    'replied': rng.random() < 0.3, 'meeting_booked': rng.random() < 0.2, 'emails_sent': 2}
+        hours = rng.choice((None, 2, 20, 30, 100, 200, 800))
+        if hours is not None:
+            workflow['last_email_date'] = (NOW - timedelta(hours=hours)).isoformat()
+        practices.append({'nr': nr, 'naam': f'Praktijk {nr}', 'email': f'info{nr}@praktijk.be', 'tel': '011 22 33 44',
+                          'gemeente': rng.choice(GEMEENTES), 'artsen': ['Dr. X'] * rng.randint(1, 6),
+                          'workflow': workflow})
+    LeadScoringService.refresh_scores(practices, now=NOW - timedelta(days=2))
+    return practices
+
+
+def test_top_leads_match_full_sort():
+    print("🧪 Testing hot leads from the score index...")
+
+    practices = _scored_practices()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+
+        expected = LeadScoringService.get_hot_leads(copy.deepcopy(practices), 200, now=NOW)
+        for limit in (1, 5, 20):
+            fetched = []
+
+            def fetch(n):
+                fetched.append(n)
+                return db.top_k('hot', n)
+
+            leads = LeadScoringService.top_leads(fetch, 'hot', limit, now=NOW)
+            assert [(p['nr'], p['score']['total_score']) for p in leads] == \
+                [(p['nr'], p['score']['total_score']) for p in sorted(
+                    expected, key=lambda p: (-p['score']['total_score'], p['nr']))][:limit]
+        assert len(fetched) > 1, "stale scores make the walk fetch more"
+        print("✅ Same hot leads as a full recompute, stale scores refreshed on the way")
+
+        def save(due):
+            db.patch_practices([{'nr': p['nr'], 'set': {'score': p['score']}} for p in due])
+
+        LeadScoringService.top_leads(lambda n: db.top_k('hot', n), 'hot', 10, now=NOW, save=save)
+        fetched = []
+        hot = LeadScoringService.top_leads(lambda n: fetched.append(n) or db.top_k('hot', n, gemeente='Gent'),
+                                           'hot', 3, now=NOW)
+        assert fetched == [3]
+        assert [p['nr'] for p in hot] == [p['nr'] for p in sorted(
+            (p for p in expected if p.get('gemeente') == 'Gent'), key=lambda p: (-p['score']['total_score'], p['nr']))][:3]
+        print("✅ Written back scores need a single fetch, per-gemeente top list")
+
+        # hot_lead_no_contact only looks at the hot range of the index
+        everything = db.get_practices()
+        from_index = AutomationEngine.get_pending_actions(everything, hot_leads=db.scored_practices(75, 100))
+        full_scan = AutomationEngine.get_pending_actions(everything)
+        key = lambda a: (a['practice_id'], a['rule'])
+        assert sorted(map(key, from_index)) == sorted(map(key, full_scan))
+        assert len({key(a) for a in full_scan}) == len(full_scan), "every rule once per practice"
+        assert any(a['rule'] == 'hot_lead_no_contact' for a in from_index)
+        print("✅ Automation finds the same hot leads from the index")
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_score_index()
+    test_score_index_stores()
+    test_top_leads_match_full_sort()
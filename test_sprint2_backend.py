@@ -130,7 +130,7 @@ def test_phone_normalization():
     print("=" * 60)
     
     try:
-        from backend.api.sms_api import normalize_phone_number
+        from backend.services.practice_keys import normalize_phone_number
         
         test_cases = [
             ("0471234567", "+32471234567"),
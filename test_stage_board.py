@@ -0,0 +1,132 @@
+"""Test the per-stage paginated Kanban board with compact deal cards"""
+import sys
+import json
+import os
+import random
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import pipeline_api
+from backend.services.database import DatabaseService
+from backend.services.pipeline import PipelineService
+from backend.services.practice_sqlite import SQLitePracticeStore
+from backend.services.practice_store import PracticeStore
+from backend.services.stage_counters import StageCounters
+
+STAGES = [stage['id'] for stage in PipelineService.DEFAULT_STAGES]
+
+
+def _practices(count=120, seed=3):
+    rng = random.Random(seed)
+    practices = []
+    for nr in rng.sample(range(1, 1000), count):
+        practice = PipelineService.move_deal({'nr': nr, 'naam': f'Praktijk {nr}', 'gemeente': 'Gent',
+                                              'communication_history': [{'type': 'email'}] * 5},
+                                             rng.choice(STAGES))
+        practice['pipeline']['deal_value'] = rng.choice((0, 1500, 2400))
+        practices.append(practice)
+    return practices
+
+
+def _in_stage(practices, stage):
+    return sorted(p['nr'] for p in practices
+                  if p.get('pipeline', {}).get('current_stage', 'new_lead') == stage)
+
+
+def _walk(page, stage, limit=7):
+    """All nrs of a stage by following keyset pages"""
+    nrs, after = [], None
+    while True:
+        batch = page(stage, after, limit)
+        nrs.extend(batch)
+        if len(batch) < limit:
+            return nrs
+        after = batch[-1]
+
+
+def test_stage_pages():
+    print("🧪 Testing keyset pages per stage...")
+
+    practices = _practices()
+    counters = StageCounters()
+    counters.rebuild(practices)
+    for stage in STAGES:
+        assert _walk(counters.page, stage) == _in_stage(practices, stage)
+    moved = practices[0]
+    counters.add(PipelineService.move_deal(moved, 'won'))
+    assert moved['nr'] in counters.page('won', limit=1000)
+    counters.discard(moved['nr'])
+    assert moved['nr'] not in counters.page('won', limit=1000)
+    assert counters.page('unknown') == [] and counters.page('won', limit=0) == []
+    print("✅ StageCounters pages follow moves and deletes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        for name, store in (('JSON', PracticeStore(data_file)), ('SQLite', sqlite_store)):
+            for stage in STAGES:
+                walked = _walk(lambda s, after, limit: [p['nr'] for p in store.stage_page(s, after, limit)], stage)
+                assert walked == _in_stage(practices, stage)
+            store.upsert(PipelineService.move_deal(store.get(moved['nr']), 'lost'))
+            assert moved['nr'] in [p['nr'] for p in store.stage_page('lost', limit=1000)]
+            print(f"✅ {name} store pages every stage in nr order")
+
+
+def test_board_endpoints():
+    print("🧪 Testing /pipeline/board...")
+
+    practices = _practices()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        shared, pipeline_api.db = pipeline_api.db, db
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(pipeline_api.pipeline_bp, url_prefix='/api')
+            client = app.test_client()
+
+            board = client.get('/api/pipeline/board?limit=5').get_json()
+            assert set(board['stages']) == set(STAGES)
+            for stage in STAGES:
+                column = board['stages'][stage]
+                assert column['count'] == len(_in_stage(practices, stage))
+                assert len(column['cards']) == min(5, column['count'])
+
+            card = next(c for column in board['stages'].values() for c in column['cards'])
+            assert 'communication_history' not in card and 'pipeline' not in card
+            assert {'nr', 'naam', 'deal_value', 'probability', 'stage_entered_at'} <= set(card)
+            print("✅ First page per column with totals and compact cards")
+
+            stage = max(STAGES, key=lambda s: board['stages'][s]['count'])
+            column = board['stages'][stage]
+            nrs = [c['nr'] for c in column['cards']]
+            while column['next_cursor']:
+                column = client.get(f"/api/pipeline/board/{stage}?limit=5&cursor={column['next_cursor']}").get_json()
+                nrs.extend(c['nr'] for c in column['cards'])
+            assert nrs == _in_stage(practices, stage)
+            print("✅ Cursor walks a column to the end")
+
+            assert client.get('/api/pipeline/board/nope').status_code == 404
+            assert client.get(f'/api/pipeline/board/{stage}?cursor=garbage').status_code == 400
+            print("✅ Unknown stage and bad cursor rejected")
+        finally:
+            pipeline_api.db = shared
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_stage_pages()
+    test_board_endpoints()
@@ -0,0 +1,139 @@
+"""Test the materialized pipeline stage counters behind summary and forecast"""
+import sys
+import json
+import os
+import random
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from backend.api import pipeline_api
+from backend.services.database import DatabaseService
+from backend.services.pipeline import PipelineService
+from backend.services.practice_sqlite import SQLitePracticeStore
+from backend.services.practice_store import PracticeStore
+from backend.services.stage_counters import StageCounters, diff_totals
+
+STAGES = [stage['id'] for stage in PipelineService.DEFAULT_STAGES]
+
+
+def _practices(count=200, seed=11):
+    rng = random.Random(seed)
+    practices = []
+    for nr in range(1, count + 1):
+        practice = {'nr': nr, 'naam': f'Praktijk {nr}'}
+        if rng.random() < 0.8:
+            practice = PipelineService.move_deal(practice, rng.choice(STAGES))
+            practice['pipeline']['deal_value'] = rng.choice((0, 1500, 2400.5, '3000', None))
+        practices.append(practice)
+    return practices
+
+
+def _recount(practices):
+    counters = StageCounters()
+    counters.rebuild(practices)
+    return counters.totals()
+
+
+def _edit(store, rng):
+    """Moves, value edits, inserts and deletes through the store's write paths"""
+    for _ in range(150):
+        nr = rng.randint(1, 220)
+        practice = store.get(nr)
+        roll = rng.random()
+        if practice is None:
+            store.upsert(PipelineService.move_deal({'nr': nr, 'naam': f'Nieuw {nr}'}, rng.choice(STAGES)))
+        elif roll < 0.4:
+            store.upsert(PipelineService.move_deal(practice, rng.choice(STAGES)))
+        elif roll < 0.7:
+            store.patch_many([{'nr': nr, 'set': {'pipeline.deal_value': rng.randint(0, 5000)}}])
+        elif roll < 0.85:
+            store.upsert_many([dict(practice, naam='Hernoemd')])
+        else:
+            store.delete(nr)
+
+
+def test_stage_counters_stores():
+    print("🧪 Testing stage counters in the practice stores...")
+
+    practices = _practices()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+        sqlite_store = SQLitePracticeStore(os.path.join(tmp, 'practices.db'))
+        sqlite_store.import_json(data_file)
+
+        for name, store in (('JSON', PracticeStore(data_file)), ('SQLite', sqlite_store)):
+            assert diff_totals(store.stage_totals(), _recount(practices)) == {}
+            _edit(store, random.Random(5))
+            assert diff_totals(store.stage_totals(), _recount(store.get_all())) == {}
+            assert PipelineService.summary_from_totals(store.stage_totals()) == \
+                PipelineService.get_pipeline_summary(store.get_all())
+            print(f"✅ {name} store: counters follow moves, edits, inserts and deletes")
+
+        # Drift is found by the check and fixed by a rebuild
+        conn = sqlite_store._connect()
+        conn.execute("UPDATE stage_counters SET count = count + 3 WHERE stage = 'won'")
+        conn.commit()
+        assert set(diff_totals(sqlite_store.stage_totals(), _recount(sqlite_store.get_all()))) == {'won'}
+        assert diff_totals(sqlite_store.rebuild_stage_totals(), _recount(sqlite_store.get_all())) == {}
+
+        # Databases from before the counters get them on open
+        for trigger in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER practices_stage_{trigger}")
+        conn.execute("DROP TABLE stage_counters")
+        conn.execute("ALTER TABLE practices DROP COLUMN deal_value")
+        conn.execute("ALTER TABLE practices DROP COLUMN weighted_value")
+        conn.commit()
+        reopened = SQLitePracticeStore(sqlite_store.db_path)
+        assert diff_totals(reopened.stage_totals(), _recount(reopened.get_all())) == {}
+        print("✅ SQLite counters rebuilt on demand and for old databases")
+
+
+def test_summary_and_forecast_endpoints():
+    print("🧪 Testing /pipeline/summary and /pipeline/forecast...")
+
+    practices = _practices()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'practices.json')
+        with open(data_file, 'w') as f:
+            json.dump(practices, f)
+
+        db = DatabaseService()
+        db.supabase_client = None
+        db.store = PracticeStore(data_file)
+        shared, pipeline_api.db = pipeline_api.db, db
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(pipeline_api.pipeline_bp, url_prefix='/api')
+            client = app.test_client()
+
+            summary = client.get('/api/pipeline/summary').get_json()
+            assert summary['total_deals'] == len(practices)
+            assert 'deals' not in summary['stages']['won']
+            won = [p for p in practices if p.get('pipeline', {}).get('current_stage') == 'won']
+            assert summary['won_count'] == summary['stages']['won']['count'] == len(won)
+
+            response = client.post('/api/pipeline/move', json={'practice_id': won[0]['nr'], 'to_stage': 'lost'})
+            assert response.status_code == 200
+            summary = client.get('/api/pipeline/summary').get_json()
+            assert summary['won_count'] == len(won) - 1
+
+            forecast = client.get('/api/pipeline/forecast').get_json()
+            open_deals = [p for p in db.get_practices()
+                          if p.get('pipeline', {}).get('current_stage', 'new_lead') not in ('won', 'lost')]
+            assert sum(s['deal_count'] for s in forecast['by_stage'].values()) == len(open_deals)
+            assert forecast == PipelineService.forecast_revenue(db.get_practices())
+            print("✅ Summary and forecast answered from the counters, moves reflected")
+        finally:
+            pipeline_api.db = shared
+
+    print("\n✨ All tests passed!")
+
+
+if __name__ == "__main__":
+    test_stage_counters_stores()
+    test_summary_and_forecast_endpoints()
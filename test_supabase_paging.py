@@ -0,0 +1,174 @@
+"""Test paginated Supabase access against a local PostgREST-compatible stub"""
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+sys.path.insert(0, str(Path(__file__).parent))
+
+from supabase import create_client
+
+from backend.services.database import DatabaseService
+from backend.services.supabase_paging import fetch_all, iter_pages, upsert_in_batches
+
+
+class PostgRESTStub(BaseHTTPRequestHandler):
+    """Tiny PostgREST: /rest/v1/practices with select, nr=in.(...), order, offset/limit and upsert"""
+
+    rows = {}
+    max_rows = 7
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.requests.append(('GET', params))
+
+        offset = int(params.get('offset', 0))
+        limit = min(int(params.get('limit', self.max_rows)), self.max_rows)
+        columns = params.get('select', '*')
+
+        ordered = [self.rows[nr] for nr in sorted(self.rows)]
+        if params.get('nr', '').startswith('in.('):
+            wanted_nrs = {int(nr) for nr in params['nr'][4:-1].split(',')}
+            ordered = [row for row in ordered if row['nr'] in wanted_nrs]
+        page = ordered[offset:offset + limit]
+        if columns != '*':
+            wanted = columns.split(',')
+            page = [{k: v for k, v in row.items() if k in wanted} for row in page]
+        self._send(200, page)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        batch = body if isinstance(body, list) else [body]
+        self.requests.append(('POST', len(batch)))
+
+        if any(row.get('bad') for row in batch):
+            self._send(400, {'message': 'invalid row', 'code': '22P02'})
+            return
+        for row in batch:
+            self.rows[row['nr']] = row
+        self._send(201, batch)
+
+
+def _start_stub():
+    server = HTTPServer(('127.0.0.1', 0), PostgRESTStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = create_client(f"http://127.0.0.1:{server.server_port}", 'stub-key')
+    return server, client
+
+
+def test_supabase_paging():
+    print("🧪 Testing Supabase paging against PostgREST stub...")
+
+    server, client = _start_stub()
+    try:
+        PostgRESTStub.rows = {nr: {'nr': nr, 'naam': f'P{nr}', 'communication_history': ['x'] * 50}
+                              for nr in range(1, 24)}
+        PostgRESTStub.requests = []
+
+        # Server caps pages at 7 rows even though we ask for 10
+        pages = list(iter_pages(client, 'practices', columns='nr,naam', page_size=10))
+        assert [len(p) for p in pages] == [7, 7, 7, 2]
+        assert [r['nr'] for p in pages for r in p] == list(range(1, 24))
+        assert all(set(r) == {'nr', 'naam'} for p in pages for r in p)
+        print("✅ Range pagination past max-rows with column projection")
+
+        PostgRESTStub.requests = []
+        result = upsert_in_batches(client, 'practices', [{'nr': nr} for nr in range(100, 112)],
+                                   batch_size=5, backoff=0)
+        assert result == {'success': True, 'upserted': 12, 'failed': []}
+        assert [r for r in PostgRESTStub.requests] == [('POST', 5), ('POST', 5), ('POST', 2)]
+        print("✅ Bounded upsert batches")
+
+        rows = [{'nr': nr, 'bad': nr == 203} for nr in range(200, 208)]
+        result = upsert_in_batches(client, 'practices', rows, batch_size=8, retries=1, backoff=0)
+        assert result['failed'] == [203]
+        assert result['upserted'] == 7
+        assert all(nr in PostgRESTStub.rows for nr in range(200, 208) if nr != 203)
+        print("✅ Failing batch split and retried, bad row isolated")
+
+        # DatabaseService goes through the same helpers
+        db = DatabaseService()
+        db.supabase_client = client
+        assert len(db.get_practices()) == len(PostgRESTStub.rows)
+        assert sum(len(p) for p in db.iter_practices(columns='nr', page_size=7)) == len(PostgRESTStub.rows)
+        saved = db.bulk_upsert([{'nr': 300}, {'nr': 301}])
+        assert saved['success'] and 301 in PostgRESTStub.rows
+        assert len(fetch_all(client, 'practices')) == len(PostgRESTStub.rows)
+        print("✅ DatabaseService reads and writes via pages and batches")
+    finally:
+        server.shutdown()
+
+    print("\n✨ All tests passed!")
+
+
+def test_supabase_phone_index():
+    print("🧪 Testing phone matching on Supabase...")
+
+    server, client = _start_stub()
+    try:
+        PostgRESTStub.rows = {nr: {'nr': nr, 'naam': f'P{nr}', 'tel': f'011 22 33 {nr:02d}'} for nr in range(1, 20)}
+        PostgRESTStub.rows[7]['tel'] = '011 22 33 07; 0470/12.34.56'
+        db = DatabaseService()
+        db.supabase_client = client
+
+        PostgRESTStub.requests = []
+        assert db.find_practice_by_phone('whatsapp:+32470123456')['nr'] == 7
+        assert db.find_practice_by_phone('+3211223312')['nr'] == 12
+        assert db.find_practice_by_phone('+3299999999') is None
+        loads = [r for r in PostgRESTStub.requests if r[0] == 'GET' and r[1].get('select') == 'nr,tel']
+        assert len(loads) == 4  # one paged index load (19 rows / 7 + empty page), then lookups only
+        print("✅ Index loaded once with nr,tel, lookups fetch only the match")
+
+        db.upsert_practice({'nr': 12, 'naam': 'P12', 'tel': '0475 00 00 00'})
+        assert db.find_practice_by_phone('+3211223312') is None
+        assert db.find_practice_by_phone('0032 475 00 00 00')['nr'] == 12
+        print("✅ Own writes update the index")
+    finally:
+        server.shutdown()
+
+
+def test_supabase_score_index():
+    print("🧪 Testing score range queries on Supabase...")
+
+    server, client = _start_stub()
+    try:
+        PostgRESTStub.rows = {nr: {'nr': nr, 'naam': f'P{nr}', 'gemeente': 'Gent' if nr % 2 else 'Genk',
+                                   'score': {'total_score': (nr * 37) % 101}} for nr in range(1, 20)}
+        db = DatabaseService()
+        db.supabase_client = client
+        expected = sorted((row for row in PostgRESTStub.rows.values() if row['score']['total_score'] >= 75),
+                          key=lambda row: (-row['score']['total_score'], row['nr']))
+
+        PostgRESTStub.requests = []
+        assert [p['nr'] for p in db.top_k('hot', 2)] == [row['nr'] for row in expected[:2]]
+        assert [p['nr'] for p in db.top_k('hot', 5, gemeente='gent')] == \
+            [row['nr'] for row in expected if row['gemeente'] == 'Gent'][:5]
+        loads = [r for r in PostgRESTStub.requests if r[0] == 'GET' and r[1].get('select') == 'nr,gemeente,score']
+        assert len(loads) == 4  # one paged index load (19 rows / 7 + empty page), then lookups only
+        print("✅ Index loaded once with nr,gemeente,score, lookups fetch only the matches")
+
+        db.upsert_practice({'nr': 3, 'naam': 'P3', 'gemeente': 'Gent', 'score': {'total_score': 100}})
+        assert db.top_k('hot', 1)[0]['nr'] == 3
+        print("✅ Own writes update the index")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_supabase_paging()
+    test_supabase_phone_index()
+    test_supabase_score_index()